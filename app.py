@@ -1,16 +1,20 @@
 import streamlit as st
 import pandas as pd
 from src.rag_runner import generate_insight
-from src.domain_inserter import insert_domain
 from src.evaluation import (
     evaluate_insight_quality,
     evaluate_retrieval_quality,
     log_scrape_result,
     track_timing,
 )
-from src.vectorstore import HybridRetriever
+from src.retriever_registry import get_retriever
+from src.chunk_metadata import AUTO_TAGS
+from src.cache_manager import RefreshScheduler, cache_manager
+from src.model_registry import model_registry
+from src.job_queue import ACTIVE_STATES, DONE, FAILED, WorkerPool, job_queue
 from PIL import Image
 import time
+import uuid
 
 # ---------- Setup ----------
 st.set_page_config(page_title="LeadGen RAG Scraper", layout="wide")
@@ -19,10 +23,87 @@ st.set_page_config(page_title="LeadGen RAG Scraper", layout="wide")
 with open("style.css") as css:
     st.markdown(f"<style>{css.read()}</style>", unsafe_allow_html=True)
 
+# ✅ One background refresher per server process, shared by all sessions
+@st.cache_resource
+def start_cache_refresh():
+    return RefreshScheduler(cache_manager).start()
+
+start_cache_refresh()
+
+# ✅ Models load lazily; start loading them now so the first query does not wait
+@st.cache_resource
+def warm_up_models():
+    return model_registry.warm_up()
+
+warm_up_models()
+
+# ✅ Scraping and LLM calls run as queued jobs on background workers, so the page never blocks
+@st.cache_resource
+def start_job_workers():
+    return WorkerPool(job_queue).start()
+
+start_job_workers()
+
 # ✅ Ensure domain_tables is always initialized
 if "domain_tables" not in st.session_state:
     st.session_state.domain_tables = {}
 
+# ✅ Jobs belong to this session; its id is kept in the URL so a page reload finds them again
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.session_state.merged_jobs = {}  # job id -> (domain, task) pairs already added to the domain tables
+st.query_params["session"] = st.session_state.session_id
+
+def format_output(output: str) -> str:
+    if not output or output.strip() == "":
+        return "[No clear answer generated.]"
+    if output.lower().startswith("[error"):
+        return f"⚠️ {output}"
+    return output
+
+def add_task_row(domain: str, task: str, output: str):
+    df = st.session_state.domain_tables.setdefault(domain, pd.DataFrame(columns=["No", "Task", "Output"]))
+    new_row = {"No": len(df) + 1, "Task": task, "Output": output}
+    st.session_state.domain_tables[domain] = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+
+def enqueue_job(kind: str, params: dict) -> int:
+    return job_queue.enqueue(kind, params, owner=st.session_state.session_id)
+
+def describe_job(job: dict) -> str:
+    params = job["params"]
+    if job["kind"] == "insert_domain":
+        return f"🔎 Scrape {params['domain']}"
+    if job["kind"] == "generate_insight":
+        return f"🧠 {params['task']} ({params['domain']})"
+    return f"🚀 {len(params['tasks'])} task(s) on {len(params['domains'])} domain(s)"
+
+def merge_jobs(jobs: list) -> bool:
+    """
+    Add what this session's jobs have produced to the domain tables, each
+    (domain, task) result once, even if a job was re-run after a restart.
+    Fan-out jobs are merged while they run. Returns True if a table changed.
+    """
+    merged, changed = st.session_state.merged_jobs, False
+    for job in reversed(jobs):  # oldest first, so rows keep their order
+        result = job["result"] or {}
+        if job["kind"] == "insert_domain":
+            if job["state"] == DONE and job["id"] not in merged:
+                st.session_state.domain_tables.setdefault(result["domain"], pd.DataFrame(columns=["No", "Task", "Output"]))
+                merged[job["id"]] = set()
+                changed = True
+            continue
+        if job["kind"] == "generate_insight":
+            rows = [result] if job["state"] == DONE else []
+        else:
+            rows = result.get("results", [])
+        added = merged.setdefault(job["id"], set())
+        for row in rows:
+            if (row["domain"], row["task"]) not in added:
+                add_task_row(row["domain"], row["task"], format_output(row["output"]))
+                added.add((row["domain"], row["task"]))
+                changed = True
+    return changed
+
 # ---------- Logo and App Info ----------
 logo_path = "assets/leadgen logo.png"
 logo = Image.open(logo_path)
@@ -72,8 +153,8 @@ elif nav_option == "Evaluation":
             output = generate_insight(domain, task)
             scrape_end = time.time()
 
-            retriever = HybridRetriever(domain=domain)  # ❌ removed `text=output`
-            retrieved_chunks = retriever.search(task, top_k=5)
+            retriever = get_retriever(domain)  # ✅ same cached retriever generate_insight used
+            retrieved_chunks = retriever.search(task, top_k=5, tags=AUTO_TAGS)
 
             # ✅ Extract clean text for evaluation functions
             chunk_texts = [chunk if isinstance(chunk, str) else chunk.get("text", "") for chunk in retrieved_chunks]
@@ -103,6 +184,35 @@ elif nav_option == "Evaluation":
 if nav_option == "Domain Tables":
     st.sidebar.markdown("### Domain Navigator")
 
+    # ⏳ Background Jobs (polled while any are queued or running)
+    active_jobs = job_queue.list(owner=st.session_state.session_id, states=ACTIVE_STATES)
+
+    @st.fragment(run_every=2 if active_jobs else None)
+    def show_jobs():
+        jobs = job_queue.list(owner=st.session_state.session_id, limit=200)
+        if merge_jobs(jobs):
+            st.rerun()
+        active = [job for job in jobs if job["state"] in ACTIVE_STATES]
+        if active:
+            st.markdown(f"### ⏳ Running {len(active)} job(s)")
+        for job in active:
+            label, cancel = st.columns([6, 1])
+            label.progress(job["progress"], text=f"{describe_job(job)}: {job['message'] or job['state']}")
+            if cancel.button("Cancel", key=f"cancel_job_{job['id']}", disabled=job["cancel_requested"]):
+                job_queue.cancel(job["id"])
+                st.rerun(scope="fragment")
+        if bool(active) != bool(active_jobs):
+            st.rerun()  # start or stop polling
+        finished = [job for job in jobs if job["state"] not in ACTIVE_STATES][:5]
+        if finished:
+            with st.expander("Recent jobs"):
+                for job in finished:
+                    icon = {DONE: "✅", FAILED: "❌"}.get(job["state"], "⏹️")
+                    error = f": {job['error']}" if job["error"] else ""
+                    st.markdown(f"{icon} {describe_job(job)}{error}")
+
+    show_jobs()
+
     # ➕ Add New Domain
     with st.sidebar.expander("➕ Add New Domain"):
         new_domain = st.text_input("Enter domain (e.g. https://example.com)", key="new_domain_box")
@@ -110,20 +220,30 @@ if nav_option == "Domain Tables":
         if st.button("Create Domain Table"):
             new_domain = new_domain.strip()
             if new_domain:
-                if new_domain not in st.session_state.domain_tables:
-                    with st.spinner("🔎 Scraping & Preprocessing..."):
-                        result = insert_domain(new_domain)
-                        if result and result.startswith("[Error]"):
-                            st.warning(result)
-                        else:
-                            st.session_state.domain_tables[new_domain] = pd.DataFrame(columns=["No", "Task", "Output"])
-                            st.success(f"✅ Domain inserted and preprocessed: {new_domain}")
-                            st.rerun()
+                queued = [job["params"]["domain"] for job in active_jobs if job["kind"] == "insert_domain"]
+                if new_domain not in st.session_state.domain_tables and new_domain not in queued:
+                    enqueue_job("insert_domain", {"domain": new_domain})
+                    st.rerun()
                 else:
                     st.warning("Domain already exists.")
             else:
                 st.warning("Please enter a valid domain.")
 
+    # 🚀 Run Tasks on Many Domains
+    if st.session_state.domain_tables:
+        with st.sidebar.expander("🚀 Run Tasks on Many Domains"):
+            all_domains = list(st.session_state.domain_tables.keys())
+            fanout_domains = st.multiselect("Domains", all_domains, default=all_domains, key="fanout_domains_box")
+            fanout_tasks = st.text_area("Tasks (one per line)", key="fanout_tasks_box")
+
+            if st.button("Run on Selected Domains"):
+                tasks = [task.strip() for task in fanout_tasks.splitlines() if task.strip()]
+                if fanout_domains and tasks:
+                    enqueue_job("generate_insights", {"domains": fanout_domains, "tasks": tasks})
+                    st.rerun()
+                else:
+                    st.warning("Select at least one domain and enter at least one task.")
+
     # 🗑️ Delete Domain
     if st.session_state.domain_tables:
         with st.sidebar.expander("🗑️ Delete Domain"):
@@ -142,18 +262,7 @@ if nav_option == "Domain Tables":
         task_input = st.text_input("Enter a new task (e.g. What are their services?)", key="task_input_box")
         if st.button("Run and Add Task"):
             if task_input.strip():
-                with st.spinner("Generating insight using RAG..."):
-                    output = generate_insight(selected_domain, task_input)
-
-                if not output or output.strip() == "":
-                    output = "[No clear answer generated.]"
-                elif output.lower().startswith("[error"):
-                    output = f"⚠️ {output}"
-
-                df = st.session_state.domain_tables[selected_domain]
-                new_row = {"No": len(df) + 1, "Task": task_input, "Output": output}
-                st.session_state.domain_tables[selected_domain] = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                st.success("✅ Task added!")
+                enqueue_job("generate_insight", {"domain": selected_domain, "task": task_input.strip()})
                 st.rerun()
             else:
                 st.warning("Task cannot be empty.")
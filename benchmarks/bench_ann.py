@@ -0,0 +1,74 @@
+"""
+Benchmark: FAISS index kinds from src/ann.py against the exact flat baseline.
+
+    python benchmarks/bench_ann.py [corpus sizes...] [--dim D] [--kinds flat,ivf_sq8,...]
+
+Vectors are synthetic clustered, L2-normalised embeddings (MiniLM's 384
+dims by default). Reports build time, serialized index size, query
+latency and recall@10 against exact inner-product search; "auto" marks
+the kind choose_index_kind() would pick at that size.
+"""
+import sys
+import time
+
+import faiss
+import numpy as np
+
+from common import print_table
+from src.ann import ANN_KINDS, build_index, choose_index_kind, normalize
+
+TOP_K = 10
+QUERIES = 200
+
+
+def make_vectors(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(n // 100, 10), dim)).astype("float32")
+    vectors = centres[rng.integers(0, len(centres), size=n)] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    queries = centres[rng.integers(0, len(centres), size=QUERIES)] + 0.5 * rng.standard_normal((QUERIES, dim)).astype("float32")
+    return vectors, normalize(queries)
+
+
+def main():
+    args = sys.argv[1:]
+    dim, kinds = 384, list(ANN_KINDS)
+    if "--dim" in args:
+        i = args.index("--dim")
+        dim = int(args[i + 1])
+        del args[i:i + 2]
+    if "--kinds" in args:
+        i = args.index("--kinds")
+        kinds = args[i + 1].split(",")
+        del args[i:i + 2]
+    sizes = [int(s) for s in args] or [10_000, 50_000, 200_000]
+
+    rows = []
+    for size in sizes:
+        vectors, queries = make_vectors(size, dim)
+        ids = np.arange(size, dtype="int64")
+        exact = faiss.IndexFlatIP(dim)
+        exact.add(normalize(vectors))
+        _, truth = exact.search(queries, TOP_K)
+
+        for kind in kinds:
+            start = time.perf_counter()
+            index, params = build_index(vectors, ids, kind=kind)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for q in range(QUERIES):
+                index.search(queries[q:q + 1], TOP_K)
+            latency = (time.perf_counter() - start) / QUERIES
+
+            _, found = index.search(queries, TOP_K)
+            recall = np.mean([len(set(t) & set(f)) / TOP_K for t, f in zip(truth, found)])
+            size_mb = len(faiss.serialize_index(index)) / 1e6
+            label = f"{kind}{' (auto)' if kind == choose_index_kind(size) else ''}"
+            rows.append([f"{size:,}", label, f"{build:.2f}", f"{size_mb:.1f}", f"{latency * 1000:.3f}", f"{recall:.3f}"])
+            del index
+
+    print_table(["vectors", "index", "build s", "size MB", "ms/query", f"recall@{TOP_K}"], rows)
+
+
+if __name__ == "__main__":
+    main()
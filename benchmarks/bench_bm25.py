@@ -0,0 +1,102 @@
+"""
+Benchmark: rank_bm25.BM25Okapi (pickled) vs. the CSR SparseBM25 index.
+
+    python benchmarks/bench_bm25.py [corpus sizes...] [--legacy-max N]
+
+Corpora are synthetic chunks with Zipf-distributed words. Both engines
+index whitespace tokens, so their scores are checked for equality.
+rank_bm25 is skipped above --legacy-max chunks (default 100k), where it
+takes minutes and several GB to build.
+"""
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from common import best_of, print_table
+from src.bm25 import WHITESPACE_TOKENIZER, SparseBM25, load_bm25
+
+VOCAB_SIZE = 50_000
+QUERIES = 20
+
+
+def make_corpus(n_docs: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"t{i}" for i in range(VOCAB_SIZE)])
+    lengths = rng.integers(10, 60, size=n_docs)
+    ids = np.minimum(rng.zipf(1.2, size=int(lengths.sum())), VOCAB_SIZE) - 1
+    tokens = words[ids].tolist()
+    corpus, start = [], 0
+    for n in lengths.tolist():
+        corpus.append(tokens[start:start + n])
+        start += n
+    queries = [words[np.minimum(rng.zipf(1.5, size=3), 2_000) - 1].tolist() for _ in range(QUERIES)]
+    return corpus, queries
+
+
+def per_query_ms(index, queries) -> float:
+    return best_of(lambda: [index.get_scores(q) for q in queries], 3) / len(queries) * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    legacy_max = 100_000
+    if "--legacy-max" in args:
+        i = args.index("--legacy-max")
+        legacy_max = int(args[i + 1])
+        del args[i:i + 2]
+    sizes = [int(s) for s in args] or [100, 1_000, 10_000, 100_000, 1_000_000]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            corpus, queries = make_corpus(size)
+            sparse_path = os.path.join(tmp, f"{size}.bm25")
+            pickle_path = os.path.join(tmp, f"{size}.pkl")
+
+            sparse_build = best_of(lambda: SparseBM25.from_tokens(corpus, tokenizer=WHITESPACE_TOKENIZER), 1)
+            sparse = SparseBM25.from_tokens(corpus, tokenizer=WHITESPACE_TOKENIZER)
+            sparse.save(sparse_path)
+            sparse_load = best_of(lambda: load_bm25(sparse_path), 3)
+            sparse = load_bm25(sparse_path)
+            sparse_query = per_query_ms(sparse, queries)
+
+            legacy = ["-"] * 4
+            same = "-"
+            if size <= legacy_max:
+                old_build = best_of(lambda: BM25Okapi(corpus), 1)
+                old = BM25Okapi(corpus)
+                with open(pickle_path, "wb") as f:
+                    pickle.dump(old, f)
+
+                def unpickle():
+                    with open(pickle_path, "rb") as f:
+                        return pickle.load(f)
+
+                old_load = best_of(unpickle, 1)
+                old_query = per_query_ms(old, queries)
+                legacy = [f"{old_build:.2f}", f"{old_load * 1000:.1f}", f"{old_query:.2f}",
+                          f"{old_query / sparse_query:.0f}x"]
+                same = all(np.allclose(old.get_scores(q), sparse.get_scores(q), rtol=1e-5) for q in queries)
+                del old
+
+            rows.append([
+                f"{size:,}",
+                legacy[0], f"{sparse_build:.2f}",
+                legacy[1], f"{sparse_load * 1000:.1f}",
+                legacy[2], f"{sparse_query:.2f}",
+                legacy[3], same,
+            ])
+
+    print_table(
+        ["chunks", "build s (old)", "build s (new)", "load ms (old)", "load ms (new)",
+         "query ms (old)", "query ms (new)", "speedup", "same scores"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
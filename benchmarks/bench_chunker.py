@@ -0,0 +1,43 @@
+"""
+Benchmark: original descendant walk vs. the single-pass chunker.
+
+    python benchmarks/bench_chunker.py [fixture.html]
+
+Times parse + chunk for each path on the saved large-page fixture and
+checks that every path produces exactly the baseline chunks.
+"""
+import sys
+from bs4 import BeautifulSoup
+
+from common import best_of, load_fixture, print_table
+from benchmarks.legacy import extract_semantic_chunks as legacy_extract
+from src.chunker import HAS_LXML, chunk_html, chunk_soup
+
+
+def main():
+    fixture = sys.argv[1] if len(sys.argv) > 1 else "large_page.html"
+    html = load_fixture(fixture)
+    print(f"📄 {fixture}: {len(html) / 1024:.0f} KiB\n")
+
+    baseline = legacy_extract(BeautifulSoup(html, "html.parser"))
+
+    paths = {
+        "legacy walk (html.parser)": lambda: legacy_extract(BeautifulSoup(html, "html.parser")),
+        "streaming (html.parser)": lambda: chunk_soup(BeautifulSoup(html, "html.parser")),
+    }
+    if HAS_LXML:
+        paths["streaming (lxml)"] = lambda: chunk_html(html, backend="lxml")
+
+    rows = []
+    legacy_time = None
+    for name, fn in paths.items():
+        same = fn() == baseline
+        elapsed = best_of(fn, repeat=3)
+        legacy_time = legacy_time or elapsed
+        rows.append([name, f"{elapsed * 1000:.1f} ms", f"{legacy_time / elapsed:.2f}x", "✅" if same else "❌"])
+
+    print_table(["path", "parse+chunk", "speedup", "same chunks"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: per-call regex labelling/cleaning vs. the precompiled SectionClassifier.
+
+    python benchmarks/bench_classifier.py [batch sizes...]
+
+Batches are drawn from the chunk texts of the saved fixture pages, plus
+punctuation-free variants that fall through to the keyword stage.
+"""
+import json
+import os
+import sys
+
+from common import FIXTURES, best_of, print_table
+from benchmarks import legacy
+from src.classifier import HAS_AHOCORASICK, section_classifier
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURES, "section_labels.json"), encoding="utf-8") as f:
+        return [row["text"] for row in json.load(f)]
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    corpus = load_corpus()
+    print(f"🔤 keyword matcher: {'pyahocorasick' if HAS_AHOCORASICK else 'ordered scan'}\n")
+
+    rows = []
+    for size in sizes:
+        # Distinct strings so classify_many's batch dedup does not skew the numbers
+        batch = [f"{corpus[i % len(corpus)]} {i}" if i >= len(corpus) else corpus[i] for i in range(size)]
+        repeat = 3 if size <= 10_000 else 1
+
+        old_label = best_of(lambda: [legacy.detect_section_label(t) for t in batch], repeat)
+        new_label = best_of(lambda: section_classifier.classify_many(batch), repeat)
+        old_clean = best_of(lambda: [legacy.clean_text(t) for t in batch], repeat)
+        new_clean = best_of(lambda: [section_classifier.clean(t) for t in batch], repeat)
+
+        same = (
+            [legacy.detect_section_label(t) for t in batch] == section_classifier.classify_many(batch)
+            and [legacy.clean_text(t) for t in batch] == [section_classifier.clean(t) for t in batch]
+        )
+        rows.append([
+            f"{size:,}",
+            f"{size / old_label:,.0f}/s", f"{size / new_label:,.0f}/s",
+            f"{size / old_clean:,.0f}/s", f"{size / new_clean:,.0f}/s",
+            "✅" if same else "❌",
+        ])
+
+    print_table(["batch", "label (regex)", "label (engine)", "clean (regex)", "clean (engine)", "same output"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: embedding backends and batching.
+
+    python benchmarks/bench_embeddings.py [texts] [backends...]
+
+Part 1 needs no model: padded tokens per forward pass for fixed batches
+of 32 in arrival order vs length-bucketed batches, on chunk-like texts.
+
+Part 2 encodes the same texts with each backend (torch, torch-int8,
+onnx, onnx-int8 by default) and reports throughput and cosine agreement
+with the reference torch model, both per text and as a whole. Backends
+whose dependencies are missing are skipped.
+"""
+import sys
+import time
+
+import numpy as np
+
+from common import best_of, print_table
+from src.embeddings import EMBEDDING_BACKENDS, encode_bucketed, estimate_tokens, plan_batches
+
+WORDS = [f"word{i}" for i in range(5000)]
+
+
+def padded_tokens(texts, batches) -> int:
+    tokens = estimate_tokens(texts)
+    return int(sum(len(batch) * tokens[batch].max() for batch in batches))
+
+
+def main():
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    kinds = sys.argv[2:] or list(EMBEDDING_BACKENDS)
+    rng = np.random.default_rng(0)
+    # Chunk lengths are skewed: many short headings and list items, some full paragraphs
+    lengths = np.clip(rng.lognormal(mean=3.0, sigma=1.0, size=n_texts), 2, 250).astype(int)
+    texts = [" ".join(rng.choice(WORDS, size=n)) for n in lengths]
+
+    fixed = [np.arange(i, min(i + 32, n_texts)) for i in range(0, n_texts, 32)]
+    bucketed = plan_batches(texts)
+    useful = int(estimate_tokens(texts).sum())
+    print(f"{n_texts} texts, {useful} tokens (estimated)\n")
+    print_table(
+        ["batching", "passes", "padded tokens", "padding overhead"],
+        [
+            ["fixed 32, arrival order", len(fixed), padded_tokens(texts, fixed), f"{padded_tokens(texts, fixed) / useful - 1:.0%}"],
+            ["length-bucketed", len(bucketed), padded_tokens(texts, bucketed), f"{padded_tokens(texts, bucketed) / useful - 1:.0%}"],
+        ],
+    )
+
+    rows, reference = [], None
+    for kind in kinds:
+        try:
+            start = time.perf_counter()
+            backend = EMBEDDING_BACKENDS[kind]()
+            load = time.perf_counter() - start
+        except ImportError as e:
+            rows.append([kind, "-", "-", "-", "-", f"skipped ({e.name} not installed)"])
+            continue
+        vectors = encode_bucketed(backend.encode_batch, texts)
+        seconds = best_of(lambda: encode_bucketed(backend.encode_batch, texts), repeat=3)
+        if kind == "torch":
+            reference = vectors
+        if reference is not None:
+            a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            b = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            cosine = (a * b).sum(axis=1)
+            agreement = [f"{cosine.mean():.4f}", f"{cosine.min():.4f}"]
+        else:
+            agreement = ["-", "-"]
+        rows.append([kind, f"{load:.1f} s", f"{n_texts / seconds:.0f}", *agreement, ""])
+
+    print()
+    print_table(["backend", "load", "texts/s", "mean cosine vs torch", "min cosine", ""], rows)
+
+
+if __name__ == "__main__":
+    main()
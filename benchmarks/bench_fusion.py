@@ -0,0 +1,83 @@
+"""
+Benchmark: latency and recall of the hybrid fusion strategies.
+
+    python benchmarks/bench_fusion.py [corpus sizes...]
+
+Synthetic corpus: every chunk belongs to a topic, with an embedding near
+the topic centroid and a few topic words among common filler words.
+Queries are noisy views of a topic; a hit is relevant when it shares the
+query's topic. "legacy" is the original merge loop (FAISS top_k only,
+raw BM25 added to 1/(1+L2)).
+"""
+import sys
+import time
+
+import faiss
+import numpy as np
+
+from common import print_table
+from benchmarks import legacy
+from src.bm25 import WHITESPACE_TOKENIZER, SparseBM25
+from src.ann import dense_scores
+from src.fusion import CANDIDATE_MULTIPLIER, FUSION_STRATEGIES, fuse
+
+DIM = 64
+TOPICS = 200
+TOP_K = 5
+QUERIES = 200
+
+
+def make_data(n_docs: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((TOPICS, DIM)).astype("float32")
+    topics = rng.integers(0, TOPICS, size=n_docs)
+    vectors = centroids[topics] + 1.2 * rng.standard_normal((n_docs, DIM)).astype("float32")
+
+    # Topic words overlap between neighbouring topics, so BM25 alone is ambiguous
+    def topic_words(t, k):
+        return [f"k{(t + int(j)) % TOPICS}" for j in rng.integers(0, 3, size=k)]
+
+    filler = [f"f{i}" for i in range(500)]
+    corpus = [topic_words(t, 4) + rng.choice(filler, size=20).tolist() for t in topics.tolist()]
+
+    query_topics = rng.integers(0, TOPICS, size=QUERIES)
+    query_vectors = centroids[query_topics] + 1.5 * rng.standard_normal((QUERIES, DIM)).astype("float32")
+    query_tokens = [topic_words(t, 2) + rng.choice(filler, size=2).tolist() for t in query_topics.tolist()]
+    return topics, vectors, corpus, query_topics, query_vectors, query_tokens
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    rows = []
+    for size in sizes:
+        topics, vectors, corpus, query_topics, query_vectors, query_tokens = make_data(size)
+        index = faiss.IndexFlatL2(DIM)
+        index.add(vectors)
+        bm25 = SparseBM25.from_tokens(corpus, tokenizer=WHITESPACE_TOKENIZER)
+        relevant_counts = np.bincount(topics, minlength=TOPICS)
+
+        for strategy in ("legacy",) + FUSION_STRATEGIES:
+            pool = TOP_K if strategy == "legacy" else CANDIDATE_MULTIPLIER * TOP_K
+            recall = 0.0
+            start = time.perf_counter()
+            for q in range(QUERIES):
+                D = I = scores = None
+                if strategy != "sparse":
+                    D, I = index.search(query_vectors[q:q + 1], pool)
+                if strategy != "dense":
+                    scores = bm25.get_scores(query_tokens[q])
+                if strategy == "legacy":
+                    hits = legacy.hybrid_merge(D, I, scores, size, TOP_K)
+                else:
+                    hits = fuse(I[0] if I is not None else None, dense_scores(D[0], None) if D is not None else None,
+                                scores, TOP_K, strategy=strategy, pool=pool).tolist()
+                relevant = sum(1 for i in hits if topics[i] == query_topics[q])
+                recall += relevant / min(TOP_K, relevant_counts[query_topics[q]] or 1)
+            elapsed = (time.perf_counter() - start) / QUERIES
+            rows.append([f"{size:,}", strategy, f"{elapsed * 1000:.2f}", f"{recall / QUERIES:.3f}"])
+
+    print_table(["chunks", "strategy", "ms/query", f"recall@{TOP_K}"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: one question over many leads, per-domain retrievers vs the
+global sharded index.
+
+    python benchmarks/bench_global_index.py [domain counts...]
+
+Each synthetic domain gets CHUNKS_PER_DOMAIN chunks with random vectors
+(the model is bypassed). "per-domain" loads every domain's retriever and
+searches it in turn, as answering a cross-lead question did before;
+"global cold" opens the memory-mapped shards and runs one search;
+"global warm" and "global filtered" (10% of the domains) reuse the open index.
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from common import best_of, print_table
+import src.global_index as global_index
+import src.vectorstore as vectorstore
+from src.global_index import GlobalIndex
+from src.vectorstore import HybridRetriever, persist_chunks_to_vectorstore
+
+DIM = 384
+CHUNKS_PER_DOMAIN = 40
+WORDS = [f"w{i}" for i in range(2000)]
+QUERY = "w1 w2 w3 investment banking"
+
+
+def make_domains(n_domains: int, rng) -> dict:
+    vectors = {}
+    for d in range(n_domains):
+        domain = f"https://lead{d}.test"
+        texts = [" ".join(rng.choice(WORDS, size=30)) + f" chunk {d}-{c}" for c in range(CHUNKS_PER_DOMAIN)]
+        embeddings = rng.standard_normal((len(texts), DIM)).astype("float32")
+        persist_chunks_to_vectorstore([{"tag": "Other", "text": t} for t in texts], domain, embeddings=embeddings)
+        vectors.update(zip(texts, embeddings))
+    return vectors
+
+
+def main():
+    counts = [int(s) for s in sys.argv[1:]] or [100, 1_000]
+    query_vector = np.random.default_rng(1).standard_normal((1, DIM)).astype("float32")
+    vectorstore.embedding_model.encode = lambda texts, **kw: np.repeat(query_vector, len(texts), axis=0)
+
+    cwd = os.getcwd()
+    rows = []
+    for n_domains in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            vectors = make_domains(n_domains, np.random.default_rng(0))
+            global_index.encode_chunks = lambda texts: np.stack([vectors[t] for t in texts])
+            domains = [f"https://lead{d}.test" for d in range(n_domains)]
+            GlobalIndex().add_domains(domains)
+
+            def per_domain():
+                for domain in domains:
+                    HybridRetriever(domain).search(QUERY, top_k=10)
+
+            index = GlobalIndex()
+            index.search(QUERY, top_k=10)
+            subset = domains[::10]
+            rows.append([f"{n_domains:,}", "per-domain", f"{best_of(per_domain, repeat=1) * 1000:.1f}"])
+            rows.append([f"{n_domains:,}", "global cold", f"{best_of(lambda: GlobalIndex().search(QUERY, top_k=10), repeat=3) * 1000:.1f}"])
+            rows.append([f"{n_domains:,}", "global warm", f"{best_of(lambda: index.search(QUERY, top_k=10)) * 1000:.1f}"])
+            rows.append([f"{n_domains:,}", "global filtered", f"{best_of(lambda: index.search(QUERY, top_k=10, domains=subset)) * 1000:.1f}"])
+            os.chdir(cwd)
+
+    print_table(["domains", "mode", "ms/query"], rows)
+
+
+if __name__ == "__main__":
+    main()
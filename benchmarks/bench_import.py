@@ -0,0 +1,65 @@
+"""
+Benchmark: import time of the entry points, each in a fresh interpreter.
+
+    python benchmarks/bench_import.py [--max-ms N]
+
+Reports the wall time of `import <module>` (best of REPEAT runs) and which
+heavy dependencies the import actually executed. Models and faiss /
+cloudscraper are meant to load on first use (see src/model_registry.py),
+so that column should stay empty. With --max-ms the script exits non-zero
+when any module is slower, for use as a startup regression check.
+"""
+import json
+import subprocess
+import sys
+
+from common import ROOT, print_table
+
+MODULES = [
+    "src.rag_runner",
+    "src.domain_inserter",
+    "src.bulk_ingest",
+    "src.global_index",
+    "src.cache_manager",
+]
+HEAVY = ["faiss", "cloudscraper", "sentence_transformers", "torch"]
+REPEAT = 5
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+from src.model_registry import is_loaded
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if is_loaded(m)]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    runs = []
+    for _ in range(REPEAT):
+        out = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(module=module, heavy=HEAVY)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run["seconds"])
+    return {"module": module, "ms": best["seconds"] * 1000, "heavy": best["heavy"]}
+
+
+def main():
+    max_ms = float(sys.argv[sys.argv.index("--max-ms") + 1]) if "--max-ms" in sys.argv else None
+    results = [measure(module) for module in MODULES]
+    print_table(
+        ["module", "import", "heavy deps loaded"],
+        [[r["module"], f"{r['ms']:.0f} ms", ", ".join(r["heavy"]) or "-"] for r in results],
+    )
+    if max_ms is not None:
+        slow = [r["module"] for r in results if r["ms"] > max_ms or r["heavy"]]
+        if slow:
+            print(f"\n❌ Over {max_ms:.0f} ms or loading heavy deps: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
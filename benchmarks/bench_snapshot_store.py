@@ -0,0 +1,80 @@
+"""
+Benchmark: raw scrape storage, pretty-printed JSON per domain vs the
+compressed, content-addressed snapshot store.
+
+    python benchmarks/bench_snapshot_store.py [domains] [versions]
+
+Each synthetic domain has CHUNKS_PER_DOMAIN chunks, a few of them
+boilerplate shared by every domain (cookie banners, footers). It is
+re-scraped `versions` times with CHANGED_FRACTION of its chunks edited
+each time. "legacy" keeps only the latest JSON file per domain; the
+snapshot store keeps every version.
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from common import best_of, print_table
+from src.snapshot_store import SnapshotStore
+
+CHUNKS_PER_DOMAIN = 60
+SHARED_CHUNKS = 8
+CHANGED_FRACTION = 0.1
+WORDS = [f"word{i}" for i in range(5000)]
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    n_domains = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_versions = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rng = np.random.default_rng(0)
+
+    def text() -> str:
+        return " ".join(rng.choice(WORDS, size=int(rng.integers(40, 160))))
+
+    shared = [{"tag": "Other", "title": "Footer", "text": text()} for _ in range(SHARED_CHUNKS)]
+    sites = {
+        f"lead{d}.test": shared + [{"tag": "About", "title": f"Section {c}", "text": text()} for c in range(CHUNKS_PER_DOMAIN - SHARED_CHUNKS)]
+        for d in range(n_domains)
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            store = SnapshotStore()
+            os.makedirs("legacy")
+            for _ in range(n_versions):
+                for domain, chunks in sites.items():
+                    for i in rng.choice(len(chunks), size=int(len(chunks) * CHANGED_FRACTION), replace=False):
+                        chunks[i] = {**chunks[i], "text": text()}
+                    with open(os.path.join("legacy", f"{domain}.txt"), "w", encoding="utf-8") as f:
+                        f.write(json.dumps(chunks, indent=2, ensure_ascii=False))
+                    store.save(domain, chunks)
+
+            domain = next(iter(sites))
+            legacy_read = best_of(lambda: json.load(open(os.path.join("legacy", f"{domain}.txt"), encoding="utf-8")))
+            stream_read = best_of(lambda: sum(1 for _ in store.iter_chunks(domain)))
+            legacy_bytes = directory_bytes("legacy")
+            store_bytes = directory_bytes(store.root)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{n_domains} domains × {n_versions} scrapes, {CHUNKS_PER_DOMAIN} chunks each\n")
+    print_table(
+        ["store", "versions kept", "bytes on disk", "read one domain"],
+        [
+            ["legacy JSON (indent=2)", 1, f"{legacy_bytes / 1024 ** 2:.1f} MB", f"{legacy_read * 1000:.2f} ms"],
+            ["snapshot store", n_versions, f"{store_bytes / 1024 ** 2:.1f} MB", f"{stream_read * 1000:.2f} ms"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Baseline (pre-optimisation) chunking, labelling and retrieval code, frozen verbatim.
+
+Kept only as the reference implementation for benchmarks and for
+regenerating the golden fixtures under tests/fixtures. Do not import it
+from application code.
+"""
+import re
+from bs4 import BeautifulSoup
+from typing import List, Dict
+
+from src.scraper import SECTION_HEADERS, BOILERPLATE_PATTERNS, SECTION_KEYWORDS
+
+MAX_CHUNKS_PER_LABEL = 10
+
+def clean_text(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text.strip())    
+    # Remove repeated phrases like "Who We Are Who We Are"
+    text = re.sub(r'\b(\w+(?: \w+){0,4})\b(?: \1\b){1,}', r'\1', text, flags=re.IGNORECASE)
+    return text.strip()
+
+
+def is_boilerplate(text: str) -> bool:
+    text = text.lower().strip()
+    if len(text) < 5:
+        return True
+    return any(re.search(pat, text) for pat in BOILERPLATE_PATTERNS)
+
+def detect_section_label(full_block_text: str) -> str:
+    lines = full_block_text.splitlines()
+    text = full_block_text.strip()
+
+    # 📣 CTA: short, all-uppercase line
+    for line in lines:
+        if line.isupper() and len(line.split()) <= 6:
+            return "CTA"
+
+    lowered = text.lower()
+
+    # 📧 Email
+    if re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text):
+        return "Contact"
+
+    # 📞 Phone number
+    if re.search(r"\+?\d[\d\s\-().]{7,}\d", text):
+        return "Contact"
+
+    # 📍 Location / Address
+    if re.search(r"\b(Jl\.?\s+[A-Z])|\b(Street|St\.|Road|Blvd|Avenue|Ave\.|Suite|Building)\b", text, re.IGNORECASE) \
+        or re.search(r"\b(Jakarta|Bandung|Surabaya|NY|New York|LA|Los Angeles)\b", text, re.IGNORECASE) \
+        or re.search(r"\b\d{5}(-\d{4})?\b", text):
+        return "Location"
+
+    # 🌐 Social Media Links
+    if re.search(r"https?://(www\.)?(linkedin|facebook|instagram|x|twitter)\.com/\S+", text, re.IGNORECASE):
+        return "Social"
+
+    # 💰 Pricing
+    if re.search(r"(\$|Rp|IDR|USD)? ?[\d.,]+(k|rb|jt)?", text, re.IGNORECASE):
+        return "Pricing"
+
+    # 📅 Schedule / Date / Time
+    if re.search(r"\b(Jan(uary)?|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{4}", text, re.IGNORECASE) \
+        or re.search(r"\d{1,2}[:.]?\d{2} ?(AM|PM|WIB)?", text) \
+        or re.search(r"(Senin|Selasa|Rabu|Kamis|Jumat|Sabtu|Minggu)", text, re.IGNORECASE):
+        return "Schedule"
+
+    # 📝 Careers
+    if re.search(r"(join our team|we'?re hiring|open positions|apply now)", lowered):
+        return "Careers"
+
+    # 🧪 FAQ
+    if re.findall(r"(What|How|Why|Can|Where|Do|Is|Are|When|Who|Should)\b.*\?", text):
+        return "FAQ"
+
+    # 🔐 Legal
+    if re.search(r"(privacy policy|terms of service|cookies|disclaimer|data policy)", lowered):
+        return "Legal"
+
+    # Keyword-based fallback
+    for keyword, label in SECTION_KEYWORDS.items():
+        if keyword in lowered:
+            return label
+
+    # Custom fallback
+    if any(k in lowered for k in ["investment", "fund", "capital", "portfolio"]):
+        return "Services"
+
+    return "Other"
+
+
+def extract_semantic_chunks(soup: BeautifulSoup) -> List[Dict]:
+    seen_chunks = set()
+    final_chunks = []
+    chunk_counts: Dict[str, int] = {}
+
+    current_chunk = {
+        "title": None,
+        "text": []
+    }
+
+    for el in soup.body.descendants:
+        if not hasattr(el, "name") or el.name is None:
+            continue
+
+        text = clean_text(el.get_text(strip=True))
+        if not text or is_boilerplate(text):
+            continue
+
+        if el.name in SECTION_HEADERS:
+            if current_chunk["text"]:
+                first_line = current_chunk["text"][0].strip().lower()
+                title_line = current_chunk["title"].strip().lower()
+                if first_line == title_line:
+                    current_chunk["text"] = current_chunk["text"][1:]
+                
+                unique_lines = []
+                seen_lines = set()
+                for line in current_chunk["text"]:
+                    if line not in seen_lines:
+                        unique_lines.append(line)
+                        seen_lines.add(line)
+
+                joined_body = " ".join(unique_lines)
+                full_text = clean_text(f"{current_chunk['title']}\n{joined_body}")
+                label = detect_section_label(full_text)
+
+                if full_text not in seen_chunks and chunk_counts.get(label, 0) < MAX_CHUNKS_PER_LABEL:
+                    final_chunks.append({
+                        "tag": label,
+                        "title": current_chunk["title"],
+                        "text": full_text
+                    })
+                    seen_chunks.add(full_text)
+                    chunk_counts[label] = chunk_counts.get(label, 0) + 1
+
+            current_chunk = {
+                "title": text,
+                "text": []
+            }
+
+        elif current_chunk["title"]:
+            if text not in current_chunk["text"]:  # avoid intra-chunk duplication
+                current_chunk["text"].append(text)
+
+    if current_chunk["title"] and current_chunk["text"]:
+        unique_lines = []
+        seen_lines = set()
+        for line in current_chunk["text"]:
+            if line not in seen_lines:
+                unique_lines.append(line)
+                seen_lines.add(line)
+
+        full_text = f"{current_chunk['title']}\n" + " ".join(unique_lines)
+        label = detect_section_label(full_text)
+
+        if full_text not in seen_chunks and chunk_counts.get(label, 0) < MAX_CHUNKS_PER_LABEL:
+            final_chunks.append({
+                "tag": label,
+                "title": current_chunk["title"],
+                "text": full_text
+            })
+
+    return final_chunks
+
+
+def hybrid_merge(D, I, bm25_scores_array, n_chunks: int, top_k: int, mix_ratio: float = 0.5) -> List[int]:
+    """
+    Score merge of the original HybridRetriever.search, returning positions.
+    """
+    faiss_scores = {i: 1.0 / (1.0 + D[0][j]) for j, i in enumerate(I[0])}
+    bm25_scores_dict = {i: score for i, score in enumerate(bm25_scores_array)}
+
+    merged_scores = {}
+    for i in range(n_chunks):
+        faiss_score = faiss_scores.get(i, 0.0)
+        bm25_score = bm25_scores_dict.get(i, 0.0)
+        merged = mix_ratio * faiss_score + (1.0 - mix_ratio) * bm25_score
+        if merged > 0:
+            merged_scores[i] = merged
+
+    top_hits = sorted(merged_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    return [i for i, _ in top_hits]
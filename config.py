@@ -0,0 +1,27 @@
+"""
+⚙️ Runtime settings. Each one can be overridden by an environment
+variable of the same name.
+"""
+import os
+
+# =============================
+# 🧠 Insight generation (LLM)
+# =============================
+
+# "http": HuggingFace Inference API; "local": in-process seq2seq model (offline, CPU ok)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "http")
+LLM_MODEL = os.getenv("LLM_MODEL", "google/flan-t5-large")
+LLM_API_URL = os.getenv("LLM_API_URL", f"https://api-inference.huggingface.co/models/{LLM_MODEL}")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))    # HTTP requests in flight
+INSIGHT_LLM_WORKERS = int(os.getenv("INSIGHT_LLM_WORKERS", "8"))    # prompts queued at once by generate_insights
+
+LLM_LOCAL_MODEL = os.getenv("LLM_LOCAL_MODEL", "google/flan-t5-base")
+LLM_LOCAL_MAX_BATCH = int(os.getenv("LLM_LOCAL_MAX_BATCH", "8"))    # prompts per generate() call
+LLM_LOCAL_MAX_WAIT_MS = float(os.getenv("LLM_LOCAL_MAX_WAIT_MS", "20"))  # wait for concurrent prompts to join
+
+# =============================
+# 🔎 Embeddings
+# =============================
+
+# "torch" (reference), "torch-int8", "onnx" or "onnx-int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
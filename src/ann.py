@@ -0,0 +1,176 @@
+import json
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.cache_lock import atomic_write
+from src.model_registry import lazy_import
+
+faiss = lazy_import("faiss")
+
+ANN_KINDS = ("flat", "hnsw", "ivf_flat", "ivf_sq8", "ivf_pq")
+
+# Corpus sizes (vectors) up to which each kind is picked automatically.
+# HNSW is only used when asked for: it cannot remove vectors, which
+# incremental re-indexing needs.
+FLAT_MAX_VECTORS = 20_000
+IVF_FLAT_MAX_VECTORS = 200_000
+IVF_SQ_MAX_VECTORS = 2_000_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+TRAIN_POINTS_PER_LIST = 64
+
+
+def choose_index_kind(n_vectors: int) -> str:
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= IVF_FLAT_MAX_VECTORS:
+        return "ivf_flat"
+    if n_vectors <= IVF_SQ_MAX_VECTORS:
+        return "ivf_sq8"
+    return "ivf_pq"
+
+
+def index_params(kind: str, n_vectors: int, dim: int) -> dict:
+    """
+    Build and search parameters for an index of `kind` over n_vectors.
+    """
+    if kind not in ANN_KINDS:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {ANN_KINDS}")
+    params = {"kind": kind, "metric": "ip", "normalized": True, "dim": dim}
+    if kind == "hnsw":
+        params.update(M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH)
+    elif kind.startswith("ivf"):
+        nlist = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39 or 1))
+        params.update(nlist=nlist, nprobe=min(nlist, max(8, nlist // 16)))
+        if kind == "ivf_pq":
+            # Sub-quantizers of 8 dims each (48 for MiniLM's 384); 8-bit codes
+            # unless there are too few vectors to train 256 centroids each
+            pq_bits = max(4, min(8, int(math.log2(max(n_vectors // 39, 1)))))
+            params.update(pq_m=next(m for m in range(max(dim // 8, 1), 0, -1) if dim % m == 0), pq_bits=pq_bits)
+    return params
+
+
+def _factory_string(params: dict) -> str:
+    kind = params["kind"]
+    if kind == "flat":
+        return "Flat"
+    if kind == "hnsw":
+        return f"HNSW{params['M']}"
+    coarse = f"IVF{params['nlist']}"
+    if kind == "ivf_flat":
+        return f"{coarse},Flat"
+    if kind == "ivf_sq8":
+        return f"{coarse},SQ8"
+    return f"{coarse},PQ{params['pq_m']}x{params['pq_bits']}"
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalised float32 copy, so inner product is cosine similarity.
+    """
+    vectors = np.array(vectors, dtype="float32", copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    kind: Optional[str] = None,
+) -> Tuple["faiss.Index", dict]:
+    """
+    ID-mapped inner-product index over normalised `vectors`, with the kind
+    picked from the corpus size unless given. Returns (index, params).
+    """
+    vectors = normalize(vectors)
+    n_vectors, dim = vectors.shape
+    params = index_params(kind or choose_index_kind(n_vectors), n_vectors, dim)
+
+    index = faiss.index_factory(dim, f"IDMap2,{_factory_string(params)}", faiss.METRIC_INNER_PRODUCT)
+    if params["kind"] == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        sample = vectors
+        limit = max(params["nlist"], 2 ** params.get("pq_bits", 0)) * TRAIN_POINTS_PER_LIST
+        if n_vectors > limit:
+            sample = vectors[np.random.default_rng(0).choice(n_vectors, limit, replace=False)]
+        index.train(sample)
+    index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    configure_search(index, params)
+    params["ntotal"] = int(index.ntotal)
+    return index, params
+
+
+def configure_search(index: "faiss.Index", params: dict):
+    """
+    Apply the recorded query-time parameters (nprobe / efSearch).
+    """
+    if params.get("nprobe"):
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    if params.get("ef_search"):
+        inner = index.index if isinstance(index, faiss.IndexIDMap) else index
+        faiss.downcast_index(inner).hnsw.efSearch = params["ef_search"]
+
+
+def filtered_search_params(params: Optional[dict], ids: np.ndarray) -> "faiss.SearchParameters":
+    """
+    Query-time parameters restricting a search to `ids` (the index's own
+    ids: content hashes for ID-mapped indexes, positions otherwise).
+    IVF indexes probe every list for small selections, which then costs
+    a membership check per vector and is exact.
+    """
+    selector = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+    params = params or {}
+    if params.get("nprobe"):
+        nprobe = params["nlist"] if len(ids) <= FLAT_MAX_VECTORS else params["nprobe"]
+        search_params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    elif params.get("ef_search"):
+        search_params = faiss.SearchParametersHNSW(sel=selector, efSearch=params["ef_search"])
+    else:
+        search_params = faiss.SearchParameters(sel=selector)
+    # The parameters only hold a raw pointer to the selector
+    search_params.selector = selector
+    return search_params
+
+
+def supports_removal(params: dict) -> bool:
+    return params.get("kind") != "hnsw"
+
+
+# =============================
+# 🏷️ Metadata
+# =============================
+
+def get_meta_path(faiss_path: str) -> str:
+    return f"{faiss_path}.meta.json"
+
+
+def save_index_meta(faiss_path: str, params: dict):
+    with atomic_write(get_meta_path(faiss_path)) as f:
+        json.dump(params, f, indent=2)
+
+
+def load_index_meta(faiss_path: str) -> Optional[dict]:
+    """
+    Parameters recorded by build_index, or None for indexes written before
+    they were recorded (exact L2 over raw vectors).
+    """
+    path = get_meta_path(faiss_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dense_scores(distances: np.ndarray, params: Optional[dict]) -> np.ndarray:
+    """
+    FAISS result values as similarities (higher is better).
+    """
+    if params and params.get("metric") == "ip":
+        return np.asarray(distances, dtype=np.float64)
+    return 1.0 / (1.0 + np.asarray(distances, dtype=np.float64))
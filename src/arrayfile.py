@@ -0,0 +1,144 @@
+import json
+import os
+import zlib
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.cache_lock import atomic_write
+
+ALIGN = 64
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+# =============================
+# 📦 Aligned array container
+# =============================
+#
+# magic (8 bytes) | header length (8 bytes, little endian) | JSON header |
+# padding | arrays, each starting on a 64-byte boundary.
+#
+# header["arrays"] maps each name to its dtype, shape, offset (from the
+# start of the data) and crc32. Files are published with atomic_write, so
+# readers that still map the previous version are unaffected.
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGN) * ALIGN
+
+
+def write_arrays(path: str, magic: bytes, header: dict, arrays: Dict[str, np.ndarray]):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "crc32": zlib.crc32(memoryview(array).cast("B")) if array.nbytes else 0,
+        }
+        offset += _aligned(array.nbytes)
+
+    encoded = json.dumps({**header, "arrays": layout}).encode("utf-8")
+    data_start = _aligned(len(magic) + 8 + len(encoded))
+
+    with atomic_write(path, "wb") as f:
+        f.write(magic)
+        f.write(len(encoded).to_bytes(8, "little"))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(memoryview(array).cast("B"))
+        f.truncate(data_start + offset)
+
+
+def read_header(path: str, magic: bytes) -> Tuple[dict, int]:
+    """
+    (header, data offset) of a container file.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"Unexpected file format (want {magic!r}): {path}")
+        header_len = int.from_bytes(f.read(8), "little")
+        try:
+            header = json.loads(f.read(header_len))
+        except ValueError:
+            raise ChecksumError(f"Corrupt header in {path}")
+    return header, _aligned(len(magic) + 8 + header_len)
+
+
+def read_arrays(path: str, magic: bytes, mmap: bool = True, verify: bool = False) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """
+    (header, arrays). With mmap=True the arrays are read-only views of
+    one memory map; verify=True checks each array's crc32 (files written
+    before checksums were recorded are not checked).
+    """
+    header, data_start = read_header(path, magic)
+    size = os.path.getsize(path)
+    if mmap and size > data_start:
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        with open(path, "rb") as f:
+            raw = np.frombuffer(f.read(), dtype=np.uint8)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        start = data_start + spec["offset"]
+        if start + nbytes > size:
+            raise ChecksumError(f"Truncated array '{name}' in {path}")
+        data = raw[start:start + nbytes]
+        if verify and "crc32" in spec and nbytes and zlib.crc32(data) != spec["crc32"]:
+            raise ChecksumError(f"Checksum mismatch for '{name}' in {path}")
+        arrays[name] = data.view(dtype).reshape(shape) if nbytes else np.zeros(shape, dtype=dtype)
+    return header, arrays
+
+
+# =============================
+# 🔤 Text columns
+# =============================
+
+class TextColumn:
+    """
+    Strings stored as a UTF-8 blob plus an int64 offset table. Nothing is
+    decoded until an item is read, so a memory-mapped column of a million
+    chunks costs two arrays, not a million Python strings.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "TextColumn":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}.offsets": self.offsets, f"{prefix}.blob": self.blob}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "TextColumn":
+        return cls(arrays[f"{prefix}.offsets"], arrays[f"{prefix}.blob"])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, np.integer]) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> List[str]:
+        return list(self)
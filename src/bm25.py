@@ -0,0 +1,340 @@
+import pickle
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.arrayfile import read_arrays, write_arrays
+
+MAGIC = b"BM25CSR1"
+MAX_TF = np.iinfo(np.uint16).max
+
+
+# =============================
+# 🔤 Tokenizer
+# =============================
+
+class Tokenizer:
+    """
+    Regex tokenizer shared by indexing and querying. Its settings are saved
+    with the index so queries are always split the same way as the corpus.
+    """
+
+    def __init__(
+        self,
+        pattern: str = r"\w+",
+        lowercase: bool = True,
+        stopwords: Iterable[str] = (),
+        min_length: int = 1,
+    ):
+        self.pattern = pattern
+        self.lowercase = lowercase
+        self.stopwords = frozenset(stopwords)
+        self.min_length = min_length
+        self._findall = re.compile(pattern).findall
+
+    def __call__(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._findall(text)
+        if self.stopwords or self.min_length > 1:
+            tokens = [t for t in tokens if len(t) >= self.min_length and t not in self.stopwords]
+        return tokens
+
+    def config(self) -> dict:
+        return {
+            "pattern": self.pattern,
+            "lowercase": self.lowercase,
+            "stopwords": sorted(self.stopwords),
+            "min_length": self.min_length,
+        }
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Tokenizer":
+        return cls(**config)
+
+
+# Same splitting as rank_bm25 callers that used str.split()
+WHITESPACE_TOKENIZER = Tokenizer(pattern=r"\S+", lowercase=False)
+
+
+# =============================
+# 📚 Index
+# =============================
+
+class SparseBM25:
+    """
+    Okapi BM25 (same scoring as rank_bm25.BM25Okapi) over CSR posting lists.
+
+    Terms map to rows of `indptr`; each row lists the documents containing
+    the term (`doc_ids`) and its count in them (`tfs`). IDF per term and the
+    length norm k1 * (1 - b + b * len / avgdl) per document are computed
+    once at build time, so a query only touches the postings of its terms.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        terms: List[str],
+        tokenizer: Optional[Tokenizer] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        idf: Optional[np.ndarray] = None,
+        norms: Optional[np.ndarray] = None,
+    ):
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.terms = terms
+        self.tokenizer = tokenizer or Tokenizer()
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.idf = self._calc_idf() if idf is None else idf
+        self.norms = self._calc_norms() if norms is None else norms
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self.doc_len)
+
+    def _calc_idf(self) -> np.ndarray:
+        df = np.diff(self.indptr).astype(np.float64)
+        idf = np.log(self.corpus_size - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            # Floor negative idf (terms in over half the documents) like BM25Okapi
+            idf[idf < 0] = self.epsilon * idf.mean()
+        return idf
+
+    def _calc_norms(self) -> np.ndarray:
+        avgdl = self.doc_len.mean() if self.corpus_size else 0.0
+        if not avgdl:
+            avgdl = 1.0
+        return (self.k1 * (1 - self.b + self.b * self.doc_len / avgdl)).astype(np.float32)
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], tokenizer: Optional[Tokenizer] = None, **params) -> "SparseBM25":
+        tokenizer = tokenizer or Tokenizer()
+        return cls.from_tokens([tokenizer(text) for text in texts], tokenizer=tokenizer, **params)
+
+    @classmethod
+    def from_tokens(cls, corpus: Sequence[List[str]], tokenizer: Optional[Tokenizer] = None, **params) -> "SparseBM25":
+        if not len(corpus):
+            raise ValueError("❌ Cannot build a BM25 index over an empty corpus.")
+        vocab: Dict[str, int] = {}
+        terms, docs, doc_len = _encode_corpus(corpus, vocab, 0)
+        return cls._from_postings(terms, docs, np.ones(len(terms), dtype=np.int64), doc_len,
+                                  list(vocab), tokenizer=tokenizer, **params)
+
+    @classmethod
+    def _from_postings(cls, terms, docs, tfs, doc_len, vocab: List[str], **params) -> "SparseBM25":
+        """
+        Build from (term, doc, count) triples; repeated pairs are summed and
+        terms with no documents left are dropped from the vocabulary.
+        """
+        n_docs = len(doc_len)
+        keys = terms.astype(np.int64) * n_docs + docs
+        keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=tfs, minlength=len(keys))
+
+        post_terms = keys // n_docs
+        used = np.unique(post_terms)
+        remap = np.full(len(vocab), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+
+        indptr = np.zeros(len(used) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(remap[post_terms], minlength=len(used)), out=indptr[1:])
+        return cls(
+            indptr=indptr,
+            doc_ids=(keys % n_docs).astype(np.int32),
+            tfs=np.minimum(counts, MAX_TF).astype(np.uint16),
+            doc_len=np.asarray(doc_len, dtype=np.int32),
+            terms=[vocab[i] for i in used.tolist()],
+            **params,
+        )
+
+    def update(self, removed_positions: Sequence[int], added_texts: Sequence[str]) -> "SparseBM25":
+        """
+        New index without the documents at `removed_positions` and with
+        `added_texts` appended, re-using the existing postings.
+        """
+        n_docs = self.corpus_size
+        keep = np.ones(n_docs, dtype=bool)
+        keep[np.asarray(removed_positions, dtype=np.int64)] = False
+        new_position = np.cumsum(keep) - 1
+
+        terms = np.repeat(np.arange(len(self.terms)), np.diff(self.indptr))
+        kept = keep[self.doc_ids]
+        terms = terms[kept]
+        docs = new_position[self.doc_ids[kept]]
+        tfs = self.tfs[kept].astype(np.int64)
+
+        vocab = dict(self.vocab)
+        added_terms, added_docs, added_len = _encode_corpus([self.tokenizer(t) for t in added_texts], vocab, int(keep.sum()))
+        doc_len = np.concatenate([np.asarray(self.doc_len)[keep], added_len])
+        if not len(doc_len):
+            raise ValueError("❌ Cannot build a BM25 index over an empty corpus.")
+
+        return SparseBM25._from_postings(
+            np.concatenate([terms, added_terms]),
+            np.concatenate([docs, added_docs]),
+            np.concatenate([tfs, np.ones(len(added_terms), dtype=np.int64)]),
+            doc_len,
+            list(vocab),
+            tokenizer=self.tokenizer, k1=self.k1, b=self.b, epsilon=self.epsilon,
+        )
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+
+    def get_scores(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """
+        BM25 score of every document for already tokenized query terms.
+        """
+        docs, weights = [], []
+        k1 = np.float32(self.k1 + 1)
+        for token in query_tokens:
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = self.indptr[term], self.indptr[term + 1]
+            ids = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            docs.append(ids)
+            weights.append(self.idf[term] * (tf * k1 / (tf + self.norms[ids])))
+
+        if not docs:
+            return np.zeros(self.corpus_size)
+        return np.bincount(np.concatenate(docs), weights=np.concatenate(weights), minlength=self.corpus_size)
+
+    def get_scores_many(
+        self,
+        queries: Sequence[Sequence[str]],
+        term_idf: Optional[Dict[str, float]] = None,
+    ) -> np.ndarray:
+        """
+        (len(queries), corpus_size) score matrix for tokenized queries,
+        accumulated with a single bincount. `term_idf` overrides the idf of
+        the given terms (e.g. corpus-wide values when scoring one shard).
+        """
+        n_docs = self.corpus_size
+        cells, weights = [], []
+        k1 = np.float32(self.k1 + 1)
+        postings: Dict[int, tuple] = {}
+        for row, query_tokens in enumerate(queries):
+            for token in query_tokens:
+                term = self.vocab.get(token)
+                if term is None:
+                    continue
+                if term not in postings:
+                    start, end = self.indptr[term], self.indptr[term + 1]
+                    ids = self.doc_ids[start:end].astype(np.int64)
+                    tf = self.tfs[start:end].astype(np.float32)
+                    idf = self.idf[term] if term_idf is None else term_idf.get(token, self.idf[term])
+                    postings[term] = (ids, idf * (tf * k1 / (tf + self.norms[ids])))
+                ids, weight = postings[term]
+                cells.append(ids + row * n_docs)
+                weights.append(weight)
+
+        if not cells:
+            return np.zeros((len(queries), n_docs))
+        scores = np.bincount(np.concatenate(cells), weights=np.concatenate(weights), minlength=len(queries) * n_docs)
+        return scores.reshape(len(queries), n_docs)
+
+    def score(self, query: str) -> np.ndarray:
+        return self.get_scores(self.tokenizer(query))
+
+    def score_many(self, queries: Sequence[str], term_idf: Optional[Dict[str, float]] = None) -> np.ndarray:
+        return self.get_scores_many([self.tokenizer(query) for query in queries], term_idf=term_idf)
+
+    def document_frequencies(self, tokens: Sequence[str]) -> Dict[str, int]:
+        """
+        Number of documents containing each token (0 if unseen).
+        """
+        df = {}
+        for token in tokens:
+            term = self.vocab.get(token)
+            df[token] = 0 if term is None else int(self.indptr[term + 1] - self.indptr[term])
+        return df
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def to_arrays(self, prefix: str = "") -> Dict[str, np.ndarray]:
+        return {
+            f"{prefix}indptr": np.ascontiguousarray(self.indptr, dtype=np.int64),
+            f"{prefix}doc_ids": np.ascontiguousarray(self.doc_ids, dtype=np.int32),
+            f"{prefix}tfs": np.ascontiguousarray(self.tfs, dtype=np.uint16),
+            f"{prefix}doc_len": np.ascontiguousarray(self.doc_len, dtype=np.int32),
+            f"{prefix}idf": np.ascontiguousarray(self.idf, dtype=np.float64),
+            f"{prefix}norms": np.ascontiguousarray(self.norms, dtype=np.float32),
+            f"{prefix}terms": np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+        }
+
+    def params(self) -> dict:
+        return {"k1": self.k1, "b": self.b, "epsilon": self.epsilon, "tokenizer": self.tokenizer.config()}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], params: dict, prefix: str = "") -> "SparseBM25":
+        blob = bytes(arrays[f"{prefix}terms"])
+        return cls(
+            indptr=arrays[f"{prefix}indptr"],
+            doc_ids=arrays[f"{prefix}doc_ids"],
+            tfs=arrays[f"{prefix}tfs"],
+            doc_len=arrays[f"{prefix}doc_len"],
+            terms=blob.decode("utf-8").split("\n") if blob else [],
+            tokenizer=Tokenizer.from_config(params["tokenizer"]),
+            k1=params["k1"], b=params["b"], epsilon=params["epsilon"],
+            idf=arrays[f"{prefix}idf"],
+            norms=arrays[f"{prefix}norms"],
+        )
+
+    def save(self, path: str):
+        """
+        Single file of 64-byte aligned raw arrays (see src/arrayfile.py).
+        """
+        write_arrays(path, MAGIC, self.params(), self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "SparseBM25":
+        header, arrays = read_arrays(path, MAGIC, mmap=mmap)
+        return cls.from_arrays(arrays, header)
+
+
+def _encode_corpus(corpus: Sequence[List[str]], vocab: Dict[str, int], first_doc: int):
+    """
+    Flatten tokenized documents into parallel (term id, doc id) arrays,
+    adding unseen terms to `vocab`.
+    """
+    term_ids: List[int] = []
+    doc_len = np.zeros(len(corpus), dtype=np.int64)
+    setdefault = vocab.setdefault
+    for i, document in enumerate(corpus):
+        for token in document:
+            term_ids.append(setdefault(token, len(vocab)))
+        doc_len[i] = len(document)
+    docs = np.repeat(np.arange(first_doc, first_doc + len(corpus), dtype=np.int64), doc_len)
+    return np.asarray(term_ids, dtype=np.int64), docs, doc_len
+
+
+def load_bm25(path: str):
+    """
+    Load a saved SparseBM25 (memory-mapped), or a legacy pickled BM25Okapi.
+    """
+    with open(path, "rb") as f:
+        is_sparse = f.read(len(MAGIC)) == MAGIC
+    if is_sparse:
+        return SparseBM25.load(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from src.cache_lock import domain_lock
+from src.cache_manager import cache_manager
+from src.chunker import chunk_html
+from src.crawler import conditional_fetch, crawl_site_structured
+from src.domain_inserter import prepare_chunks
+from src.embedding_cache import EmbeddingCache
+from src.global_index import GlobalIndex
+from src.model_registry import model_registry
+from src.storage import load_http_validators, save_http_validators, save_raw_text
+from src.vectorstore import (
+    embedding_cache,
+    embedding_model,
+    get_text_chunks,
+    persist_chunks_to_vectorstore,
+    vectorstore_exists,
+)
+
+FETCH_CONCURRENCY = 16
+HOST_RATE_LIMIT = 1.0      # requests per second per host
+EMBED_BATCH_SIZE = 256     # chunks per embedding_model.encode call
+EMBED_BATCH_WAIT = 0.5     # seconds to wait for more domains before encoding a partial batch
+
+
+# =============================
+# 📋 Inputs & checkpoints
+# =============================
+
+def as_url(domain: str) -> str:
+    """
+    Give a bare domain ("acme.com") an https:// scheme, so it can be
+    fetched and rate limited by its host.
+    """
+    return domain if "://" in domain else f"https://{domain}"
+
+
+def read_domains(path: str) -> List[str]:
+    """
+    One domain per line; blank lines and '#' comments are ignored.
+    """
+    domains = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            domain = line.split("#", 1)[0].strip()
+            if domain and domain not in seen:
+                seen.add(domain)
+                domains.append(domain)
+    return domains
+
+
+class Checkpoint:
+    """
+    Append-only JSONL manifest of finished domains. Re-running with the
+    same manifest skips everything already marked "done".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.status: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    self.status[entry["domain"]] = entry
+
+    def is_done(self, domain: str) -> bool:
+        return self.status.get(domain, {}).get("status") == "done"
+
+    def mark(self, domain: str, status: str, **info):
+        entry = {"domain": domain, "status": status, "time": time.time(), **info}
+        self.status[domain] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+
+
+class StageStats:
+    """
+    Item count and active window of one pipeline stage.
+    """
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.count = 0
+        self.busy = 0.0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def record(self, start: float, count: int = 1):
+        end = time.perf_counter()
+        self.count += count
+        self.busy += end - start
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    @property
+    def rate(self) -> float:
+        if not self.count or self.last_end is None:
+            return 0.0
+        return self.count / max(self.last_end - self.first_start, 1e-9)
+
+    def as_dict(self) -> dict:
+        return {"items": self.count, "unit": self.unit, "busy_sec": round(self.busy, 3), "per_sec": round(self.rate, 2)}
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by at least 1 / rate seconds,
+    whether they wait on the event loop or on a crawler thread.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, url: str) -> float:
+        # Seconds until this request's slot
+        host = urlparse(as_url(url)).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, 0.0))
+            self.next_slot[host] = slot + self.interval
+        return slot - now
+
+    async def wait(self, url: str):
+        if self.interval:
+            delay = self._reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def wait_blocking(self, url: str):
+        if self.interval:
+            delay = self._reserve(url)
+            if delay > 0:
+                time.sleep(delay)
+
+
+# =============================
+# 🏭 Pipeline
+# =============================
+
+class BulkIngestor:
+    """
+    Fetch → parse → embed → write pipeline over many domains.
+
+    Fetches run concurrently on the event loop (pooled sessions in worker
+    threads, rate limited per host), HTML is chunked in a process pool, and
+    chunks from several domains are embedded together in large batches
+    before each domain's indexes are written. Chunks found in the embedding
+    cache are not re-encoded; pass cache=None to always encode.
+
+    With incremental=True, known domains are revalidated with their stored
+    ETag / Last-Modified (a 304 skips the domain) and their indexes are
+    updated in place rather than rebuilt.
+    """
+
+    def __init__(
+        self,
+        manifest_path: str,
+        crawl: bool = False,
+        fetch_concurrency: int = FETCH_CONCURRENCY,
+        host_rate: float = HOST_RATE_LIMIT,
+        parse_workers: Optional[int] = None,
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        embed_batch_wait: float = EMBED_BATCH_WAIT,
+        encode: Optional[Callable] = None,
+        cache: Optional[EmbeddingCache] = embedding_cache,
+        incremental: bool = False,
+    ):
+        self.checkpoint = Checkpoint(manifest_path)
+        self.crawl = crawl
+        self.fetch_concurrency = fetch_concurrency
+        self.limiter = HostRateLimiter(host_rate)
+        self.parse_workers = parse_workers
+        self.embed_batch_size = embed_batch_size
+        self.embed_batch_wait = embed_batch_wait
+        self.encode = encode
+        self.cache = cache
+        self.incremental = incremental
+        self.unchanged = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.stats = {
+            "fetch": StageStats("fetch", "pages"),
+            "parse": StageStats("parse", "pages"),
+            "embed": StageStats("embed", "chunks"),
+            "write": StageStats("write", "domains"),
+        }
+
+    def run(self, domains: Iterable[str]) -> dict:
+        # Bare domains are fetched, rate limited and checkpointed as https:// URLs
+        return asyncio.run(self._run(list(dict.fromkeys(as_url(d) for d in domains))))
+
+    async def _run(self, domains: List[str]) -> dict:
+        todo = [d for d in domains if not self.checkpoint.is_done(d)]
+        skipped = len(domains) - len(todo)
+        print(f"📦 Bulk ingest: {len(todo)} domain(s) to process, {skipped} already done")
+
+        started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(self.embed_batch_size, 1))
+        fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+
+        if self.encode is None:
+            # Load the model while the first pages are fetched
+            model_registry.warm_up(["embedding"])
+        parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers) if self.parse_workers != 0 else None
+        try:
+            embedder = asyncio.create_task(self._embed_and_write(queue))
+            await asyncio.gather(*(self._produce(d, fetch_slots, parse_pool, queue) for d in todo))
+            await queue.put(None)
+            await embedder
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+
+        # Size the new bundles and trim the cache to its quota
+        cache_manager.flush()
+
+        done = sum(1 for d in todo if self.checkpoint.is_done(d))
+        report = {
+            "domains": len(domains),
+            "skipped": skipped,
+            "done": done,
+            "failed": len(todo) - done,
+            "unchanged": self.unchanged,
+            "elapsed_sec": round(time.perf_counter() - started, 3),
+            "stages": {name: s.as_dict() for name, s in self.stats.items()},
+            "embedding_cache": {
+                "hits": self.cache_hits,
+                "lookups": self.cache_lookups,
+                "hit_rate": round(self.cache_hits / self.cache_lookups, 4) if self.cache_lookups else 0.0,
+            },
+        }
+        print_report(report)
+        return report
+
+    async def _produce(self, domain: str, fetch_slots: asyncio.Semaphore, parse_pool, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        try:
+            # Wait for the host's turn before taking a slot, so slow hosts do not hold slots idle
+            await self.limiter.wait(domain)
+            async with fetch_slots:
+                start = time.perf_counter()
+                if self.crawl:
+                    # The crawler fetches and chunks its own pages; each subpage waits for the host too
+                    def throttle(url: str):
+                        if url != domain:
+                            self.limiter.wait_blocking(url)
+
+                    structured = await asyncio.to_thread(crawl_site_structured, domain, throttle=throttle)
+                    self.stats["fetch"].record(start, len({c.get("url") for c in structured}))
+                else:
+                    known = None
+                    if self.incremental and vectorstore_exists(domain):
+                        known = load_http_validators(domain)
+                    _, html, validators = await asyncio.to_thread(conditional_fetch, domain, known)
+                    self.stats["fetch"].record(start)
+                    if html is None:
+                        self.unchanged += 1
+                        self.checkpoint.mark(domain, "done", unchanged=True)
+                        cache_manager.record_ingest(domain, flush=False, crawl=self.crawl)
+                        return
+
+            if not self.crawl:
+                start = time.perf_counter()
+                structured = await loop.run_in_executor(parse_pool, chunk_html, html)
+                self.stats["parse"].record(start)
+
+            if not structured:
+                raise ValueError("No <body> found on page" if structured is None else "No chunks extracted")
+            if structured[0].get("tag") == "Error":
+                raise ValueError(structured[0]["text"])
+
+            chunks = prepare_chunks(structured)
+            texts = get_text_chunks(chunks)
+            if not texts:
+                raise ValueError("No valid chunks extracted")
+        except Exception as e:
+            print(f"⚠️ {domain}: {e}")
+            self.checkpoint.mark(domain, "failed", error=str(e))
+            return
+
+        await queue.put((domain, structured, chunks, texts, None if self.crawl else validators))
+
+    async def _embed_and_write(self, queue: asyncio.Queue):
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            size = len(item[3])
+
+            # Top up the batch with other domains that are ready (or about to be)
+            deadline = time.monotonic() + self.embed_batch_wait
+            while size < self.embed_batch_size:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+                size += len(item[3])
+
+            await self._embed_batch(batch)
+
+    async def _embed_batch(self, batch: list):
+        all_texts = [text for _, _, _, texts, _ in batch for text in texts]
+        start = time.perf_counter()
+        try:
+            vectors = await asyncio.to_thread(self._encode, all_texts)
+        except Exception as e:
+            for domain, *_ in batch:
+                print(f"⚠️ {domain}: embedding failed: {e}")
+                self.checkpoint.mark(domain, "failed", error=f"embedding failed: {e}")
+            return
+        vectors = np.asarray(vectors, dtype="float32")
+        self.stats["embed"].record(start, len(all_texts))
+
+        offset = 0
+        for domain, structured, chunks, texts, validators in batch:
+            domain_vectors = vectors[offset:offset + len(texts)]
+            offset += len(texts)
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write_domain, domain, structured, chunks, domain_vectors, validators)
+            except Exception as e:
+                print(f"⚠️ {domain}: write failed: {e}")
+                self.checkpoint.mark(domain, "failed", error=f"write failed: {e}")
+                continue
+            self.stats["write"].record(start)
+            self.checkpoint.mark(domain, "done", chunks=len(texts))
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if self.cache is None:
+            return (self.encode or embedding_model.encode)(texts)
+        hits = self.cache.hits
+        vectors = self.cache.encode(texts, self.encode or embedding_model.encode)
+        self.cache_hits += self.cache.hits - hits
+        self.cache_lookups += len(texts)
+        return vectors
+
+    def _write_domain(self, domain: str, structured: list, chunks: list, vectors: np.ndarray, validators: Optional[dict]):
+        # Raw scrape, index and validators are published together
+        with domain_lock(domain):
+            save_raw_text(domain, structured)
+            persist_chunks_to_vectorstore(chunks, domain, embeddings=vectors, incremental=self.incremental)
+            if validators is not None:
+                save_http_validators(domain, validators)
+        cache_manager.record_ingest(domain, flush=False, crawl=self.crawl)
+
+
+def ingest_domains(domains: Iterable[str], manifest_path: str, **options) -> dict:
+    """
+    Python entry point: ingest many domains and return the run report.
+    See BulkIngestor for the available options.
+    """
+    return BulkIngestor(manifest_path, **options).run(domains)
+
+
+def print_report(report: dict):
+    print(f"\n✅ Done {report['done']} / failed {report['failed']} / skipped {report['skipped']} "
+          f"in {report['elapsed_sec']:.1f}s")
+    if report.get("unchanged"):
+        print(f"♻️ {report['unchanged']} domain(s) not modified since the last ingest")
+    print(f"{'stage':<8}{'items':>10}  {'unit':<8}{'busy s':>10}{'per s':>10}")
+    for name, s in report["stages"].items():
+        print(f"{name:<8}{s['items']:>10}  {s['unit']:<8}{s['busy_sec']:>10.2f}{s['per_sec']:>10.2f}")
+    cache = report.get("embedding_cache")
+    if cache and cache["lookups"]:
+        print(f"🧠 Embedding cache: {cache['hits']}/{cache['lookups']} chunks reused ({cache['hit_rate']:.1%})")
+
+
+# =============================
+# 🖥️ CLI
+# =============================
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest a file of lead domains into the vectorstore.")
+    parser.add_argument("domains_file", help="text file with one domain per line")
+    parser.add_argument("--manifest", help="checkpoint manifest (default: <domains_file>.manifest.jsonl)")
+    parser.add_argument("--crawl", action="store_true", help="crawl same-domain subpages as well")
+    parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY, help="concurrent fetches")
+    parser.add_argument("--host-rate", type=float, default=HOST_RATE_LIMIT, help="max requests/sec per host (0 = unlimited)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parser processes (0 = parse in threads)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--incremental", action="store_true", help="update known domains in place, skipping unmodified pages")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="re-encode every chunk")
+    parser.add_argument("--global-index", action="store_true", help="also append the domains to the cross-domain index")
+    args = parser.parse_args(argv)
+
+    domains = read_domains(args.domains_file)
+    report = ingest_domains(
+        domains,
+        manifest_path=args.manifest or f"{args.domains_file}.manifest.jsonl",
+        crawl=args.crawl,
+        fetch_concurrency=args.concurrency,
+        host_rate=args.host_rate,
+        parse_workers=args.parse_workers,
+        embed_batch_size=args.batch_size,
+        cache=None if args.no_embedding_cache else embedding_cache,
+        incremental=args.incremental,
+    )
+    if args.global_index:
+        GlobalIndex().add_domains(domains)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
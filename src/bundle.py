@@ -0,0 +1,214 @@
+import hashlib
+import os
+import pickle
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from src.ann import get_meta_path, load_index_meta
+from src.arrayfile import TextColumn, read_arrays, read_header, write_arrays
+from src.bm25 import SparseBM25, load_bm25
+from src.cache_lock import domain_lock
+from src.chunk_metadata import ChunkMetadata
+from src.model_registry import lazy_import
+from src.utils import get_bundle_path, get_cache_paths, get_metadata_path
+
+faiss = lazy_import("faiss")
+
+BUNDLE_MAGIC = b"LGBUNDLE"
+BUNDLE_VERSION = 1
+
+
+def chunk_id(text: str) -> int:
+    """
+    Stable signed 64-bit content hash, used as the chunk's FAISS id.
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class DomainBundle:
+    """
+    Everything retrieval needs for one domain, in a single file (an
+    src/arrayfile.py container with a crc32 per array):
+
+    - faiss: the serialised FAISS index; header "index_params" as recorded
+      by build_index (null for legacy exact-L2 indexes)
+    - ids: the FAISS id of each chunk (content hash, or position for
+      indexes without an ID map)
+    - bm25.*: SparseBM25 arrays; header "bm25" holds its parameters
+    - chunks.offsets / chunks.blob: chunk texts as a TextColumn
+    - meta.*: ChunkMetadata columns; header "metadata" (absent if unknown)
+
+    The file is replaced atomically on every write, so a reader never
+    sees a mix of two versions. Opening maps it: ids, BM25 postings,
+    texts and metadata stay on disk until used (texts and titles are only
+    decoded when a chunk is returned). The FAISS index is deserialized
+    onto the heap, as faiss cannot read it from inside the container.
+    """
+
+    def __init__(
+        self,
+        index: "faiss.Index",
+        index_params: Optional[dict],
+        ids: np.ndarray,
+        bm25: SparseBM25,
+        chunks: Union[TextColumn, Sequence[str]],
+        metadata: Optional[ChunkMetadata] = None,
+    ):
+        self.index = index
+        self.index_params = index_params
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.bm25 = bm25
+        self.chunks = chunks if isinstance(chunks, TextColumn) else TextColumn.from_texts(chunks)
+        self.metadata = metadata
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def save(self, path: str):
+        header = {
+            "version": BUNDLE_VERSION,
+            "chunks": len(self.chunks),
+            "index_params": self.index_params,
+            "bm25": self.bm25.params(),
+        }
+        arrays = {
+            "faiss": faiss.serialize_index(self.index),
+            "ids": self.ids,
+            **self.bm25.to_arrays("bm25."),
+            **self.chunks.to_arrays("chunks"),
+        }
+        if self.metadata is not None:
+            header["metadata"], meta_arrays = self.metadata.to_arrays("meta.")
+            arrays.update(meta_arrays)
+        write_arrays(path, BUNDLE_MAGIC, header, arrays)
+
+    @classmethod
+    def open(cls, path: str, verify: bool = False) -> "DomainBundle":
+        """
+        Map a bundle. verify=True checks every array's checksum first,
+        which reads the whole file; the query path skips it (see verify_bundle).
+        """
+        header, arrays = read_arrays(path, BUNDLE_MAGIC, verify=verify)
+        if header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {header.get('version')} in {path}")
+        index = faiss.deserialize_index(np.asarray(arrays["faiss"]))
+        metadata = None
+        if "metadata" in header:
+            metadata = ChunkMetadata.from_arrays(header["metadata"], arrays, "meta.")
+        return cls(
+            index=index,
+            index_params=header["index_params"],
+            ids=arrays["ids"],
+            bm25=SparseBM25.from_arrays(arrays, header["bm25"], "bm25."),
+            chunks=TextColumn.from_arrays(arrays, "chunks"),
+            metadata=metadata,
+        )
+
+    @staticmethod
+    def read_header(path: str) -> dict:
+        return read_header(path, BUNDLE_MAGIC)[0]
+
+
+# =============================
+# 🗂️ Per-domain access
+# =============================
+
+def legacy_cache_exists(domain: str) -> bool:
+    return all(os.path.exists(path) for path in get_cache_paths(domain))
+
+
+def bundle_exists(domain: str) -> bool:
+    return os.path.exists(get_bundle_path(domain)) or legacy_cache_exists(domain)
+
+
+def bundle_version(domain: str) -> Optional[tuple]:
+    """
+    (mtime_ns, size) of the domain's bundle, or of its legacy cache
+    files until the first load migrates them; None if there are none.
+    A bundle is only ever replaced whole, so this changes on every publish.
+    """
+    try:
+        stat = os.stat(get_bundle_path(domain))
+        return ((stat.st_mtime_ns, stat.st_size),)
+    except FileNotFoundError:
+        pass
+    try:
+        stats = [os.stat(path) for path in get_cache_paths(domain)]
+    except FileNotFoundError:
+        return None
+    return tuple((s.st_mtime_ns, s.st_size) for s in stats)
+
+
+def migrate_legacy_cache(domain: str) -> bool:
+    """
+    Convert a domain's pre-bundle files (FAISS index, BM25 and chunk
+    pickles, optional metadata) into a bundle and remove them.
+    Returns False when there is nothing to migrate.
+    """
+    with domain_lock(domain):
+        # Another reader may have migrated it while we waited
+        if not legacy_cache_exists(domain):
+            return False
+        _migrate(domain)
+    return True
+
+
+def _migrate(domain: str):
+    faiss_path, bm25_path, chunks_path = get_cache_paths(domain)
+    index = faiss.read_index(faiss_path)
+    index_params = load_index_meta(faiss_path)
+    with open(chunks_path, "rb") as f:
+        chunks = pickle.load(f)
+
+    bm25 = load_bm25(bm25_path)
+    if not isinstance(bm25, SparseBM25) or bm25.corpus_size != len(chunks):
+        # Pickled rank_bm25 model: re-index the texts
+        bm25 = SparseBM25.from_texts(chunks)
+    if isinstance(index, faiss.IndexIDMap):
+        ids = np.array([chunk_id(text) for text in chunks], dtype=np.int64)
+    else:
+        ids = np.arange(len(chunks), dtype=np.int64)
+
+    metadata = None
+    metadata_path = get_metadata_path(domain)
+    if os.path.exists(metadata_path):
+        metadata = ChunkMetadata.load_legacy(metadata_path)
+        if len(metadata) != len(chunks):
+            metadata = None
+
+    DomainBundle(index, index_params, ids, bm25, chunks, metadata).save(get_bundle_path(domain))
+    # The legacy files are only removed once the bundle reads back intact
+    DomainBundle.open(get_bundle_path(domain), verify=True)
+    for path in (faiss_path, get_meta_path(faiss_path), bm25_path, chunks_path, metadata_path):
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"📦 Migrated legacy cache of {domain} to {get_bundle_path(domain)}")
+
+
+def load_domain_bundle(domain: str, verify: bool = False) -> DomainBundle:
+    """
+    The domain's bundle, migrating legacy cache files on first use.
+    """
+    path = get_bundle_path(domain)
+    if not os.path.exists(path):
+        migrate_legacy_cache(domain)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"⚠️ Preprocessed data for domain '{domain}' not found.")
+    return DomainBundle.open(path, verify=verify)
+
+
+def verify_bundle(domain: str) -> Optional[str]:
+    """
+    Check every checksum in the domain's bundle; returns the problem, or
+    None if it is intact (or there is no bundle).
+    """
+    path = get_bundle_path(domain)
+    if not os.path.exists(path):
+        return None
+    try:
+        DomainBundle.open(path, verify=True)
+    except (ValueError, KeyError) as e:  # ChecksumError is a ValueError
+        return str(e)
+    return None
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only exclude writers within this process
+    fcntl = None
+
+from src.utils import CACHE_DIR, cache_key
+
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+GLOBAL_INDEX_LOCK = "_global_index"
+
+T = TypeVar("T")
+
+
+# =============================
+# ✍️ Atomic publishes
+# =============================
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: str = "utf-8") -> Iterator[Any]:
+    """
+    Open a uniquely named temp file next to `path`; on a clean exit it is
+    fsynced and renamed over `path`, so readers see either the previous
+    file or the complete new one. On error the temp file is removed and
+    `path` is left untouched.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# =============================
+# 🔒 Writer locks
+# =============================
+
+class _NamedLock:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+
+_locks: Dict[str, _NamedLock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_file(name: str):
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    f = open(os.path.join(LOCK_DIR, f"{name}.lock"), "a+b")
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    return f
+
+
+@contextmanager
+def cache_lock(name: str) -> Iterator[None]:
+    """
+    Exclusive writer lock on `name`: a thread lock within this process
+    plus an advisory flock on cache/locks/<name>.lock across processes.
+    Re-entrant within a thread. Readers never take it; they keep using
+    the last published file.
+    """
+    with _locks_guard:
+        named = _locks.setdefault(name, _NamedLock())
+    with named.lock:
+        if named.depth == 0:
+            named.file = _lock_file(name)
+        named.depth += 1
+        try:
+            yield
+        finally:
+            named.depth -= 1
+            if named.depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(named.file.fileno(), fcntl.LOCK_UN)
+                named.file.close()
+                named.file = None
+
+
+def domain_lock(domain: str):
+    """
+    Writer lock for everything stored per domain (bundle, raw scrape,
+    HTTP validators).
+    """
+    return cache_lock(cache_key(domain))
+
+
+# =============================
+# 🛫 Single-flight
+# =============================
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first
+    caller runs the function, callers arriving while it runs wait for it
+    and get its result (or its exception). Later calls run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
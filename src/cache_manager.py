@@ -0,0 +1,449 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.bundle import verify_bundle
+from src.cache_lock import atomic_write, cache_lock, domain_lock
+from src.llm_cache import llm_cache
+from src.snapshot_store import snapshot_store
+from src.storage import RAW_DIR, get_raw_path, get_validators_path
+from src.utils import CACHE_DIR, cache_key, get_bundle_path, get_cache_paths, get_metadata_path
+
+CACHE_INDEX_PATH = os.path.join(CACHE_DIR, "cache_index.json")
+CACHE_INDEX_LOCK = "_cache_index"
+CACHE_INDEX_VERSION = 1
+
+DISK_QUOTA_BYTES = 5 * 1024 ** 3       # bundles + raw scrapes (with their shared text packs) + validators
+REFRESH_TTL_SEC = 7 * 24 * 3600        # re-scrape domains older than this
+REFRESH_INTERVAL_SEC = 15 * 60         # how often the scheduler looks for stale domains
+MAX_REFRESHES_PER_CYCLE = 10
+ACCESS_FLUSH_SEC = 30                  # merge buffered accesses at most this often
+
+
+def domain_files(domain: str) -> List[str]:
+    """
+    Every per-domain file the cache may hold: the bundle, legacy index
+    files, raw scrape snapshots and the HTTP validators. Texts in the
+    shared snapshot packs belong to no single domain and are not listed;
+    they count against the quota as a whole (see enforce_quota).
+    """
+    faiss_path, bm25_path, chunks_path = get_cache_paths(domain)
+    return [
+        get_bundle_path(domain),
+        faiss_path, f"{faiss_path}.meta.json", bm25_path, chunks_path, get_metadata_path(domain),
+        get_raw_path(domain),
+        get_validators_path(domain),
+        *snapshot_store.files(domain),
+    ]
+
+
+def _signature(domain: str) -> tuple:
+    signature = []
+    for path in domain_files(domain):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _new_entry(domain: str) -> dict:
+    return {"domain": domain, "bytes": 0, "accesses": 0, "recent_accesses": 0,
+            "last_access": 0.0, "last_scrape": 0.0, "last_attempt": 0.0, "crawl": False}
+
+
+def _measure(domain: str) -> dict:
+    """
+    A fresh entry sized from the domain's files, last scraped when they
+    were last written.
+    """
+    signature = _signature(domain)
+    entry = _new_entry(domain)
+    entry["bytes"] = sum(size for _, _, size in signature)
+    entry["last_scrape"] = max((mtime for _, mtime, _ in signature), default=0) / 1e9
+    return entry
+
+
+class CacheManager:
+    """
+    Per-domain bookkeeping for the on-disk cache, in cache/cache_index.json:
+    size, access count, last access, last scrape and ingest mode of each
+    domain, so quota and staleness checks never list the cache directories.
+
+    Accesses and ingests are buffered in memory and merged into the index
+    (under a lock, on a fresh read, so several processes can share it) at
+    most every `flush_sec`, or on flush(). Each flush enforces the disk
+    quota by evicting the least recently used domains' files.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_INDEX_PATH,
+        quota_bytes: int = DISK_QUOTA_BYTES,
+        ttl_sec: float = REFRESH_TTL_SEC,
+        flush_sec: float = ACCESS_FLUSH_SEC,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.quota_bytes = quota_bytes
+        self.ttl_sec = ttl_sec
+        self.flush_sec = flush_sec
+        self.clock = clock
+        self.evictions = 0
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+    # -----------------------------
+    # Index file
+    # -----------------------------
+
+    def _read(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return self._scan()
+        with open(self.path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != CACHE_INDEX_VERSION:
+            print(f"⚠️ Rebuilding cache index with unexpected version {index.get('version')}")
+            return self._scan()
+        return index["domains"]
+
+    def _write(self, entries: Dict[str, dict]):
+        with atomic_write(self.path) as f:
+            json.dump({"version": CACHE_INDEX_VERSION, "domains": entries}, f)
+
+    @staticmethod
+    def _scan() -> Dict[str, dict]:
+        """
+        Seed the index from files cached before it existed. Only the cache
+        key is known for those, so it doubles as the domain name.
+        """
+        keys = set()
+        for pattern, suffix in (
+            (os.path.join(CACHE_DIR, "*.bundle"), ".bundle"),
+            (os.path.join(CACHE_DIR, "*_chunks.pkl"), "_chunks.pkl"),
+            (os.path.join(RAW_DIR, "*.txt"), ".txt"),
+        ):
+            keys.update(os.path.basename(path)[:-len(suffix)] for path in glob.glob(pattern))
+
+        return {key: _measure(key) for key in sorted(keys)}
+
+    # -----------------------------
+    # Recording
+    # -----------------------------
+
+    def _touch(self, domain: str) -> dict:
+        update = self._pending.get(cache_key(domain))
+        if update is None:
+            update = self._pending[cache_key(domain)] = {"domain": domain, "accesses": 0}
+        return update
+
+    def record_access(self, domain: str):
+        """
+        Count a retrieval from the domain's cache (cheap: buffered).
+        """
+        with self._lock:
+            update = self._touch(domain)
+            update["accesses"] += 1
+            update["last_access"] = self.clock()
+        self._flush_if_due()
+
+    def record_ingest(self, domain: str, flush: bool = True, crawl: Optional[bool] = None):
+        """
+        Note a fresh scrape of the domain (a 304 counts too), and whether
+        it crawled the site's subpages (None keeps the recorded mode). Its
+        size is re-measured on the next flush, which is immediate unless
+        flush=False.
+        """
+        with self._lock:
+            update = self._touch(domain)
+            update["last_scrape"] = self.clock()
+            if crawl is not None:
+                update["crawl"] = crawl
+        if flush:
+            self.flush()
+        else:
+            self._flush_if_due()
+
+    def record_attempt(self, domain: str):
+        """
+        Note a refresh that failed, so the domain is retried a TTL later
+        rather than on every scheduler cycle.
+        """
+        with self._lock:
+            self._touch(domain)["last_attempt"] = self.clock()
+
+    def _flush_if_due(self):
+        if self.clock() - self._last_flush >= self.flush_sec:
+            self.flush()
+
+    def flush(self) -> List[str]:
+        """
+        Merge buffered updates into the index and enforce the quota.
+        Returns the evicted domains.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = self.clock()
+
+        with cache_lock(CACHE_INDEX_LOCK):
+            entries = self._read()
+            for key, update in pending.items():
+                entry = entries.get(key)
+                if entry is None:
+                    entry = entries[key] = _measure(update["domain"])
+                entry["domain"] = update["domain"]
+                if "last_scrape" in update:
+                    entry["bytes"] = _measure(update["domain"])["bytes"]
+                    entry["last_scrape"] = update["last_scrape"]
+                    entry["recent_accesses"] = 0
+                if "crawl" in update:
+                    entry["crawl"] = update["crawl"]
+                entry["accesses"] += update["accesses"]
+                entry["recent_accesses"] += update["accesses"]
+                entry["last_access"] = max(entry["last_access"], update.get("last_access", 0.0))
+                entry["last_attempt"] = max(entry["last_attempt"], update.get("last_attempt", 0.0))
+            self._write(entries)
+        return self.enforce_quota(protect=set(pending))
+
+    # -----------------------------
+    # Quota & staleness
+    # -----------------------------
+
+    def entries(self) -> Dict[str, dict]:
+        # Lock-free: the index is only ever replaced whole
+        return self._read()
+
+    def crawl_mode(self, domain: str) -> bool:
+        """
+        Whether the domain was last ingested with crawl=True, so a refresh
+        re-scrapes the same pages.
+        """
+        return self.entries().get(cache_key(domain), {}).get("crawl", False)
+
+    def total_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self.entries().values()) + snapshot_store.objects_bytes()
+
+    def enforce_quota(self, protect: Optional[set] = None) -> List[str]:
+        """
+        Evict least recently used domains (by last access or scrape) until
+        the cache fits the quota. Keys in `protect` are kept. The shared
+        snapshot packs count too: texts no snapshot references any more
+        are compacted away before evicting, and after each round of
+        evictions.
+        """
+        if self.total_bytes() <= self.quota_bytes:
+            return []
+        snapshot_store.compact()
+
+        evicted = []
+        while True:
+            entries = self.entries()
+            domain_bytes = sum(entry["bytes"] for entry in entries.values())
+            shared_bytes = snapshot_store.objects_bytes()
+            total = domain_bytes + shared_bytes
+            if total <= self.quota_bytes:
+                break
+            # Until the next compaction, assume each domain holds its share of the packs
+            shared_share = shared_bytes / domain_bytes if domain_bytes else 0.0
+            by_recency = sorted(entries.items(), key=lambda item: max(item[1]["last_access"], item[1]["last_scrape"]))
+            round_evicted = []
+            for key, entry in by_recency:
+                if total <= self.quota_bytes:
+                    break
+                if protect and key in protect:
+                    continue
+                if self.evict(entry["domain"], expected=_signature(entry["domain"])):
+                    total -= entry["bytes"] * (1 + shared_share)
+                    round_evicted.append(entry["domain"])
+            if not round_evicted:
+                break
+            evicted += round_evicted
+            # Evicted domains' texts only leave the shared packs on compaction
+            snapshot_store.compact()
+        if evicted:
+            print(f"🧹 Cache over quota: evicted {len(evicted)} domain(s), {self.total_bytes() / 1024 ** 2:.1f} MB left")
+        return evicted
+
+    def evict(self, domain: str, expected: Optional[tuple] = None) -> bool:
+        """
+        Delete the domain's cached files and forget it. With `expected`
+        (a snapshot of its files), nothing is deleted if a writer published
+        a new version since the snapshot.
+        """
+        with domain_lock(domain):
+            if expected is not None and _signature(domain) != expected:
+                return False
+            for path in domain_files(domain):
+                if os.path.exists(path):
+                    os.remove(path)
+            snapshot_store.remove(domain)
+            llm_cache.invalidate(domain)
+        with cache_lock(CACHE_INDEX_LOCK):
+            entries = self._read()
+            entries.pop(cache_key(domain), None)
+            self._write(entries)
+        self.evictions += 1
+        return True
+
+    def stale_domains(self, min_accesses: int = 0) -> List[str]:
+        """
+        Domains last scraped (or last tried) more than a TTL ago, most
+        accessed since their last scrape first.
+        """
+        now = self.clock()
+        stale = [
+            entry for entry in self.entries().values()
+            if now - max(entry["last_scrape"], entry["last_attempt"]) >= self.ttl_sec
+            and entry["recent_accesses"] >= min_accesses
+        ]
+        stale.sort(key=lambda entry: (-entry["recent_accesses"], -entry["last_access"]))
+        return [entry["domain"] for entry in stale]
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "domains": len(entries),
+            "bytes": sum(entry["bytes"] for entry in entries.values()),
+            "snapshot_objects_bytes": snapshot_store.objects_bytes(),
+            "quota_bytes": self.quota_bytes,
+            "stale": len(self.stale_domains()),
+            "evictions": self.evictions,
+        }
+
+
+# =============================
+# 🔁 Background refresh
+# =============================
+
+def _refresh_domain(domain: str, crawl: bool = False):
+    # Imported here so the cache manager itself does not load the embedding model
+    from src.domain_inserter import insert_domain
+    return insert_domain(domain, crawl=crawl, incremental=True)
+
+
+class RefreshScheduler:
+    """
+    Background thread that every `interval_sec` re-ingests up to
+    `max_per_cycle` stale domains, hottest first. Refreshes take the
+    incremental path: a 304 or an unchanged page costs one request and no
+    embedding, and changed pages only re-embed the chunks that differ.
+    Crawled domains are re-crawled, so their subpages are kept.
+    Domains accessed fewer than `min_accesses` times since their last
+    scrape are left stale until someone asks for them.
+    """
+
+    def __init__(
+        self,
+        manager: CacheManager,
+        refresh: Callable[[str, bool], object] = _refresh_domain,
+        interval_sec: float = REFRESH_INTERVAL_SEC,
+        max_per_cycle: int = MAX_REFRESHES_PER_CYCLE,
+        min_accesses: int = 1,
+    ):
+        self.manager = manager
+        self.refresh = refresh
+        self.interval_sec = interval_sec
+        self.max_per_cycle = max_per_cycle
+        self.min_accesses = min_accesses
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> dict:
+        self.manager.flush()
+        counts = {"refreshed": 0, "unchanged": 0, "failed": 0}
+        for domain in self.manager.stale_domains(self.min_accesses)[:self.max_per_cycle]:
+            try:
+                result = self.refresh(domain, self.manager.crawl_mode(domain))
+            except Exception as e:
+                result = f"[Error] {e}"
+            if result == "success":
+                counts["refreshed"] += 1
+            elif result == "unchanged":
+                counts["unchanged"] += 1
+            else:
+                print(f"⚠️ Refresh failed for {domain}: {result}")
+                counts["failed"] += 1
+                self.manager.record_attempt(domain)
+        self.manager.flush()
+        if any(counts.values()):
+            print(f"🔁 Cache refresh: {counts}")
+        return counts
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Cache refresh cycle failed: {e}")
+            self._stop.wait(self.interval_sec)
+
+    def start(self) -> "RefreshScheduler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="cache-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+cache_manager = CacheManager()
+
+
+# =============================
+# 🖥️ CLI
+# =============================
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Inspect, trim and refresh the per-domain cache.")
+    parser.add_argument("--quota-gb", type=float, default=DISK_QUOTA_BYTES / 1024 ** 3)
+    parser.add_argument("--ttl-hours", type=float, default=REFRESH_TTL_SEC / 3600)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="show cache size and staleness")
+    commands.add_parser("enforce", help="evict least recently used domains over the quota")
+    commands.add_parser("check", help="verify the checksums of every cached bundle")
+    refresh = commands.add_parser("refresh", help="re-scrape stale domains, hottest first")
+    refresh.add_argument("--max", type=int, default=MAX_REFRESHES_PER_CYCLE, help="domains per cycle")
+    refresh.add_argument("--min-accesses", type=int, default=1)
+    refresh.add_argument("--loop", action="store_true", help="keep refreshing every --interval-min")
+    refresh.add_argument("--interval-min", type=float, default=REFRESH_INTERVAL_SEC / 60)
+    args = parser.parse_args(argv)
+
+    manager = CacheManager(quota_bytes=int(args.quota_gb * 1024 ** 3), ttl_sec=args.ttl_hours * 3600)
+    if args.command == "status":
+        print(json.dumps(manager.stats(), indent=2))
+    elif args.command == "enforce":
+        evicted = manager.enforce_quota()
+        print(f"🧹 Evicted {len(evicted)} domain(s)")
+    elif args.command == "check":
+        broken = {domain: verify_bundle(domain) for domain in manager.entries()}
+        broken = {domain: problem for domain, problem in broken.items() if problem}
+        for domain, problem in broken.items():
+            print(f"❌ {domain}: {problem}")
+        print(f"🔍 Checked {len(manager.entries())} domain(s), {len(broken)} corrupt")
+        return 1 if broken else 0
+    else:
+        scheduler = RefreshScheduler(manager, max_per_cycle=args.max, min_accesses=args.min_accesses,
+                                     interval_sec=args.interval_min * 60)
+        if not args.loop:
+            scheduler.run_once()
+            return
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,186 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.arrayfile import TextColumn
+
+# Pass as `tags` to let the task pick them (see route_tags)
+AUTO_TAGS = "auto"
+
+# 🧭 Task keywords → chunk labels worth scoring (see src/classifier.py).
+# Keywords match whole words, optionally pluralised with -s / -es.
+TASK_TAG_ROUTES: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = [
+    (("contact", "email", "e-mail", "phone", "call", "reach", "get in touch"), ("Contact", "Location")),
+    (("address", "location", "located", "office", "headquarter", "where"), ("Location", "Contact")),
+    (("price", "pricing", "priced", "cost", "plan", "fee", "rate", "package"), ("Pricing",)),
+    (("service", "offer", "offered", "offering", "product", "solution", "capability", "capabilities",
+      "what do they do", "provide", "provided", "providing"), ("Services", "Process")),
+    (("process", "how it works", "methodology", "methodologies", "approach"), ("Process", "Services")),
+    (("mission", "vision", "value", "purpose", "goal"), ("Mission", "About")),
+    (("about", "history", "histories", "story", "stories", "founded", "overview", "background"), ("About", "Mission")),
+    (("team", "founder", "leadership", "ceo", "executive", "management", "who runs"), ("Team",)),
+    (("career", "job", "hiring", "vacancy", "vacancies", "open position"), ("Careers",)),
+    (("social", "linkedin", "twitter", "instagram", "facebook"), ("Social",)),
+    (("faq", "frequently asked"), ("FAQ",)),
+]
+
+_ROUTE_PATTERNS = [
+    (re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")(?:s|es)?\b", re.IGNORECASE), tags)
+    for keywords, tags in TASK_TAG_ROUTES
+]
+
+
+def route_tags(task: str) -> Optional[List[str]]:
+    """
+    Chunk labels a task is about, e.g. "What is their contact info?" →
+    ["Contact", "Location"]. None when no route matches (search everything).
+    """
+    tags: Dict[str, None] = {}
+    for pattern, route in _ROUTE_PATTERNS:
+        if pattern.search(task):
+            tags.update(dict.fromkeys(route))
+    return list(tags) or None
+
+
+class ChunkMetadata:
+    """
+    Columnar side table of an index: row i describes chunk i.
+
+    Tags and source URLs are dictionary-encoded (a small id per row into
+    `tags` / `urls`, -1 for chunks without a URL); titles are a list or a
+    memory-mapped TextColumn; `positions` is the chunk's index in the raw
+    scrape (rag_storage/raw) and `lengths` its text length in characters.
+    """
+
+    def __init__(
+        self,
+        tags: List[str],
+        tag_ids: np.ndarray,
+        titles: Sequence[str],
+        urls: List[str],
+        url_ids: np.ndarray,
+        positions: np.ndarray,
+        lengths: np.ndarray,
+    ):
+        self.tags = list(tags)
+        self.tag_ids = np.asarray(tag_ids, dtype=np.int16)
+        self.titles = titles
+        self.urls = list(urls)
+        self.url_ids = np.asarray(url_ids, dtype=np.int32)
+        self.positions = np.asarray(positions, dtype=np.int32)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.tag_ids)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ChunkMetadata):
+            return NotImplemented
+        return self.rows() == other.rows()
+
+    @classmethod
+    def from_chunks(cls, tagged_chunks: Sequence[dict], texts: Sequence[str]) -> "ChunkMetadata":
+        """
+        Metadata for the indexed `texts`, each taken from the first tagged
+        chunk whose stripped text it is. A chunk's "position" (set by
+        prepare_chunks) defaults to its index in `tagged_chunks`.
+        """
+        first: Dict[str, Tuple[int, dict]] = {}
+        for position, chunk in enumerate(tagged_chunks):
+            text = chunk.get("text")
+            if isinstance(text, str) and text.strip():
+                first.setdefault(text.strip(), (chunk.get("position", position), chunk))
+
+        tags: Dict[str, int] = {}
+        urls: Dict[str, int] = {}
+        tag_ids, titles, url_ids, positions = [], [], [], []
+        for text in texts:
+            position, chunk = first.get(text, (-1, {}))
+            tag_ids.append(tags.setdefault(chunk.get("tag") or "Other", len(tags)))
+            titles.append(chunk.get("title") or "")
+            url = chunk.get("url")
+            url_ids.append(urls.setdefault(url, len(urls)) if url else -1)
+            positions.append(position)
+        return cls(list(tags), tag_ids, titles, list(urls), url_ids, positions, [len(t) for t in texts])
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+
+    def tag(self, row: int) -> str:
+        return self.tags[self.tag_ids[row]]
+
+    def url(self, row: int) -> Optional[str]:
+        url_id = self.url_ids[row]
+        return self.urls[url_id] if url_id >= 0 else None
+
+    def row(self, row: int) -> dict:
+        return {
+            "tag": self.tag(row),
+            "title": self.titles[row],
+            "url": self.url(row),
+            "position": int(self.positions[row]),
+            "length": int(self.lengths[row]),
+        }
+
+    def rows(self) -> List[dict]:
+        return [self.row(i) for i in range(len(self))]
+
+    def tag_mask(self, tags: Iterable[str]) -> np.ndarray:
+        """
+        Per-row bool: the chunk carries one of `tags`.
+        """
+        tags = set(tags)
+        wanted = [i for i, tag in enumerate(self.tags) if tag in tags]
+        return np.isin(self.tag_ids, wanted)
+
+    def counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.tag_ids, minlength=len(self.tags))
+        return {tag: int(count) for tag, count in zip(self.tags, counts)}
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def to_arrays(self, prefix: str = "meta.") -> Tuple[dict, Dict[str, np.ndarray]]:
+        """
+        (header fields, arrays) for an index bundle (see src/bundle.py).
+        """
+        titles = self.titles if isinstance(self.titles, TextColumn) else TextColumn.from_texts(self.titles)
+        arrays = {
+            f"{prefix}tag_ids": self.tag_ids,
+            f"{prefix}url_ids": self.url_ids,
+            f"{prefix}positions": self.positions,
+            f"{prefix}lengths": self.lengths,
+            **titles.to_arrays(f"{prefix}titles"),
+        }
+        return {"tags": self.tags, "urls": self.urls}, arrays
+
+    @classmethod
+    def from_arrays(cls, header: dict, arrays: Dict[str, np.ndarray], prefix: str = "meta.") -> "ChunkMetadata":
+        return cls(
+            tags=header["tags"],
+            tag_ids=arrays[f"{prefix}tag_ids"],
+            titles=TextColumn.from_arrays(arrays, f"{prefix}titles"),
+            urls=header["urls"],
+            url_ids=arrays[f"{prefix}url_ids"],
+            positions=arrays[f"{prefix}positions"],
+            lengths=arrays[f"{prefix}lengths"],
+        )
+
+    @classmethod
+    def load_legacy(cls, path: str) -> "ChunkMetadata":
+        """
+        Read the .npz side table written before index bundles.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                tags=data["tags"].tolist(),
+                tag_ids=data["tag_ids"],
+                titles=data["titles"].tolist(),
+                urls=data["urls"].tolist(),
+                url_ids=data["url_ids"],
+                positions=data["positions"],
+                lengths=data["lengths"],
+            )
@@ -0,0 +1,280 @@
+from typing import Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+from src.classifier import section_classifier
+
+SECTION_HEADERS = ["h1", "h2", "h3"]
+MAX_CHUNKS_PER_LABEL = 10
+
+# ✅ Fastest available parser backend
+DEFAULT_BACKEND = "lxml" if HAS_LXML else "html.parser"
+
+# Tags whose strings BeautifulSoup keeps out of their ancestors' get_text()
+STRING_CONTAINER_TAGS = {"script", "style", "template", "rt", "rp"}
+MAIN_TEXT = "main"
+MAIN_STRING_TYPES = {NavigableString, CData}
+
+
+class SectionBuilder:
+    """
+    Incremental header-delimited section assembly.
+
+    Receives elements in document order together with their cleaned text
+    and produces the same {"tag", "title", "text"} chunks as the original
+    descendant walk in extract_semantic_chunks. Sections are labelled in
+    one classify_many() call when the page is finished.
+    """
+
+    def __init__(self, classifier=section_classifier):
+        self.classifier = classifier
+        self.sections: List[Tuple[str, str, bool]] = []
+        self.title: Optional[str] = None
+        self.lines: List[str] = []
+        self.line_set = set()
+
+    def wants(self, name: str) -> bool:
+        # Body text before the first header never reaches a chunk
+        return self.title is not None or name in SECTION_HEADERS
+
+    def add(self, name: str, text: str):
+        if name in SECTION_HEADERS:
+            if self.lines:
+                self._flush()
+            self.title = text
+            self.lines = []
+            self.line_set = set()
+        elif self.title:
+            if text not in self.line_set:  # avoid intra-chunk duplication
+                self.lines.append(text)
+                self.line_set.add(text)
+
+    def _flush(self):
+        lines = self.lines
+        if lines[0].strip().lower() == self.title.strip().lower():
+            lines = lines[1:]
+
+        full_text = self.classifier.clean(f"{self.title}\n{' '.join(lines)}")
+        self.sections.append((self.title, full_text, False))
+
+    def finish(self) -> List[Dict]:
+        if self.title and self.lines:
+            # The trailing section is emitted without the title-line trim and re-clean
+            full_text = f"{self.title}\n" + " ".join(self.lines)
+            self.sections.append((self.title, full_text, True))
+
+        labels = self.classifier.classify_many(text for _, text, _ in self.sections)
+
+        chunks = []
+        seen_chunks = set()
+        chunk_counts: Dict[str, int] = {}
+        for (title, full_text, is_last), label in zip(self.sections, labels):
+            if full_text in seen_chunks or chunk_counts.get(label, 0) >= MAX_CHUNKS_PER_LABEL:
+                continue
+            chunks.append({
+                "tag": label,
+                "title": title,
+                "text": full_text
+            })
+            if not is_last:
+                seen_chunks.add(full_text)
+                chunk_counts[label] = chunk_counts.get(label, 0) + 1
+        return chunks
+
+
+class StreamingChunker:
+    """
+    Single-pass chunker driven by start/text/end events.
+
+    Every stripped text node is appended once to a flat buffer, so an
+    element's get_text(strip=True) is just the slice of the buffer between
+    its start and end positions. Elements are handed to the SectionBuilder
+    in document order as soon as they (and everything before them) close,
+    and cleaned text is memoised per slice so wrapper chains around the
+    same content are only cleaned once.
+    """
+
+    def __init__(self, classifier=section_classifier):
+        self.classifier = classifier
+        self.builder = SectionBuilder(classifier)
+        self.main: List[str] = []
+        self.other: List[Tuple[object, str]] = []
+        self.stack: List[list] = []
+        self.pending: List[list] = []
+        self.head = 0
+        self.cleaned: Dict[Tuple[int, int], str] = {}
+
+    def start(self, name: str, kind=MAIN_TEXT):
+        # [name, kind, main_start, main_end, other_start, other_end]
+        record = [name, kind, len(self.main), None, len(self.other), None]
+        self.pending.append(record)
+        self.stack.append(record)
+
+    def text(self, value: str, kind=MAIN_TEXT):
+        value = value.strip()
+        if not value:
+            return
+        if kind is MAIN_TEXT:
+            self.main.append(value)
+        else:
+            self.other.append((kind, value))
+
+    def end(self):
+        record = self.stack.pop()
+        record[3] = len(self.main)
+        record[5] = len(self.other)
+        if not self.stack:
+            self._drain()
+
+    def _element_text(self, record: list) -> str:
+        name, kind, a, b, oa, ob = record
+        if kind is not MAIN_TEXT:
+            raw = "".join(v for k, v in self.other[oa:ob] if k == kind)
+            return self._clean(raw)
+
+        key = (a, b)
+        text = self.cleaned.get(key)
+        if text is None:
+            text = self._clean("".join(self.main[a:b]))
+            self.cleaned[key] = text
+        return text
+
+    def _clean(self, raw: str) -> str:
+        text = self.classifier.clean(raw)
+        if not text or self.classifier.is_boilerplate(text):
+            return ""
+        return text
+
+    def _drain(self):
+        builder = self.builder
+        pending = self.pending
+        while self.head < len(pending) and pending[self.head][3] is not None:
+            record = pending[self.head]
+            self.head += 1
+            if not builder.wants(record[0]):
+                continue
+            text = self._element_text(record)
+            if text:
+                builder.add(record[0], text)
+
+        if self.head == len(pending):
+            self.pending = []
+            self.head = 0
+
+    def finish(self) -> List[Dict]:
+        while self.stack:
+            self.end()
+        self._drain()
+        return self.builder.finish()
+
+
+# =============================
+# 🌲 Event sources
+# =============================
+
+def _soup_kind(types) -> object:
+    if types is None or types == MAIN_STRING_TYPES:
+        return MAIN_TEXT
+    if len(types) == 1:
+        return next(iter(types))
+    return frozenset(types)
+
+
+def feed_soup(chunker: StreamingChunker, root: Tag):
+    """
+    Stream the descendants of a BeautifulSoup tag into the chunker.
+    """
+    stack = [iter(root.contents)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                chunker.start(node.name, _soup_kind(node.interesting_string_types))
+                stack.append(iter(node.contents))
+                break
+            if isinstance(node, NavigableString):
+                node_type = type(node)
+                chunker.text(node, MAIN_TEXT if node_type in MAIN_STRING_TYPES else node_type)
+        else:
+            stack.pop()
+            if stack:
+                chunker.end()
+
+
+def feed_lxml(chunker: StreamingChunker, root):
+    """
+    Stream the descendants of an lxml element into the chunker.
+    """
+    containers: List[str] = []
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        if el is root:
+            if event == "start" and el.text:
+                chunker.text(el.text)
+            continue
+
+        is_element = isinstance(el.tag, str)
+        if event == "start":
+            if not is_element:
+                continue
+            name = el.tag
+            if name in STRING_CONTAINER_TAGS:
+                containers.append(name)
+                chunker.start(name, name)
+            else:
+                chunker.start(name)
+            if el.text:
+                chunker.text(el.text, containers[-1] if containers else MAIN_TEXT)
+        else:
+            if is_element:
+                if el.tag in STRING_CONTAINER_TAGS:
+                    containers.pop()
+                chunker.end()
+            if el.tail:
+                chunker.text(el.tail, containers[-1] if containers else MAIN_TEXT)
+
+
+# =============================
+# 🧩 Public entry points
+# =============================
+
+def chunk_soup(soup: BeautifulSoup) -> List[Dict]:
+    """
+    Chunk an already parsed page. Same output as the original descendant walk.
+    """
+    chunker = StreamingChunker()
+    feed_soup(chunker, soup.body)
+    return chunker.finish()
+
+
+def chunk_html(html: str, backend: Optional[str] = None) -> Optional[List[Dict]]:
+    """
+    Parse raw HTML with the fastest available backend and chunk it.
+    Returns None when the page has no <body>.
+    """
+    backend = backend or DEFAULT_BACKEND
+
+    if backend == "lxml" and HAS_LXML:
+        if not html.strip():
+            return None
+        try:
+            document = lxml.html.document_fromstring(html)
+        except ValueError:
+            # str input with an XML encoding declaration
+            parser = lxml.html.HTMLParser(encoding="utf-8")
+            document = lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+        body = document.find("body")
+        if body is None:
+            return None
+        chunker = StreamingChunker()
+        feed_lxml(chunker, body)
+        return chunker.finish()
+
+    soup = BeautifulSoup(html, "html.parser")
+    if not soup.body:
+        return None
+    return chunk_soup(soup)
@@ -0,0 +1,343 @@
+import re
+from itertools import compress
+from operator import eq
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+BOILERPLATE_PATTERNS = [
+    r"accept cookies?",
+    r"terms of use",
+    r"privacy policy",
+    r"all rights reserved",
+    r"copyright \d{4}",
+    r"^sign in$|^log in$",
+]
+
+SECTION_KEYWORDS = {
+    # Mission/About
+    "mission": "Mission",
+    "our mission": "Mission",
+    "purpose": "Mission",
+    "core values": "Mission",
+
+    "vision": "About",
+    "about": "About",
+    "about us": "About",
+    "who we are": "About",
+    "our story": "About",
+    "overview": "About",
+    "history": "About",
+
+    # Services / Process
+    "services": "Services",
+    "solutions": "Services",
+    "offerings": "Services",
+    "what we do": "Services",
+    "capabilities": "Services",
+    "expertise": "Services",
+
+    "how it works": "Process",
+    "our process": "Process",
+    "methodology": "Process",
+
+    # Contact
+    "contact": "Contact",
+    "contact us": "Contact",
+    "get in touch": "Contact",
+    "reach out": "Contact",
+
+    # Team / Careers
+    "team": "Team",
+    "our team": "Team",
+    "meet the team": "Team",
+    "leadership": "Team",
+    "founders": "Team",
+    "board of directors": "Team",
+
+    "careers": "Careers",
+    "jobs": "Careers",
+    "join our team": "Careers",
+    "we're hiring": "Careers",
+    "opportunities": "Careers",
+
+    # CTA
+    "get started": "CTA",
+    "request a quote": "CTA",
+    "get a quote": "CTA",
+    "start now": "CTA",
+    "sign up": "CTA",
+    "subscribe": "CTA",
+    "download now": "CTA",
+
+    # Pricing / Plans
+    "pricing": "Pricing",
+    "plans": "Pricing",
+    "packages": "Pricing",
+    "rates": "Pricing",
+    "fees": "Pricing",
+}
+
+# Checked only after every SECTION_KEYWORDS entry has missed
+FALLBACK_KEYWORDS = {
+    "investment": "Services",
+    "fund": "Services",
+    "capital": "Services",
+    "portfolio": "Services",
+}
+
+DIGITS = tuple("0123456789")
+
+# Non-ASCII characters that IGNORECASE matches to an ASCII letter without
+# lower() producing it (İ ı ſ K), and non-ASCII decimal digits matched by \d
+UNSAFE_HINT_CHARS = re.compile(r"[\u0130\u0131\u017f\u212a]|(?![0-9])\d")
+
+
+class SectionRule(NamedTuple):
+    """
+    One regex rule of detect_section_label.
+
+    hints: lowercase literals, at least one of which must occur in the
+    lowered text for the pattern to match. Checking them with `in` is far
+    cheaper than a failing regex scan. ascii_hints marks rules whose hints
+    rely on IGNORECASE / \\d only meaning ASCII letters and digits; they are
+    skipped for text containing UNSAFE_HINT_CHARS.
+    """
+    label: str
+    pattern: str
+    flags: int = 0
+    lowered: bool = False
+    hints: Tuple[str, ...] = ()
+    ascii_hints: bool = False
+
+
+# 🧭 Rule patterns in priority order
+SECTION_RULES = [
+    # 📧 Email
+    SectionRule("Contact", r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", hints=("@",)),
+    # 📞 Phone number
+    SectionRule("Contact", r"\+?\d[\d\s\-().]{7,}\d", hints=DIGITS, ascii_hints=True),
+    # 📍 Location / Address
+    SectionRule("Location", r"\b(Jl\.?\s+[A-Z])|\b(Street|St\.|Road|Blvd|Avenue|Ave\.|Suite|Building)\b", re.IGNORECASE,
+                hints=("jl", "street", "st.", "road", "blvd", "avenue", "ave.", "suite", "building"), ascii_hints=True),
+    SectionRule("Location", r"\b(Jakarta|Bandung|Surabaya|NY|New York|LA|Los Angeles)\b", re.IGNORECASE,
+                hints=("jakarta", "bandung", "surabaya", "ny", "new york", "la", "los angeles"), ascii_hints=True),
+    SectionRule("Location", r"\b\d{5}(-\d{4})?\b", hints=DIGITS, ascii_hints=True),
+    # 🌐 Social Media Links
+    SectionRule("Social", r"https?://(www\.)?(linkedin|facebook|instagram|x|twitter)\.com/\S+", re.IGNORECASE,
+                hints=("http",), ascii_hints=True),
+    # 💰 Pricing
+    SectionRule("Pricing", r"(\$|Rp|IDR|USD)? ?[\d.,]+(k|rb|jt)?", re.IGNORECASE,
+                hints=DIGITS + (".", ","), ascii_hints=True),
+    # 📅 Schedule / Date / Time
+    SectionRule("Schedule", r"\b(Jan(uary)?|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{4}", re.IGNORECASE,
+                hints=DIGITS, ascii_hints=True),
+    SectionRule("Schedule", r"\d{1,2}[:.]?\d{2} ?(AM|PM|WIB)?", hints=DIGITS, ascii_hints=True),
+    SectionRule("Schedule", r"(Senin|Selasa|Rabu|Kamis|Jumat|Sabtu|Minggu)", re.IGNORECASE,
+                hints=("senin", "selasa", "rabu", "kamis", "jumat", "sabtu", "minggu"), ascii_hints=True),
+    # 📝 Careers
+    SectionRule("Careers", r"(join our team|we'?re hiring|open positions|apply now)", lowered=True,
+                hints=("join our team", "we're hiring", "were hiring", "open positions", "apply now")),
+    # 🧪 FAQ
+    SectionRule("FAQ", r"(What|How|Why|Can|Where|Do|Is|Are|When|Who|Should)\b.*\?", hints=("?",)),
+    # 🔐 Legal
+    SectionRule("Legal", r"(privacy policy|terms of service|cookies|disclaimer|data policy)", lowered=True,
+                hints=("privacy policy", "terms of service", "cookies", "disclaimer", "data policy")),
+]
+
+WHITESPACE_RE = re.compile(r"\s+")
+WORD_SPLIT_RE = re.compile(r"(\w+)")
+MAX_PHRASE_WORDS = 5
+
+
+class KeywordMatcher:
+    """
+    Single-pass multi-keyword matcher.
+
+    Returns the label of the highest-priority keyword (earliest in the
+    table) that occurs anywhere in the text, exactly like scanning the
+    table in order with `keyword in text`. Uses a pyahocorasick automaton
+    when installed; otherwise the ordered scan, which stays in C per
+    keyword and is the fastest pure-Python option.
+    """
+
+    def __init__(self, keywords: Sequence[Tuple[str, str]]):
+        self.keywords = list(keywords)
+        self.automaton = None
+
+        if HAS_AHOCORASICK and self.keywords:
+            self.automaton = ahocorasick.Automaton()
+            for priority, (keyword, label) in enumerate(self.keywords):
+                # Duplicate keywords keep their first (highest) priority
+                if keyword not in self.automaton:
+                    self.automaton.add_word(keyword, (priority, label))
+            self.automaton.make_automaton()
+
+    def match(self, text: str) -> Optional[str]:
+        if self.automaton is not None:
+            best = None
+            for _, hit in self.automaton.iter(text):
+                if best is None or hit[0] < best[0]:
+                    best = hit
+                    if best[0] == 0:
+                        break
+            return best[1] if best else None
+
+        for keyword, label in self.keywords:
+            if keyword in text:
+                return label
+        return None
+
+
+def _fold_words(words: List[str], ascii_only: bool) -> List[str]:
+    if ascii_only:
+        return "\x00".join(words).lower().split("\x00")
+    # Per-character lowering, as the regex engine compares IGNORECASE backrefs
+    return ["".join(c.lower() for c in word) for word in words]
+
+
+def collapse_repeated_phrases(text: str) -> str:
+    r"""
+    Collapse immediately repeated phrases of up to 5 words
+    ("Who We Are Who We Are" -> "Who We Are"), case-insensitively.
+
+    Linear-time equivalent of
+    re.sub(r'\b(\w+(?: \w+){0,4})\b(?: \1\b){1,}', r'\1', text, flags=re.I).
+    Candidate starts (word i equal to word i+k) are found with C-level
+    list comparisons, so the per-word Python work only happens where a
+    repeat is actually possible.
+    """
+    parts = WORD_SPLIT_RE.split(text)
+    words = _fold_words(parts[1::2], text.isascii())
+    seps = parts[2::2]
+    n = len(words)
+    if n < 2:
+        return text
+
+    starts = set()
+    for k in range(1, MAX_PHRASE_WORDS + 1):
+        starts.update(compress(range(n - k), map(eq, words, words[k:])))
+    if not starts:
+        return text
+
+    def joined(first: int, last: int) -> bool:
+        # Words first..last+1 are separated by exactly one space
+        return all(seps[m] == " " for m in range(first, last + 1))
+
+    pieces = []
+    cursor = 0
+    resume = 0
+    for i in sorted(starts):
+        if i < resume:
+            continue
+        # Longest phrase first, as the greedy regex group does
+        for k in range(min(MAX_PHRASE_WORDS, (n - i) // 2), 0, -1):
+            if words[i:i + k] == words[i + k:i + 2 * k] and joined(i, i + 2 * k - 2):
+                break
+        else:
+            continue
+
+        j = i + 2 * k
+        while j + k <= n and words[j:j + k] == words[i:i + k] and joined(j - 1, j + k - 2):
+            j += k
+
+        pieces.extend(parts[cursor:2 * (i + k)])
+        cursor = 2 * j
+        resume = j
+
+    if not pieces:
+        return text
+    pieces.extend(parts[cursor:])
+    return "".join(pieces)
+
+
+class SectionClassifier:
+    """
+    Precompiled section labelling and text cleaning.
+
+    All rule patterns, boilerplate patterns and keyword tables are compiled
+    once at construction; classify() applies them in the same priority
+    order as the original detect_section_label.
+    """
+
+    def __init__(
+        self,
+        keywords: Optional[Dict[str, str]] = None,
+        fallback_keywords: Optional[Dict[str, str]] = None,
+        rules: Optional[list] = None,
+        boilerplate_patterns: Optional[List[str]] = None,
+    ):
+        keywords = SECTION_KEYWORDS if keywords is None else keywords
+        fallback_keywords = FALLBACK_KEYWORDS if fallback_keywords is None else fallback_keywords
+        rules = SECTION_RULES if rules is None else rules
+        boilerplate_patterns = BOILERPLATE_PATTERNS if boilerplate_patterns is None else boilerplate_patterns
+
+        self.rules = [
+            (rule.label, re.compile(rule.pattern, rule.flags).search, rule.lowered, rule.hints, rule.ascii_hints)
+            for rule in rules
+        ]
+        self.keyword_matcher = KeywordMatcher(list(keywords.items()) + list(fallback_keywords.items()))
+        # Separate searches keep each pattern's literal-prefix fast path
+        self.boilerplate_searches = [re.compile(p).search for p in boilerplate_patterns]
+
+    # =============================
+    # 🧹 Cleaning
+    # =============================
+
+    def clean(self, text: str) -> str:
+        text = WHITESPACE_RE.sub(" ", text.strip())
+        # Remove repeated phrases like "Who We Are Who We Are"
+        text = collapse_repeated_phrases(text)
+        return text.strip()
+
+    def is_boilerplate(self, text: str) -> bool:
+        text = text.lower().strip()
+        if len(text) < 5:
+            return True
+        return any(search(text) for search in self.boilerplate_searches)
+
+    # =============================
+    # 🏷️ Labelling
+    # =============================
+
+    def classify(self, full_block_text: str) -> str:
+        # 📣 CTA: short, all-uppercase line
+        for line in full_block_text.splitlines():
+            if line.isupper() and len(line.split()) <= 6:
+                return "CTA"
+
+        text = full_block_text.strip()
+        lowered = text.lower()
+        hints_safe = text.isascii() or not UNSAFE_HINT_CHARS.search(text)
+
+        for label, search, use_lowered, hints, ascii_hints in self.rules:
+            if hints and (hints_safe or not ascii_hints) and not any(h in lowered for h in hints):
+                continue
+            if search(lowered if use_lowered else text):
+                return label
+
+        # Keyword-based fallback
+        return self.keyword_matcher.match(lowered) or "Other"
+
+    def classify_many(self, texts: Iterable[str]) -> List[str]:
+        """
+        Label a batch of blocks (e.g. every section of a page) in one call.
+        Identical blocks are only classified once.
+        """
+        labels: Dict[str, str] = {}
+        classify = self.classify
+        result = []
+        for text in texts:
+            label = labels.get(text)
+            if label is None:
+                label = labels[text] = classify(text)
+            result.append(label)
+        return result
+
+
+# ✅ Shared instance used by the scraper and chunker
+section_classifier = SectionClassifier()
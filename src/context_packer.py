@@ -0,0 +1,231 @@
+import re
+from typing import Callable, List, NamedTuple, Optional, Sequence, Set
+
+import config
+from src.model_registry import model_registry
+
+LLM2_TOKENIZER = config.LLM_LOCAL_MODEL if config.LLM_BACKEND == "local" else config.LLM_MODEL
+MODEL_MAX_INPUT_TOKENS = 512    # flan-t5 silently drops input past this
+RESERVED_TOKENS = 8             # separators and the end-of-sequence token
+MIN_USEFUL_TOKENS = 16          # stop packing once less than this is left
+WINDOW_SENTENCES = 2            # consecutive sentences per window of an oversized chunk
+OVERLAP_THRESHOLD = 0.8         # word overlap at which a sentence counts as a repeat
+WINDOW_SEPARATOR = "…"          # marks sentences skipped between windows
+
+# Running totals across requests, for diagnostics
+packing_stats = {"requests": 0, "tokens": 0, "tokens_saved": 0}
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORDS = re.compile(r"\w+")
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+# =============================
+# 🔢 Token counting
+# =============================
+
+def _load_token_counter() -> Callable[[str], int]:
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(LLM2_TOKENIZER)
+    except (ImportError, OSError) as e:
+        # No transformers or no copy of the tokenizer (offline): estimate
+        print(f"⚠️ {LLM2_TOKENIZER} tokenizer unavailable ({e}); estimating token counts.")
+        return estimate_tokens
+    return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    SentencePiece-like estimate: words and punctuation, with long words
+    split into ~6-character pieces.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECES.findall(text))
+
+
+llm_tokenizer = model_registry.register("llm2-tokenizer", _load_token_counter)
+
+
+def count_tokens(text: str) -> int:
+    return llm_tokenizer.get()(text)
+
+
+# =============================
+# ✂️ Packing
+# =============================
+
+class PackedContext(NamedTuple):
+    context: str
+    chunks_used: int           # chunks contributing any text
+    tokens: int                # tokens in the packed context
+    original_tokens: int       # tokens if every chunk were joined verbatim
+    dropped_sentences: int     # repeats of sentences already in the context
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.original_tokens - self.tokens, 0)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORDS.findall(text.lower()))
+
+
+def _is_repeat(words: Set[str], kept: List[Set[str]]) -> bool:
+    if not words:
+        return True
+    return any(len(words & other) >= OVERLAP_THRESHOLD * min(len(words), len(other)) for other in kept)
+
+
+def _best_windows(sentences: List[str], costs: List[int], task_words: Set[str], budget: int) -> List[int]:
+    """
+    Indices of the sentences to keep from a chunk that does not fit:
+    windows of WINDOW_SENTENCES consecutive sentences (or single ones),
+    most task words first, while they fit the budget.
+    """
+    overlap = [len(_words(sentence) & task_words) for sentence in sentences]
+    windows = []
+    for size in {WINDOW_SENTENCES, 1}:
+        for start in range(max(len(sentences) - size + 1, 1)):
+            members = list(range(start, min(start + size, len(sentences))))
+            windows.append((-sum(overlap[i] for i in members), -len(members), start, members))
+
+    chosen: Set[int] = set()
+    for *_, members in sorted(windows):
+        new = [i for i in members if i not in chosen]
+        cost = sum(costs[i] for i in new)
+        if new and cost <= budget:
+            chosen.update(new)
+            budget -= cost
+    return sorted(chosen)
+
+
+def _best_word_window(text: str, task_words: Set[str], budget: int, count: Callable[[str], int]) -> str:
+    """
+    For a chunk none of whose sentences fit (long unpunctuated lists,
+    nav-like text): the run of words around the most task words that fits
+    the budget (the chunk's head if none match), cut ends marked with
+    WINDOW_SEPARATOR.
+    """
+    words = text.split()
+    costs = [count(word) for word in words]
+    hits = [1 if _words(word) & task_words else 0 for word in words]
+    fit = budget - 2 * count(WINDOW_SEPARATOR)
+
+    best = (0, 0, 0)  # (task words, start, end)
+    start = cost = score = 0
+    for end in range(len(words)):
+        cost += costs[end]
+        score += hits[end]
+        while cost > fit and start <= end:
+            cost -= costs[start]
+            score -= hits[start]
+            start += 1
+        if score > best[0]:
+            best = (score, start, end + 1)
+
+    # Centre the window on its task words, growing both sides while it fits
+    score, start, end = best
+    matched = [i for i in range(start, end) if hits[i]]
+    start, end = (matched[0], matched[-1] + 1) if matched else (0, 0)
+    cost = sum(costs[start:end])
+    grown = True
+    while grown:
+        grown = False
+        for i in (start - 1, end):
+            if 0 <= i < len(words) and cost + costs[i] <= fit:
+                cost += costs[i]
+                start, end = min(start, i), max(end, i + 1)
+                grown = True
+
+    while end > start:
+        part = " ".join(words[start:end])
+        if start > 0:
+            part = f"{WINDOW_SEPARATOR} {part}"
+        if end < len(words):
+            part = f"{part} {WINDOW_SEPARATOR}"
+        if count(part) <= budget:
+            return part
+        end -= 1  # token counts of the joined words may exceed their sum
+    return ""
+
+
+def _join_windows(sentences: List[str], chosen: List[int]) -> str:
+    parts, previous = [], None
+    for i in chosen:
+        if previous is not None and i != previous + 1:
+            parts.append(WINDOW_SEPARATOR)
+        parts.append(sentences[i])
+        previous = i
+    return " ".join(parts)
+
+
+def pack_context(
+    task: str,
+    texts: Sequence[str],
+    budget_tokens: int,
+    count: Optional[Callable[[str], int]] = None,
+) -> PackedContext:
+    """
+    Fit chunk texts (best match first) into `budget_tokens`. Chunks are
+    kept in score order; sentences repeating one already kept are dropped;
+    a chunk too large for what is left contributes its best-matching
+    sentence windows instead of being cut at the tail, or if no sentence
+    fits, its best-matching run of words.
+    """
+    count = count or count_tokens
+    task_words = _words(task)
+    kept_words: List[Set[str]] = []
+    parts, used, dropped, chunks_used = [], 0, 0, 0
+    original = sum(count(text) for text in texts)
+
+    for text in texts:
+        remaining = budget_tokens - used
+        if remaining < MIN_USEFUL_TOKENS:
+            break
+        sentences, costs, words = [], [], []
+        for sentence in split_sentences(text):
+            sentence_words = _words(sentence)
+            if _is_repeat(sentence_words, kept_words + words):
+                dropped += 1
+                continue
+            sentences.append(sentence)
+            costs.append(count(sentence))
+            words.append(sentence_words)
+        if not sentences:
+            continue
+
+        if sum(costs) <= remaining:
+            chosen = list(range(len(sentences)))
+        else:
+            chosen = _best_windows(sentences, costs, task_words, remaining)
+        if chosen:
+            parts.append(_join_windows(sentences, chosen))
+            kept_words.extend(words[i] for i in chosen)
+            used += sum(costs[i] for i in chosen)
+        else:
+            part = _best_word_window(" ".join(sentences), task_words, remaining, count)
+            if not part:
+                print(f"⚠️ Context packing skipped a chunk: nothing in it fits {remaining} tokens.")
+                continue
+            parts.append(part)
+            kept_words.append(_words(part))
+            used += count(part)
+        chunks_used += 1
+
+    packed = PackedContext("\n\n".join(parts), chunks_used, used, original, dropped)
+    packing_stats["requests"] += 1
+    packing_stats["tokens"] += packed.tokens
+    packing_stats["tokens_saved"] += packed.tokens_saved
+    return packed
+
+
+def context_budget(prompt_without_context: str, max_input_tokens: int = MODEL_MAX_INPUT_TOKENS, count: Optional[Callable[[str], int]] = None) -> int:
+    """
+    Tokens left for context once the rest of the prompt is in.
+    """
+    count = count or count_tokens
+    return max(max_input_tokens - count(prompt_without_context) - RESERVED_TOKENS, 0)
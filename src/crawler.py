@@ -0,0 +1,259 @@
+import heapq
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from src.chunker import HAS_LXML, chunk_html
+from src.classifier import SECTION_KEYWORDS, KeywordMatcher
+from src.model_registry import lazy_import
+
+cloudscraper = lazy_import("cloudscraper")
+
+if HAS_LXML:
+    import lxml.html
+    from lxml import etree
+
+MAX_CRAWL_PAGES = 8
+MAX_CRAWL_DEPTH = 2
+CRAWL_WORKERS = 4
+REQUEST_TIMEOUT = 10
+
+# Section labels whose pages are fetched first, in this order
+LINK_PRIORITY = ["About", "Mission", "Pricing", "Services", "Team", "Contact", "Process", "CTA", "Careers"]
+
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico",
+    ".css", ".js", ".json", ".xml", ".zip", ".mp4", ".mp3", ".doc", ".docx", ".xls", ".xlsx",
+)
+
+link_matcher = KeywordMatcher(list(SECTION_KEYWORDS.items()))
+
+
+class SessionPool:
+    """
+    One pooled cloudscraper session per host, shared across threads so
+    keep-alive connections are reused between pages and scrapes.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, "cloudscraper.CloudScraper"] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> "cloudscraper.CloudScraper":
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = cloudscraper.create_scraper()
+            return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+session_pool = SessionPool()
+
+
+# =============================
+# 🔗 Link discovery
+# =============================
+
+def _host_key(netloc: str) -> str:
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def normalize_url(url: str) -> str:
+    url, _ = urldefrag(url)
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{parsed.scheme.lower()}://{_host_key(parsed.netloc)}{path}{query}"
+
+
+def extract_links(html: str, base_url: str) -> List[Tuple[str, str]]:
+    """
+    Return (absolute URL, anchor text) for every same-host page link.
+    """
+    if HAS_LXML:
+        try:
+            document = lxml.html.document_fromstring(html)
+        except (ValueError, etree.ParserError):
+            return []
+        anchors = ((a.get("href"), a.text_content()) for a in document.iter("a"))
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+        anchors = ((a.get("href"), a.get_text(" ")) for a in soup.find_all("a"))
+
+    host = _host_key(urlparse(base_url).netloc)
+    links = []
+    for href, anchor in anchors:
+        if not href:
+            continue
+        url, _ = urldefrag(urljoin(base_url, href.strip()))
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or _host_key(parsed.netloc) != host:
+            continue
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            continue
+        links.append((url, " ".join(anchor.split())))
+    return links
+
+
+def link_rank(url: str, anchor: str) -> int:
+    """
+    Rank a link by the section its anchor text or path points to
+    (lower is fetched sooner); unrecognised links go last.
+    """
+    path = urlparse(url).path
+    for ch in "/-_.":
+        path = path.replace(ch, " ")
+    label = link_matcher.match(f"{anchor} {path}".lower())
+    if label in LINK_PRIORITY:
+        return LINK_PRIORITY.index(label)
+    return len(LINK_PRIORITY)
+
+
+# =============================
+# 🕸️ Crawler
+# =============================
+
+def conditional_fetch(
+    url: str,
+    validators: Optional[Dict[str, str]] = None,
+    pool: SessionPool = session_pool,
+) -> Tuple[str, Optional[str], Dict[str, str]]:
+    """
+    Fetch a page, revalidating with a previous response's "etag" /
+    "last_modified" validators. Returns (final URL, HTML, validators);
+    HTML is None when the server answers 304 Not Modified.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = pool.get(url).get(url, timeout=REQUEST_TIMEOUT, headers=headers)
+    if response.status_code == 304 and headers:
+        return response.url, None, dict(validators)
+    response.raise_for_status()
+
+    fresh = {}
+    if response.headers.get("ETag"):
+        fresh["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        fresh["last_modified"] = response.headers["Last-Modified"]
+
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and "html" not in content_type:
+        return response.url, "", fresh
+    return response.url, response.text, fresh
+
+
+def fetch_page(url: str, pool: SessionPool = session_pool) -> Tuple[str, str]:
+    """
+    Fetch a page with the host's pooled session. Returns (final URL, HTML).
+    """
+    final_url, html, _ = conditional_fetch(url, pool=pool)
+    return final_url, html
+
+
+def _fetch_and_chunk(
+    url: str,
+    pool: SessionPool,
+    throttle: Optional[Callable[[str], None]] = None,
+) -> Tuple[Optional[List[Dict]], List[Tuple[str, str]]]:
+    if throttle is not None:
+        throttle(url)
+    final_url, html = fetch_page(url, pool)
+    if not html:
+        return [], []
+    return chunk_html(html), extract_links(html, final_url)
+
+
+def crawl_site_structured(
+    domain: str,
+    max_pages: int = MAX_CRAWL_PAGES,
+    max_depth: int = MAX_CRAWL_DEPTH,
+    workers: int = CRAWL_WORKERS,
+    pool: SessionPool = session_pool,
+    throttle: Optional[Callable[[str], None]] = None,
+) -> List[Dict]:
+    """
+    Crawl same-host pages starting at `domain` and merge their chunks.
+
+    Pages are fetched concurrently on a thread pool, at most `max_pages`
+    pages and `max_depth` links away from the start page. Links whose text
+    or path matches SECTION_KEYWORDS (About, Pricing, ...) are fetched
+    before the rest. Merged chunks keep page order, skip sections already
+    seen on an earlier page (nav, footer), and carry their page's "url".
+    `throttle(url)`, if given, is called on the worker thread before each
+    fetch and may block to rate limit the host.
+    """
+    workers = max(1, workers)
+    frontier = [(0, 0, 0, domain)]
+    seen = {normalize_url(domain)}
+    pages: Dict[int, Tuple[str, List[Dict]]] = {}
+    order = 1
+    scheduled = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while frontier or running:
+            while frontier and len(running) < workers and scheduled < max_pages:
+                _, depth, seq, url = heapq.heappop(frontier)
+                running[executor.submit(_fetch_and_chunk, url, pool, throttle)] = (seq, depth, url)
+                scheduled += 1
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                seq, depth, url = running.pop(future)
+                try:
+                    chunks, links = future.result()
+                except Exception as e:
+                    if seq == 0:
+                        return [{"tag": "Error", "title": "", "text": f"Failed to fetch: {e}"}]
+                    print(f"⚠️ Skipping {url}: {e}")
+                    continue
+
+                if chunks is None:
+                    if seq == 0:
+                        return [{"tag": "Error", "title": "", "text": "No <body> found on page"}]
+                    chunks = []
+                pages[seq] = (url, chunks)
+
+                if depth >= max_depth:
+                    continue
+                for link, anchor in links:
+                    key = normalize_url(link)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    heapq.heappush(frontier, (link_rank(link, anchor), depth + 1, order, link))
+                    order += 1
+
+    merged = []
+    seen_texts = set()
+    for seq in sorted(pages):
+        url, chunks = pages[seq]
+        for chunk in chunks:
+            if chunk["text"] in seen_texts:
+                continue
+            seen_texts.add(chunk["text"])
+            merged.append({**chunk, "url": url})
+
+    print(f"🕸️ Crawled {len(pages)} page(s) from {domain}: {len(merged)} chunks")
+    return merged
@@ -1,10 +1,71 @@
-from src.scraper import scrape_site_structured
-from src.vectorstore import persist_chunks_to_vectorstore
-from src.storage import save_raw_text
+from src.bundle import bundle_version
+from src.cache_lock import SingleFlight, domain_lock
+from src.cache_manager import cache_manager
+from src.scraper import scrape_if_modified, scrape_site_structured
+from src.vectorstore import persist_chunks_to_vectorstore, vectorstore_exists
+from src.storage import load_http_validators, save_http_validators, save_raw_text
+from src.utils import cache_key
 
-def insert_domain(domain: str):
+# ✅ Concurrent ingests of one domain (e.g. two Streamlit sessions) share one run
+_ingests = SingleFlight()
+
+def prepare_chunks(structured_chunks: list) -> list:
+    """
+    Keep tagged, non-empty chunks in the shape the vectorstore expects,
+    with the title and source url kept as chunk metadata.
+    """
+    chunks = []
+    for position, chunk in enumerate(structured_chunks):
+        if chunk.get("tag") and chunk.get("text"):
+            chunks.append({
+                "tag": chunk["tag"],
+                "title": chunk.get("title", ""),
+                "url": chunk.get("url"),
+                "position": position,
+                "text": chunk["text"].strip()
+            })
+    return chunks
+
+def insert_domain(domain: str, crawl: bool = False, incremental: bool = False):
+    """
+    Scrape a domain and (re)build its vectorstore.
+    With incremental=True a known domain is only updated where its chunks
+    changed, and a single page answering 304 Not Modified is skipped.
+
+    Concurrent calls for the same domain are single-flight: callers in
+    this process wait for the running ingest and get its result.
+    """
+    return _ingests.do((cache_key(domain), crawl), lambda: _insert_exclusive(domain, crawl, incremental))
+
+def _insert_exclusive(domain: str, crawl: bool, incremental: bool):
+    """
+    Ingest under the domain's writer lock. If another process published
+    the domain while we waited for the lock, its result is taken as ours
+    instead of fetching and embedding everything again.
+    """
+    published = bundle_version(domain)
+    with domain_lock(domain):
+        if bundle_version(domain) != published:
+            # The other worker records the mode it ingested with
+            print(f"♻️ Ingested by another worker while waiting: {domain}")
+            return "success"
+        result = _insert(domain, crawl, incremental)
+    if result in ("success", "unchanged"):
+        cache_manager.record_ingest(domain, crawl=crawl)
+    return result
+
+def _insert(domain: str, crawl: bool, incremental: bool):
     print(f"🔍 Scraping domain: {domain}")
-    structured_chunks = scrape_site_structured(domain)
+    validators = None
+    if incremental and not crawl:
+        # Stored validators are only trusted while the index they describe exists
+        known = load_http_validators(domain) if vectorstore_exists(domain) else None
+        structured_chunks, validators = scrape_if_modified(domain, known)
+        if structured_chunks is None:
+            print(f"♻️ Not modified since last ingest: {domain}")
+            return "unchanged"
+    else:
+        structured_chunks = scrape_site_structured(domain, crawl=crawl)
 
     # Check if scraping failed
     if isinstance(structured_chunks, str) and structured_chunks.startswith("[Error]"):
@@ -15,18 +76,14 @@ def insert_domain(domain: str):
     save_raw_text(domain, structured_chunks)
 
     # Prepare chunks for vectorstore
-    chunks = []
-    for chunk in structured_chunks:
-        if chunk.get("tag") and chunk.get("text"):
-            chunks.append({
-                "tag": chunk["tag"],
-                "text": chunk["text"].strip()
-            })
+    chunks = prepare_chunks(structured_chunks)
 
     if not chunks:
         print("⚠️ No chunks generated from structured scrape.")
         return "[Error] No valid chunks extracted."
 
-    persist_chunks_to_vectorstore(chunks, domain)
+    persist_chunks_to_vectorstore(chunks, domain, incremental=incremental)
+    if validators is not None:
+        save_http_validators(domain, validators)
     print(f"✅ Domain inserted and preprocessed: {domain}")
     return "success"
@@ -0,0 +1,312 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.cache_lock import cache_lock
+
+EMBEDDING_CACHE_DIR = os.path.join("cache", "embeddings")
+MAX_CACHED_EMBEDDINGS = 200_000
+INITIAL_CAPACITY = 1024
+MAX_CACHED_QUERIES = 4096
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk embeddings.
+
+    Vectors are keyed by a 64-bit BLAKE2 hash of (model name, text) and kept
+    in a memory-mapped .npy matrix (float16 by default) next to a small
+    .npz index of keys and last-use ticks. The cache is bounded to
+    `max_entries` rows; the least recently used rows are evicted first.
+    Rows being (re)written have a tick of -1 and are not looked up.
+
+    Several processes (the app, bulk ingest) share the files: lookups and
+    writes hold a cross-process cache_lock, and an instance reloads the
+    index whenever another process has published a newer one.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        max_entries: int = MAX_CACHED_EMBEDDINGS,
+        dtype: str = "float16",
+    ):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.vectors.npy")
+        self.index_path = os.path.join(cache_dir, f"{slug}.index.npz")
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.lock_name = f"embeddings_{slug}"
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    # =============================
+    # 💾 Storage
+    # =============================
+
+    def _reset(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.ticks = np.zeros(0, dtype=np.int64)
+        self.count = 0
+        self.clock = 0
+        self.slots: Dict[int, int] = {}
+        self._synced_clock = 0
+
+    def _index_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._reset()
+        self._stamp = self._index_stamp()
+        if self._stamp is None or not os.path.exists(self.vectors_path):
+            return
+        try:
+            with np.load(self.index_path) as index:
+                keys, ticks = index["keys"], index["ticks"]
+                count, clock = int(index["count"]), int(index["clock"])
+            vectors = np.load(self.vectors_path, mmap_mode="r+")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable embedding cache: {e}")
+            return
+        if vectors.dtype != self.dtype or len(vectors) != len(keys) or count > len(keys):
+            print("⚠️ Ignoring embedding cache with mismatched layout.")
+            return
+
+        self.vectors, self.keys, self.ticks = vectors, keys.copy(), ticks.copy()
+        self.count, self.clock = count, clock
+        live = np.flatnonzero(self.ticks[:count] >= 0)
+        self.slots = dict(zip(self.keys[live].tolist(), live.tolist()))
+        self._synced_clock = clock
+
+    def _sync(self):
+        """
+        Merge in the index another process published since we last read or
+        wrote it, keeping the recency of rows this instance used meanwhile.
+        Called with cache_lock held.
+        """
+        if self._index_stamp() == self._stamp:
+            return
+        used = self.ticks[:self.count] > self._synced_clock
+        recent = self.keys[:self.count][used].tolist()
+        self._load()
+        self.clock += 1
+        touched = [self.slots[key] for key in recent if key in self.slots]
+        self.ticks[touched] = self.clock
+
+    def _resize(self, capacity: int, dim: int):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.vectors_path}.tmp"
+        vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(capacity, dim))
+        if self.vectors is not None and self.count:
+            vectors[:self.count] = self.vectors[:self.count]
+        vectors.flush()
+        del vectors
+        self.vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+        grow = capacity - len(self.keys)
+        self.keys = np.concatenate([self.keys, np.zeros(grow, dtype=np.uint64)])
+        self.ticks = np.concatenate([self.ticks, np.zeros(grow, dtype=np.int64)])
+
+    def flush(self):
+        """
+        Persist vectors and index. The index is written last and swapped in
+        atomically, so it never points at rows that were not written.
+        """
+        with self._lock, cache_lock(self.lock_name):
+            if self.vectors is None:
+                return
+            self.vectors.flush()
+            tmp_path = f"{self.index_path}.tmp.npz"
+            np.savez(tmp_path, keys=self.keys, ticks=self.ticks, count=self.count, clock=self.clock)
+            os.replace(tmp_path, self.index_path)
+            self._stamp = self._index_stamp()
+            self._synced_clock = self.clock
+
+    # =============================
+    # 🔑 Lookup & insert
+    # =============================
+
+    def key(self, text: str) -> int:
+        digest = hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _allocate(self, needed: int, dim: int) -> List[int]:
+        capacity = len(self.keys)
+        if self.vectors is None or capacity < min(self.count + needed, self.max_entries):
+            target = max(INITIAL_CAPACITY, capacity * 2, self.count + needed)
+            self._resize(min(target, self.max_entries), dim)
+            capacity = len(self.keys)
+
+        used = self.count
+        free = capacity - used
+        slots = list(range(used, used + min(free, needed)))
+        self.count += len(slots)
+
+        short = needed - len(slots)
+        if short > 0:
+            # Evict the least recently used of the rows in use before this call
+            victims = np.argpartition(self.ticks[:used], short - 1)[:short].tolist()
+            for slot in victims:
+                key = int(self.keys[slot])
+                if self.slots.get(key) == slot:
+                    del self.slots[key]
+            self.evictions += short
+            slots.extend(victims)
+
+        self.ticks[slots] = -1
+        if short > 0:
+            # Unpublish the victims before their rows are overwritten, so a
+            # crash never leaves the index pointing at another key's vector
+            self.flush()
+        return slots
+
+    def _put(self, keys: List[int], vectors: np.ndarray):
+        # Another process may have stored some of these since the lookup
+        new = [i for i, key in enumerate(keys) if key not in self.slots]
+        self.ticks[[self.slots[key] for key in keys if key in self.slots]] = self.clock
+        if not new:
+            return
+        keys, vectors = [keys[i] for i in new], vectors[new]
+        if len(keys) > self.max_entries:
+            keys, vectors = keys[-self.max_entries:], vectors[-self.max_entries:]
+        if self.vectors is not None and self.vectors.shape[1] != vectors.shape[1]:
+            raise ValueError(f"Embedding size changed for {self.model_name}: "
+                             f"{self.vectors.shape[1]} -> {vectors.shape[1]}")
+
+        slots = self._allocate(len(keys), vectors.shape[1])
+        self.vectors[slots] = vectors
+        self.keys[slots] = keys
+        self.ticks[slots] = self.clock
+        for key, slot in zip(keys, slots):
+            self.slots[key] = slot
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable) -> np.ndarray:
+        """
+        Return float32 embeddings for `texts`, calling encode_fn once on the
+        distinct texts that are not cached yet.
+        """
+        texts = list(texts)
+        keys = [self.key(text) for text in texts]
+        result = None
+
+        with self._lock, cache_lock(self.lock_name):
+            self._sync()
+            self.clock += 1
+            found = [self.slots.get(key) for key in keys]
+            hit_rows = [i for i, slot in enumerate(found) if slot is not None]
+            if hit_rows:
+                hit_slots = [found[i] for i in hit_rows]
+                self.ticks[hit_slots] = self.clock
+                result = np.empty((len(texts), self.vectors.shape[1]), dtype=np.float32)
+                result[hit_rows] = self.vectors[hit_slots]
+
+        missing: Dict[int, int] = {}
+        for i, slot in enumerate(found):
+            if slot is None:
+                missing.setdefault(keys[i], i)
+
+        with self._lock:
+            self.hits += len(hit_rows)
+            self.misses += len(texts) - len(hit_rows)
+        if not missing:
+            return result if result is not None else np.zeros((0, 0), dtype=np.float32)
+
+        miss_keys = list(missing)
+        encoded = np.asarray(encode_fn([texts[i] for i in missing.values()]))
+        # Round through the storage dtype so hits and misses are identical
+        encoded = encoded.astype(self.dtype).astype(np.float32)
+
+        if result is None:
+            result = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        position = {key: row for row, key in enumerate(miss_keys)}
+        for i, slot in enumerate(found):
+            if slot is None:
+                result[i] = encoded[position[keys[i]]]
+
+        with self._lock, cache_lock(self.lock_name):
+            self._sync()
+            self.clock += 1
+            self._put(miss_keys, encoded)
+            self.flush()
+        return result
+
+    # =============================
+    # 📊 Metrics
+    # =============================
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.slots),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU of query embeddings, shared by every retriever in the
+    process so a repeated task string is only encoded once.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_QUERIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, queries: Sequence[str], encode_fn: Callable) -> np.ndarray:
+        """
+        float32 embeddings for `queries`, encoding the unseen ones in one batch.
+        """
+        queries = list(queries)
+        with self._lock:
+            found = {}
+            for query in queries:
+                vector = self._entries.get(query)
+                if vector is not None:
+                    self._entries.move_to_end(query)
+                    found[query] = vector
+            unseen = [q for q in queries if q not in found]
+            self.hits += len(queries) - len(unseen)
+            self.misses += len(unseen)
+            missing = list(dict.fromkeys(unseen))
+
+        if missing:
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32)
+            with self._lock:
+                for query, vector in zip(missing, encoded):
+                    found[query] = vector
+                    self._entries[query] = vector
+                    self._entries.move_to_end(query)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return np.stack([found[q] for q in queries]) if queries else np.zeros((0, 0), dtype=np.float32)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
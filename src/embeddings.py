@@ -1,4 +1,235 @@
-from sentence_transformers import SentenceTransformer
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
 
-# Load once and reuse across modules
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
+
+import config
+from src.model_registry import model_registry
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# 🔌 Which implementation encodes (see config.py)
+EMBEDDING_BACKEND = config.EMBEDDING_BACKEND
+
+# int8 ONNX export published with the model (needs sentence-transformers[onnx] >= 3.2)
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+MAX_SEQ_TOKENS = 256          # all-MiniLM-L6-v2 truncates longer inputs
+CHARS_PER_TOKEN = 4           # rough WordPiece ratio for English web text
+BATCH_TOKEN_BUDGET = 8192     # padded tokens per forward pass
+MAX_BATCH_SIZE = 128
+BATCH_WAIT_SEC = 0.005        # how long a pass waits for concurrent requests to join
+
+
+# =============================
+# 🔌 Backends
+# =============================
+
+class EmbeddingBackend(ABC):
+    """
+    Turns one batch of texts into float32 vectors. `name` identifies the
+    vectors it produces (embedding cache keys), so a quantized backend
+    never serves vectors cached by the reference model or vice versa.
+    """
+
+    name = EMBEDDING_MODEL_NAME
+
+    @abstractmethod
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    The reference PyTorch model; quantize=True applies dynamic int8
+    quantization to its Linear layers (CPU only).
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = False):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.name = model_name
+        if quantize:
+            import torch
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.name = f"{model_name}+torch-int8"
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxBackend(SentenceTransformerBackend):
+    """
+    The same model run by ONNX Runtime, optionally from its int8 export.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = True):
+        from sentence_transformers import SentenceTransformer
+        model_kwargs = {"file_name": ONNX_INT8_FILE} if quantize else {}
+        self.model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        self.name = f"{model_name}+onnx-int8" if quantize else f"{model_name}+onnx"
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[[], EmbeddingBackend]] = {
+    "torch": lambda: SentenceTransformerBackend(),
+    "torch-int8": lambda: SentenceTransformerBackend(quantize=True),
+    "onnx": lambda: OnnxBackend(quantize=False),
+    "onnx-int8": lambda: OnnxBackend(quantize=True),
+}
+
+
+def backend_cache_name(kind: str = EMBEDDING_BACKEND) -> str:
+    """
+    Cache identity of a backend's vectors, known without loading it.
+    """
+    if kind not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{kind}' (choose from {', '.join(EMBEDDING_BACKENDS)})")
+    return EMBEDDING_MODEL_NAME if kind == "torch" else f"{EMBEDDING_MODEL_NAME}+{kind}"
+
+
+EMBEDDING_CACHE_NAME = backend_cache_name()
+
+
+# =============================
+# 📏 Length bucketing
+# =============================
+
+def estimate_tokens(texts: Sequence[str]) -> np.ndarray:
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    return np.minimum(lengths // CHARS_PER_TOKEN + 2, MAX_SEQ_TOKENS)
+
+
+def plan_batches(texts: Sequence[str], token_budget: int = BATCH_TOKEN_BUDGET, max_batch: int = MAX_BATCH_SIZE) -> List[np.ndarray]:
+    """
+    Positions of `texts` grouped into forward passes of similar length,
+    longest first. A batch is padded to its longest text, so it holds at
+    most token_budget // that length texts (and at most max_batch).
+    """
+    tokens = estimate_tokens(texts)
+    order = np.argsort(-tokens, kind="stable")
+    batches, start = [], 0
+    while start < len(order):
+        size = max(1, min(max_batch, token_budget // int(tokens[order[start]])))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def encode_bucketed(encode_batch: Callable[[List[str]], np.ndarray], texts: Sequence[str], **plan) -> np.ndarray:
+    """
+    Encode `texts` in length-bucketed batches; rows come back in input order.
+    """
+    result = None
+    for batch in plan_batches(texts, **plan):
+        vectors = np.asarray(encode_batch([texts[i] for i in batch]), dtype=np.float32)
+        if result is None:
+            result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        result[batch] = vectors
+    return result if result is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+# =============================
+# 🚌 Dynamic batching
+# =============================
+
+class BatchingEncoder:
+    """
+    Thread-safe front of a backend, shared by every session and worker in
+    the process. encode() requests arriving within `wait_sec` of each
+    other are merged and run as one set of length-bucketed passes; each
+    caller gets its own rows back. A request of max_batch texts or more
+    starts at once.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        wait_sec: float = BATCH_WAIT_SEC,
+        token_budget: int = BATCH_TOKEN_BUDGET,
+        max_batch: int = MAX_BATCH_SIZE,
+    ):
+        self.backend = backend
+        self.name = backend.name
+        self.wait_sec = wait_sec
+        self.token_budget = token_budget
+        self.max_batch = max_batch
+        self.requests = 0
+        self.passes = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        batch_size: Optional[int] = None,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        """
+        float32 vectors for `texts`. Takes the SentenceTransformer.encode
+        options callers use: batch_size and show_progress_bar are accepted
+        but passes are sized by the token budget; normalize_embeddings
+        L2-normalizes the caller's rows. Any other option is a TypeError.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        vectors = future.result()
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+    def _collect(self) -> list:
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.wait_sec
+        while size < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _encode_pass(self, texts: List[str]) -> np.ndarray:
+        self.passes += 1
+        return self.backend.encode_batch(texts)
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for request, _ in pending for text in request]
+            self.requests += len(pending)
+            try:
+                vectors = encode_bucketed(self._encode_pass, texts, token_budget=self.token_budget, max_batch=self.max_batch)
+            except BaseException as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for request, future in pending:
+                future.set_result(vectors[offset:offset + len(request)])
+                offset += len(request)
+
+
+def _load_embedding_model() -> BatchingEncoder:
+    # Backends import sentence_transformers / torch / onnxruntime only here
+    return BatchingEncoder(EMBEDDING_BACKENDS[EMBEDDING_BACKEND]())
+
+
+# Loaded on first use and reused across modules (see src/model_registry.py)
+embedding_model = model_registry.register("embedding", _load_embedding_model)
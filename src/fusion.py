@@ -0,0 +1,138 @@
+from typing import Optional
+
+import numpy as np
+
+FUSION_STRATEGIES = ("weighted", "rrf", "dense", "sparse")
+DEFAULT_STRATEGY = "weighted"
+CANDIDATE_MULTIPLIER = 4   # candidates taken from each retriever per requested hit
+RRF_K = 60
+
+
+def sparse_candidates(scores: np.ndarray, pool: int) -> np.ndarray:
+    """
+    Positions of the `pool` best positive BM25 scores, best first.
+    """
+    positive = np.flatnonzero(scores > 0)
+    if len(positive) > pool:
+        values = scores[positive]
+        cutoff = np.partition(values, len(values) - pool)[len(values) - pool]
+        # Ties at the cutoff go to the earliest chunks
+        above = positive[values > cutoff]
+        tied = positive[values == cutoff][:pool - len(above)]
+        positive = np.concatenate([above, tied])
+    return positive[_rank(scores[positive], positive)]
+
+
+def _rank(scores: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    # Highest score first, earlier chunk first on ties
+    return np.lexsort((positions, -scores))
+
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    if not len(values):
+        return values
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.ones_like(values)
+    return (values - low) / (high - low)
+
+
+def top_candidates(keys: np.ndarray, values: np.ndarray, pool: int):
+    """
+    The `pool` best (key, value) pairs, best first, lowest key first on ties.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    order = _rank(values, keys)[:pool]
+    return keys[order], values[order]
+
+
+def fuse(
+    dense_ids: Optional[np.ndarray],
+    dense_similarity: Optional[np.ndarray],
+    sparse_scores: Optional[np.ndarray],
+    top_k: int,
+    strategy: str = DEFAULT_STRATEGY,
+    mix_ratio: float = 0.5,
+    pool: Optional[int] = None,
+    rrf_k: int = RRF_K,
+) -> np.ndarray:
+    """
+    Merge dense (FAISS) and sparse (BM25) results into the top_k chunk positions.
+
+    dense_ids / dense_similarity are one FAISS result row, converted to
+    similarities (see ann.dense_scores), with -1 ids for padding;
+    sparse_scores holds a BM25 score per chunk. Only the best `pool`
+    candidates of each side are fused:
+
+    - "weighted": mix_ratio * dense + (1 - mix_ratio) * sparse, each
+      min-max normalised over the candidates
+    - "rrf": reciprocal rank fusion, weighted the same way
+    - "dense" / "sparse": one retriever only
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}', expected one of {FUSION_STRATEGIES}")
+    pool = pool or CANDIDATE_MULTIPLIER * top_k
+
+    dense = np.zeros(0, dtype=np.int64)
+    similarity = np.zeros(0)
+    if strategy != "sparse" and dense_ids is not None:
+        valid = dense_ids >= 0
+        dense = np.asarray(dense_ids[valid][:pool], dtype=np.int64)
+        similarity = np.asarray(dense_similarity[valid][:pool], dtype=np.float64)
+        # FAISS can repeat a position (duplicate ids); keep its best hit
+        dense, first = np.unique(dense, return_index=True)
+        similarity = similarity[first]
+        order = _rank(similarity, dense)
+        dense, similarity = dense[order], similarity[order]
+
+    sparse = np.zeros(0, dtype=np.int64)
+    sparse_values = np.zeros(0)
+    if strategy != "dense" and sparse_scores is not None:
+        sparse = sparse_candidates(np.asarray(sparse_scores), pool)
+        sparse_values = np.asarray(sparse_scores, dtype=np.float64)[sparse]
+
+    return fuse_candidates(dense, similarity, sparse, sparse_values, top_k,
+                           strategy=strategy, mix_ratio=mix_ratio, rrf_k=rrf_k)
+
+
+def fuse_candidates(
+    dense: np.ndarray,
+    similarity: np.ndarray,
+    sparse: np.ndarray,
+    sparse_values: np.ndarray,
+    top_k: int,
+    strategy: str = DEFAULT_STRATEGY,
+    mix_ratio: float = 0.5,
+    rrf_k: int = RRF_K,
+) -> np.ndarray:
+    """
+    fuse() over already selected candidates: unique int64 keys of each side,
+    best first, with their similarity / BM25 score. Keys can be anything
+    (chunk positions, or shard + position for the global index).
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}', expected one of {FUSION_STRATEGIES}")
+    if strategy == "dense":
+        return dense[:top_k]
+    if strategy == "sparse":
+        return sparse[:top_k]
+
+    candidates = np.union1d(dense, sparse)
+    if not len(candidates):
+        return candidates
+    dense_slot = np.searchsorted(candidates, dense)
+    sparse_slot = np.searchsorted(candidates, sparse)
+
+    fused = np.zeros(len(candidates))
+    if strategy == "weighted":
+        dense_part = np.zeros(len(candidates))
+        dense_part[dense_slot] = _min_max(similarity)
+        sparse_part = np.zeros(len(candidates))
+        sparse_part[sparse_slot] = _min_max(sparse_values)
+        fused = mix_ratio * dense_part + (1.0 - mix_ratio) * sparse_part
+    else:
+        fused[dense_slot] += mix_ratio / (rrf_k + np.arange(1, len(dense) + 1))
+        fused[sparse_slot] += (1.0 - mix_ratio) / (rrf_k + np.arange(1, len(sparse) + 1))
+
+    return candidates[_rank(fused, candidates)][:top_k]
@@ -0,0 +1,572 @@
+import argparse
+import functools
+import json
+import math
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.ann import (
+    FLAT_MAX_VECTORS,
+    IVF_FLAT_MAX_VECTORS,
+    build_index,
+    configure_search,
+    filtered_search_params,
+    load_index_meta,
+    normalize,
+    save_index_meta,
+)
+from src.bm25 import SparseBM25
+from src.bundle import migrate_legacy_cache
+from src.cache_lock import GLOBAL_INDEX_LOCK, atomic_write, cache_lock
+from src.fusion import CANDIDATE_MULTIPLIER, DEFAULT_STRATEGY, FUSION_STRATEGIES, fuse_candidates, sparse_candidates, top_candidates
+from src.model_registry import lazy_import
+from src.utils import cache_key, get_bundle_path
+from src.vectorstore import (
+    embedding_model,
+    encode_chunks,
+    load_chunk_texts,
+    query_embedding_cache,
+    vectorstore_exists,
+)
+
+faiss = lazy_import("faiss")
+
+GLOBAL_INDEX_DIR = os.path.join("cache", "global")
+MANIFEST_VERSION = 1
+
+# Shards stay within the exact / IVF-Flat tiers, where FAISS can apply a
+# domain filter during the search
+SHARD_SIZE = IVF_FLAT_MAX_VECTORS
+# Filtered searches over at most this many vectors are scored exactly
+EXACT_SEARCH_MAX_VECTORS = FLAT_MAX_VECTORS
+
+SHARD_BITS = 32   # global key = shard id << SHARD_BITS | position in shard
+# Superseded shards stay on disk this long, for searches still using an older manifest
+RETIRED_SHARD_GRACE_SEC = 10 * 60
+
+
+# =============================
+# 🧩 Shards
+# =============================
+
+class Shard:
+    """
+    One immutable slice of the global corpus, memory-mapped from disk:
+
+    - index.faiss (+ .meta.json): ID-mapped FAISS index, ids = positions
+    - bm25.bin: SparseBM25 over the same rows
+    - vectors.npy: normalised float16 vectors, for exact filtered search
+    - domain_ids.npy: uint32 domain id per row
+    - texts.bin / offsets.npy: UTF-8 chunk texts and their byte offsets
+    """
+
+    def __init__(self, path: str, shard_id: int):
+        self.path = path
+        self.shard_id = shard_id
+
+        index_path = os.path.join(path, "index.faiss")
+        self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        self.index_params = load_index_meta(index_path)
+        configure_search(self.index, self.index_params)
+        self.bm25 = SparseBM25.load(os.path.join(path, "bm25.bin"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.domain_ids = np.load(os.path.join(path, "domain_ids.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        texts_path = os.path.join(path, "texts.bin")
+        self.blob = np.memmap(texts_path, dtype=np.uint8, mode="r") if os.path.getsize(texts_path) else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.domain_ids)
+
+    def text(self, position: int) -> str:
+        return bytes(self.blob[self.offsets[position]:self.offsets[position + 1]]).decode("utf-8")
+
+    @staticmethod
+    def write(path: str, vectors: np.ndarray, texts: List[str], domain_ids: np.ndarray):
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        vectors = normalize(vectors)
+        index, index_params = build_index(vectors, np.arange(len(texts), dtype=np.int64))
+        faiss.write_index(index, os.path.join(tmp_path, "index.faiss"))
+        save_index_meta(os.path.join(tmp_path, "index.faiss"), index_params)
+        SparseBM25.from_texts(texts).save(os.path.join(tmp_path, "bm25.bin"))
+        np.save(os.path.join(tmp_path, "vectors.npy"), vectors.astype(np.float16))
+        np.save(os.path.join(tmp_path, "domain_ids.npy"), np.asarray(domain_ids, dtype=np.uint32))
+
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        with open(os.path.join(tmp_path, "texts.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+
+class _ShardWriter:
+    """
+    Buffers rows and writes them out as shards of SHARD_SIZE rows,
+    recording which shards each domain's rows went to.
+    """
+
+    def __init__(self, index: "GlobalIndex"):
+        self.index = index
+        self.vectors: List[np.ndarray] = []
+        self.texts: List[str] = []
+        self.domain_ids: List[np.ndarray] = []
+        self.written: List[dict] = []
+        self.homes: Dict[int, List[int]] = {}
+
+    def extend(self, vectors: np.ndarray, texts: List[str], domain_ids: np.ndarray):
+        self.vectors.append(np.asarray(vectors, dtype=np.float32))
+        self.texts.extend(texts)
+        self.domain_ids.append(np.asarray(domain_ids, dtype=np.uint32))
+        while len(self.texts) >= SHARD_SIZE:
+            self._flush(SHARD_SIZE)
+
+    def close(self):
+        if self.texts:
+            self._flush(len(self.texts))
+
+    def _flush(self, count: int):
+        vectors = np.concatenate(self.vectors)
+        domain_ids = np.concatenate(self.domain_ids)
+        shard_id = self.index.manifest["next_shard"]
+        self.index.manifest["next_shard"] += 1
+
+        Shard.write(self.index.shard_path(shard_id), vectors[:count], self.texts[:count], domain_ids[:count])
+        self.written.append({"id": shard_id, "vectors": count})
+        for domain_id in np.unique(domain_ids[:count]).tolist():
+            self.homes.setdefault(domain_id, []).append(shard_id)
+
+        self.vectors = [vectors[count:]]
+        self.texts = self.texts[count:]
+        self.domain_ids = [domain_ids[count:]]
+
+
+# =============================
+# 🌐 Global index
+# =============================
+
+def _writer(method):
+    """
+    Run a GlobalIndex method under the index's writer lock, on a freshly
+    read manifest, so a writer in another process is built upon rather
+    than overwritten. Searches stay lock-free on the published manifest.
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with cache_lock(GLOBAL_INDEX_LOCK):
+            self._reload()
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class GlobalIndex:
+    """
+    Cross-domain corpus: every ingested domain appended into shared,
+    sharded FAISS + BM25 indexes, with a uint32 domain id per vector.
+
+    Shards are immutable. manifest.json lists them and, per domain id,
+    the shards holding the domain's current rows; rows of a re-added or
+    removed domain left behind in older shards are masked out at query
+    time until compact() rewrites them away.
+
+    Searches re-read the manifest when another writer has replaced it.
+    Shards a writer supersedes are listed as retired and only deleted
+    RETIRED_SHARD_GRACE_SEC later, so a search that started on the
+    previous manifest can still open them.
+    """
+
+    def __init__(self, root: str = GLOBAL_INDEX_DIR):
+        self.root = root
+        self._shards: Dict[int, Shard] = {}
+        self._live: Dict[int, tuple] = {}
+        self._reload()
+
+    # -----------------------------
+    # Manifest
+    # -----------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, "manifest.json")
+
+    def shard_path(self, shard_id: int) -> str:
+        return os.path.join(self.root, f"shard_{shard_id:05d}")
+
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"version": MANIFEST_VERSION, "domains": [], "shards": [], "next_shard": 0}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported global index version {manifest.get('version')} in {self.manifest_path}")
+        return manifest
+
+    def _write_manifest(self):
+        with atomic_write(self.manifest_path) as f:
+            json.dump(self.manifest, f)
+        self._stamp = self._manifest_stamp()
+
+    def _manifest_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        self._stamp = self._manifest_stamp()
+        self.manifest = self._read_manifest()
+        self._ids = {entry["key"]: i for i, entry in enumerate(self.manifest["domains"])}
+        self._live.clear()
+        current = {s["id"] for s in self.manifest["shards"]}
+        for shard_id in [s for s in self._shards if s not in current]:
+            del self._shards[shard_id]
+
+    def refresh(self):
+        """
+        Pick up a manifest published by another writer since the last read.
+        """
+        if self._manifest_stamp() != self._stamp:
+            self._reload()
+
+    def domain_id(self, domain: str) -> Optional[int]:
+        return self._ids.get(cache_key(domain))
+
+    def domain_name(self, domain_id: int) -> str:
+        return self.manifest["domains"][domain_id]["domain"]
+
+    def domains(self) -> List[str]:
+        """
+        Domains that currently have rows in the index.
+        """
+        self.refresh()
+        return [entry["domain"] for entry in self.manifest["domains"] if entry["shards"]]
+
+    def _shard(self, shard_id: int) -> Shard:
+        if shard_id not in self._shards:
+            self._shards[shard_id] = Shard(self.shard_path(shard_id), shard_id)
+        return self._shards[shard_id]
+
+    def _live_mask(self, shard: Shard, wanted: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Per-row bool: the row belongs to its domain's current rows (and to
+        one of the `wanted` domain ids, if given).
+        """
+        if shard.shard_id not in self._live:
+            current = np.array([shard.shard_id in entry["shards"] for entry in self.manifest["domains"]], dtype=bool)
+            self._live[shard.shard_id] = (current, current[shard.domain_ids])
+        current, live = self._live[shard.shard_id]
+        if wanted is None:
+            return live
+        selected = np.zeros(len(current), dtype=bool)
+        selected[wanted] = True
+        return live & selected[shard.domain_ids]
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+
+    @staticmethod
+    def _fingerprint(domain: str) -> list:
+        if not os.path.exists(get_bundle_path(domain)):
+            migrate_legacy_cache(domain)
+        stat = os.stat(get_bundle_path(domain))
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @_writer
+    def add_domains(self, domains: Iterable[str]) -> dict:
+        """
+        Append the indexed chunks of each domain (see vectorstore) to the
+        global index. Domains whose bundle is unchanged since they were
+        added are skipped; changed ones replace their previous rows.
+
+        Vectors come through the embedding cache, so domains ingested
+        before are not re-encoded. New rows top up the last shard if it
+        is not full, then fill new shards.
+        """
+        counts = {"added": 0, "unchanged": 0, "missing": 0, "vectors": 0}
+        texts: List[str] = []
+        domain_ids: List[int] = []
+        for domain in dict.fromkeys(domains):
+            if not vectorstore_exists(domain):
+                counts["missing"] += 1
+                continue
+            domain_id = self.domain_id(domain)
+            fingerprint = self._fingerprint(domain)
+            if domain_id is not None:
+                entry = self.manifest["domains"][domain_id]
+                if entry["shards"] and entry["fingerprint"] == fingerprint:
+                    counts["unchanged"] += 1
+                    continue
+                entry["fingerprint"] = fingerprint
+            else:
+                domain_id = len(self.manifest["domains"])
+                self.manifest["domains"].append({"domain": domain, "key": cache_key(domain), "fingerprint": fingerprint, "shards": []})
+                self._ids[cache_key(domain)] = domain_id
+            chunks = load_chunk_texts(domain)
+            texts.extend(chunks)
+            domain_ids.extend([domain_id] * len(chunks))
+            counts["added"] += 1
+
+        if not texts:
+            print(f"♻️ Global index unchanged ({counts['unchanged']} domain(s) up to date)")
+            return counts
+        vectors = encode_chunks(texts)
+        domain_ids = np.asarray(domain_ids, dtype=np.uint32)
+        replaced = set(domain_ids.tolist())
+
+        writer = _ShardWriter(self)
+        absorbed = None
+        shards = self.manifest["shards"]
+        if shards and shards[-1]["vectors"] < SHARD_SIZE:
+            # Rewrite the partly filled last shard together with the new rows
+            absorbed = shards.pop()
+            tail = self._shard(absorbed["id"])
+            keep = self._live_mask(tail) & ~np.isin(tail.domain_ids, list(replaced))
+            rows = np.flatnonzero(keep)
+            writer.extend(np.asarray(tail.vectors[rows], dtype=np.float32),
+                          [tail.text(i) for i in rows], tail.domain_ids[rows])
+        writer.extend(vectors, texts, domain_ids)
+        writer.close()
+
+        self._publish(writer, replaced, dropped=[absorbed["id"]] if absorbed else [])
+        counts["vectors"] = len(texts)
+        print(f"✅ Global index: +{counts['added']} domain(s), {len(texts)} vectors in {len(writer.written)} shard(s)")
+        return counts
+
+    @_writer
+    def remove_domains(self, domains: Iterable[str]) -> int:
+        """
+        Drop domains from search results. Their rows stay on disk until compact().
+        """
+        removed = 0
+        for domain in domains:
+            domain_id = self.domain_id(domain)
+            if domain_id is not None and self.manifest["domains"][domain_id]["shards"]:
+                self.manifest["domains"][domain_id]["shards"] = []
+                removed += 1
+        if removed:
+            self._write_manifest()
+            self._live.clear()
+        return removed
+
+    @_writer
+    def compact(self) -> dict:
+        """
+        Rewrite all shards without stale rows, packed to SHARD_SIZE.
+        """
+        writer = _ShardWriter(self)
+        before = sum(s["vectors"] for s in self.manifest["shards"])
+        dropped = [s["id"] for s in self.manifest["shards"]]
+        for shard_id in dropped:
+            shard = self._shard(shard_id)
+            rows = np.flatnonzero(self._live_mask(shard))
+            if len(rows):
+                writer.extend(np.asarray(shard.vectors[rows], dtype=np.float32),
+                              [shard.text(i) for i in rows], shard.domain_ids[rows])
+        writer.close()
+
+        self.manifest["shards"] = []
+        self._publish(writer, set(range(len(self.manifest["domains"]))), dropped=dropped)
+        after = sum(s["vectors"] for s in self.manifest["shards"])
+        print(f"🧹 Global index compacted: {before} → {after} vectors, {len(self.manifest['shards'])} shard(s)")
+        return {"before": before, "after": after, "shards": len(self.manifest["shards"])}
+
+    def _publish(self, writer: _ShardWriter, replaced: set, dropped: List[int]):
+        # Replaced domains live only in the new shards; others lose any dropped shard
+        for domain_id, entry in enumerate(self.manifest["domains"]):
+            kept = [] if domain_id in replaced else [s for s in entry["shards"] if s not in dropped]
+            entry["shards"] = kept + writer.homes.get(domain_id, [])
+        self.manifest["shards"].extend(writer.written)
+
+        # New readers only see the new manifest; superseded shards are deleted after a grace period
+        now = time.time()
+        retired = self.manifest.get("retired", []) + [{"id": shard_id, "at": now} for shard_id in dropped]
+        expired = [r["id"] for r in retired if now - r["at"] >= RETIRED_SHARD_GRACE_SEC]
+        self.manifest["retired"] = [r for r in retired if r["id"] not in expired]
+        self._write_manifest()
+        self._live.clear()
+        for shard_id in dropped:
+            self._shards.pop(shard_id, None)
+        for shard_id in expired:
+            shutil.rmtree(self.shard_path(shard_id), ignore_errors=True)
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+
+    def _term_idf(self, shards: List[Shard], queries: List[str]) -> Dict[str, float]:
+        """
+        BM25 idf over the whole corpus for the query terms, so scores from
+        different shards are comparable.
+        """
+        tokenizer = shards[0].bm25.tokenizer
+        tokens = {token for query in queries for token in tokenizer(query)}
+        n_docs = sum(shard.bm25.corpus_size for shard in shards)
+        df = dict.fromkeys(tokens, 0)
+        for shard in shards:
+            for token, count in shard.bm25.document_frequencies(tokens).items():
+                df[token] += count
+        mean_idf = sum(float(np.mean(s.bm25.idf)) * s.bm25.corpus_size for s in shards if len(s.bm25.idf)) / max(n_docs, 1)
+        epsilon = shards[0].bm25.epsilon
+        term_idf = {}
+        for token, count in df.items():
+            if count:
+                idf = math.log(n_docs - count + 0.5) - math.log(count + 0.5)
+                term_idf[token] = idf if idf >= 0 else epsilon * mean_idf
+        return term_idf
+
+    @staticmethod
+    def _dense(shard: Shard, rows: Optional[np.ndarray], query_vectors: np.ndarray, pool: int):
+        """
+        (positions, similarities) per query; `rows` restricts the search.
+        """
+        if rows is not None and len(rows) <= EXACT_SEARCH_MAX_VECTORS:
+            similarity = query_vectors @ np.asarray(shard.vectors[rows], dtype=np.float32).T
+            k = min(pool, len(rows))
+            best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            return rows[best], np.take_along_axis(similarity, best, axis=1)
+
+        params = None if rows is None else filtered_search_params(shard.index_params, rows)
+        D, I = shard.index.search(query_vectors, min(pool, shard.index.ntotal), params=params)
+        return I, D
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        domains: Optional[Iterable[str]] = None,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Top chunks across all domains, or only within `domains`.
+        Each hit is {"domain", "domain_id", "text"}.
+        """
+        return self.search_many([query], top_k=top_k, domains=domains, mix_ratio=mix_ratio, strategy=strategy, pool=pool)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 10,
+        domains: Optional[Iterable[str]] = None,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+    ) -> List[List[dict]]:
+        """
+        Ranked hits for each query. Every shard contributes its best `pool`
+        dense and sparse candidates; they are merged by similarity / global
+        BM25 score and fused once, so ranks are comparable across shards.
+        """
+        if strategy not in FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy '{strategy}', expected one of {FUSION_STRATEGIES}")
+        if not queries:
+            return []
+        pool = pool or CANDIDATE_MULTIPLIER * top_k
+        self.refresh()
+
+        wanted = None
+        if domains is not None:
+            wanted = np.array([i for i in (self.domain_id(d) for d in domains) if i is not None], dtype=np.int64)
+        shards = [self._shard(s["id"]) for s in self.manifest["shards"]]
+        if not shards or (wanted is not None and not len(wanted)):
+            return [[] for _ in queries]
+
+        query_vectors = None
+        if strategy != "sparse":
+            query_vectors = normalize(query_embedding_cache.encode(queries, embedding_model.encode))
+        term_idf = self._term_idf(shards, queries) if strategy != "dense" else None
+
+        dense = [([], []) for _ in queries]
+        sparse = [([], []) for _ in queries]
+        for shard in shards:
+            live = self._live_mask(shard, wanted)
+            if not live.any():
+                continue
+            rows = None if live.all() else np.flatnonzero(live)
+            base = np.int64(shard.shard_id) << SHARD_BITS
+
+            if query_vectors is not None:
+                I, D = self._dense(shard, rows, query_vectors, pool)
+                for row in range(len(queries)):
+                    valid = I[row] >= 0
+                    dense[row][0].append(base | I[row][valid].astype(np.int64))
+                    dense[row][1].append(D[row][valid])
+            if term_idf is not None:
+                scores = shard.bm25.score_many(queries, term_idf=term_idf)
+                if rows is not None:
+                    scores[:, ~live] = 0
+                for row in range(len(queries)):
+                    positions = sparse_candidates(scores[row], pool)
+                    sparse[row][0].append(base | positions.astype(np.int64))
+                    sparse[row][1].append(scores[row][positions])
+
+        results = []
+        for row in range(len(queries)):
+            dense_keys, similarity = top_candidates(*_concat(dense[row]), pool)
+            sparse_keys, sparse_values = top_candidates(*_concat(sparse[row]), pool)
+            hits = fuse_candidates(dense_keys, similarity, sparse_keys, sparse_values, top_k,
+                                   strategy=strategy, mix_ratio=mix_ratio)
+            results.append([self._hit(int(key)) for key in hits])
+        return results
+
+    def _hit(self, key: int) -> dict:
+        shard = self._shard(key >> SHARD_BITS)
+        position = key & ((1 << SHARD_BITS) - 1)
+        domain_id = int(shard.domain_ids[position])
+        return {"domain": self.domain_name(domain_id), "domain_id": domain_id, "text": shard.text(position)}
+
+
+def _concat(parts: tuple):
+    keys, values = parts
+    if not keys:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.concatenate(keys), np.concatenate(values)
+
+
+# =============================
+# 🖥️ CLI
+# =============================
+
+def main(argv: Optional[List[str]] = None):
+    from src.bulk_ingest import read_domains
+
+    parser = argparse.ArgumentParser(description="Build or query the cross-domain global index.")
+    parser.add_argument("--root", default=GLOBAL_INDEX_DIR, help="global index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="append ingested domains")
+    add.add_argument("domains_file", help="text file with one domain per line")
+    commands.add_parser("compact", help="rewrite shards without stale rows")
+    search = commands.add_parser("search", help="query the index")
+    search.add_argument("query")
+    search.add_argument("--domain", action="append", help="restrict to this domain (repeatable)")
+    search.add_argument("--top-k", type=int, default=10)
+    search.add_argument("--strategy", choices=FUSION_STRATEGIES, default=DEFAULT_STRATEGY)
+    args = parser.parse_args(argv)
+
+    index = GlobalIndex(args.root)
+    if args.command == "add":
+        index.add_domains(read_domains(args.domains_file))
+    elif args.command == "compact":
+        index.compact()
+    else:
+        for i, hit in enumerate(index.search(args.query, top_k=args.top_k, domains=args.domain, strategy=args.strategy)):
+            preview = hit["text"][:200] + ("..." if len(hit["text"]) > 200 else "")
+            print(f"[{i + 1}] {hit['domain']}: {preview}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
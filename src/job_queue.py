@@ -0,0 +1,393 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from src.utils import CACHE_DIR
+
+JOBS_DB_PATH = os.path.join(CACHE_DIR, "jobs.sqlite3")
+JOB_WORKERS = 2
+POLL_SEC = 0.5                 # idle workers look for queued jobs this often
+HEARTBEAT_SEC = 10             # running jobs are marked alive this often
+STALE_SEC = 120                # a running job without a heartbeat this long is orphaned
+MAX_ATTEMPTS = 3               # orphaned jobs are re-queued at most this many times
+PARTIAL_RESULT_SEC = 2         # how often long jobs publish their results so far
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT,
+    state TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, id);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# =============================
+# 🗄️ Persistent queue
+# =============================
+
+class JobQueue:
+    """
+    Jobs persisted in SQLite, so they outlive Streamlit reruns, sessions
+    and server restarts. A job moves queued → running → done / failed,
+    or to cancelled. Running jobs report progress (0..1 plus a message)
+    and a heartbeat; a job whose worker died is re-queued, up to
+    MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._ready = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._ready:
+            # Created on first use, not at import
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        if not self._ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._ready = True
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, kind: str, params: dict, owner: Optional[str] = None) -> int:
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (kind, params, owner, state, created) VALUES (?, ?, ?, ?, ?)",
+                (kind, json.dumps(params), owner, QUEUED, self.clock()),
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[dict]:
+        with self._connect() as db:
+            return self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, owner: Optional[str] = None, states: Optional[Sequence[str]] = None, limit: int = 100) -> List[dict]:
+        """
+        Newest jobs first, optionally of one owner and in given states.
+        """
+        query, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if owner is not None:
+            query += " AND owner = ?"
+            args.append(owner)
+        if states:
+            query += f" AND state IN ({', '.join('?' * len(states))})"
+            args.extend(states)
+        query += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as db:
+            return [self._row(row) for row in db.execute(query, args)]
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a queued job at once; ask a running one to stop at its next
+        checkpoint. Returns False if the job had already finished.
+        """
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            state = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if state is None or state[0] not in ACTIVE_STATES:
+                db.execute("COMMIT")
+                return False
+            if state[0] == QUEUED:
+                db.execute("UPDATE jobs SET state = ?, finished = ?, message = 'Cancelled' WHERE id = ?", (CANCELLED, self.clock(), job_id))
+            else:
+                db.execute("UPDATE jobs SET cancel_requested = 1, message = 'Cancelling…' WHERE id = ?", (job_id,))
+            db.execute("COMMIT")
+            return True
+
+    # -----------------------------
+    # Worker side
+    # -----------------------------
+
+    def claim(self, worker: str, kinds: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """
+        Atomically take the oldest queued job (of the given kinds) and mark
+        it running for `worker`. Progress and any partial result of an
+        earlier attempt are cleared: the new attempt starts from scratch.
+        """
+        query, args = "SELECT id FROM jobs WHERE state = ?", [QUEUED]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            args.extend(kinds)
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(query + " ORDER BY id LIMIT 1", args).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            now = self.clock()
+            db.execute(
+                "UPDATE jobs SET state = ?, worker = ?, started = ?, heartbeat = ?, attempts = attempts + 1, "
+                "progress = 0, result = NULL WHERE id = ?",
+                (RUNNING, worker, now, now, row[0]),
+            )
+            job = self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (row[0],)).fetchone())
+            db.execute("COMMIT")
+            return job
+
+    def progress(self, job_id: int, fraction: float, message: str = "", partial=None) -> bool:
+        """
+        Record progress and a heartbeat, and optionally a partial result
+        the UI can show before the job ends. Returns True if cancellation
+        was requested.
+        """
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET progress = ?, message = ?, heartbeat = ?, result = COALESCE(?, result) WHERE id = ? AND state = ?",
+                (min(max(fraction, 0.0), 1.0), message, self.clock(), None if partial is None else json.dumps(partial), job_id, RUNNING),
+            )
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, job_ids: Sequence[int]):
+        if not job_ids:
+            return
+        with self._connect() as db:
+            db.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE state = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                (self.clock(), RUNNING, *job_ids),
+            )
+
+    def _close(self, job_id: int, state: str, result=None, error: Optional[str] = None, message: str = ""):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, result = COALESCE(?, result), error = ?, message = ?, finished = ?, "
+                "progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ? AND state = ?",
+                (state, None if result is None else json.dumps(result), error, message, self.clock(), state, job_id, RUNNING),
+            )
+
+    def finish(self, job_id: int, result=None):
+        self._close(job_id, DONE, result=result, message="Done")
+
+    def fail(self, job_id: int, error: str):
+        self._close(job_id, FAILED, error=error, message="Failed")
+
+    def mark_cancelled(self, job_id: int):
+        self._close(job_id, CANCELLED, message="Cancelled")
+
+    def requeue_orphans(self, stale_sec: float = STALE_SEC) -> int:
+        """
+        Re-queue running jobs whose worker stopped sending heartbeats (the
+        server restarted or crashed); fail them after MAX_ATTEMPTS.
+        """
+        cutoff = self.clock() - stale_sec
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "UPDATE jobs SET state = ?, error = 'Worker stopped responding', finished = ? "
+                "WHERE state = ? AND heartbeat < ? AND attempts >= ?",
+                (FAILED, self.clock(), RUNNING, cutoff, MAX_ATTEMPTS),
+            )
+            cursor = db.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, progress = 0, result = NULL, message = 'Re-queued after worker restart' "
+                "WHERE state = ? AND heartbeat < ?",
+                (QUEUED, RUNNING, cutoff),
+            )
+            db.execute("COMMIT")
+            return cursor.rowcount
+
+
+# =============================
+# 🛠️ Job handlers
+# =============================
+
+class JobContext:
+    """
+    What a handler sees of its job: its id, progress reporting and
+    cooperative cancellation (check_cancelled() raises JobCancelled).
+    """
+
+    def __init__(self, queue: JobQueue, job: dict):
+        self.queue = queue
+        self.job_id = job["id"]
+        self._cancelled = job["cancel_requested"]
+
+    def progress(self, fraction: float, message: str = "", partial=None):
+        self._cancelled = self.queue.progress(self.job_id, fraction, message, partial) or self._cancelled
+
+    def check_cancelled(self):
+        if self._cancelled or self.queue.get(self.job_id)["cancel_requested"]:
+            raise JobCancelled()
+
+
+def _insert_domain_job(params: dict, job: JobContext) -> dict:
+    # Imported here so the queue itself does not pull in the ingest pipeline
+    from src.domain_inserter import insert_domain
+
+    job.progress(0.05, f"Scraping {params['domain']}")
+    result = insert_domain(params["domain"], crawl=params.get("crawl", False))
+    if result and result.startswith("[Error]"):
+        raise RuntimeError(result)
+    return {"domain": params["domain"], "result": result}
+
+
+def _generate_insight_job(params: dict, job: JobContext) -> dict:
+    from src.rag_runner import generate_insight
+
+    job.progress(0.1, "Retrieving and asking the LLM")
+    return {"domain": params["domain"], "task": params["task"], "output": generate_insight(params["domain"], params["task"])}
+
+
+def _generate_insights_job(params: dict, job: JobContext) -> dict:
+    from src.rag_runner import iter_insights
+
+    domains, tasks = params["domains"], params["tasks"]
+    total = len(domains) * len(tasks)
+    results, published = [], time.monotonic()
+    for n, insight in enumerate(iter_insights(domains, tasks), start=1):
+        results.append(insight._asdict())
+        # Results so far are published now and then, so tables fill in while the job runs
+        partial = None
+        if time.monotonic() - published >= PARTIAL_RESULT_SEC:
+            partial, published = {"results": results}, time.monotonic()
+        job.progress(n / total, f"{n}/{total} insights", partial)
+        job.check_cancelled()
+    return {"results": results}
+
+
+JOB_HANDLERS: Dict[str, Callable[[dict, JobContext], object]] = {
+    "insert_domain": _insert_domain_job,
+    "generate_insight": _generate_insight_job,
+    "generate_insights": _generate_insights_job,
+}
+
+
+# =============================
+# 👷 Workers
+# =============================
+
+class WorkerPool:
+    """
+    Background threads that claim and run queued jobs. One pool per
+    server process is enough (they share the loaded models and
+    retrievers); several processes can serve the same queue.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Optional[Dict[str, Callable[[dict, JobContext], object]]] = None,
+        workers: int = JOB_WORKERS,
+        poll_sec: float = POLL_SEC,
+    ):
+        self.queue = queue
+        self.handlers = handlers or JOB_HANDLERS
+        self.workers = workers
+        self.poll_sec = poll_sec
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run_one(self, worker: str) -> bool:
+        """
+        Claim and run one job; returns False if none was queued.
+        """
+        job = self.queue.claim(worker, kinds=list(self.handlers))
+        if job is None:
+            return False
+        with self._lock:
+            self._running[job["id"]] = worker
+        context = JobContext(self.queue, job)
+        try:
+            context.check_cancelled()
+            result = self.handlers[job["kind"]](job["params"], context)
+        except JobCancelled:
+            self.queue.mark_cancelled(job["id"])
+        except Exception as e:
+            print(f"❌ Job {job['id']} ({job['kind']}) failed: {e}")
+            self.queue.fail(job["id"], str(e))
+        else:
+            self.queue.finish(job["id"], result)
+        finally:
+            with self._lock:
+                self._running.pop(job["id"], None)
+        return True
+
+    def _work(self, worker: str):
+        while not self._stop.is_set():
+            try:
+                if not self.run_one(worker):
+                    self._stop.wait(self.poll_sec)
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue unavailable: {e}")
+                self._stop.wait(self.poll_sec * 10)
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_SEC):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.queue.heartbeat(running)
+                self.queue.requeue_orphans()
+            except sqlite3.Error as e:
+                print(f"⚠️ Job heartbeat failed: {e}")
+
+    def start(self) -> "WorkerPool":
+        if self._threads:
+            return self
+        self._stop.clear()
+        requeued = self.queue.requeue_orphans()
+        if requeued:
+            print(f"♻️ Re-queued {requeued} job(s) left running by a stopped worker")
+        self._threads = [threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._work, args=(f"{self.name}:{i}",), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+job_queue = JobQueue()
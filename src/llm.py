@@ -1,36 +1,20 @@
-import os
-import requests
-import threading
-from typing import List, Dict
-from dotenv import load_dotenv
+import asyncio
+from typing import List, Dict, Optional
 
-# 🔐 Load .env API key and model
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
-load_dotenv(dotenv_path=env_path)
+import config
+from src.context_packer import MODEL_MAX_INPUT_TOKENS, context_budget, pack_context
+from src.llm_backends import get_llm2_headers, llm_backend
+from src.llm_cache import llm_cache
+from src.llm_client import LLMError
 
-HF_API_KEY_LLM2 = "os.getenv("HF_API_KEY_LLM2")"
-print("🔑 Loaded API Key Prefix:", HF_API_KEY_LLM2[:10])
-
-API_LLM2_URL = f"https://api-inference.huggingface.co/models/google/flan-t5-large"
-headers_llm2 = {"Authorization": f"Bearer {HF_API_KEY_LLM2}"}
-
-# 🔒 Thread lock for thread-safe API usage
-llm_lock = threading.Lock()
+LLM2_MODEL = config.LLM_MODEL
+API_LLM2_URL = config.LLM_API_URL
 
 # =============================
 # 💬 LLM Answer Generator (Layer 2)
 # =============================
 
-def build_llm2_prompt(task: str, chunks: List[Dict[str, str]]) -> str:
-    """
-    Create a clean summarization prompt for the LLM with no headers or titles.
-    """
-    context = "\n\n".join(
-        chunk["text"].replace(chunk.get("title", ""), "").strip()
-        for chunk in chunks if chunk.get("text")
-    )
-
-    return f"""Your job is to respond to the given task using only the provided context.
+PROMPT_TEMPLATE = """Your job is to respond to the given task using only the provided context.
 
 Task:
 {task}
@@ -40,34 +24,45 @@ Context:
 
 Begin your answer below:"""
 
-def query_llm(prompt: str, max_length: int = 120, min_length: int = 30, retries: int = 3) -> str:
+def build_llm2_prompt(task: str, chunks: List[Dict[str, str]], max_input_tokens: int = MODEL_MAX_INPUT_TOKENS) -> str:
     """
-    Queries Hugging Face summarization model using facebook/bart-large-cnn.
+    Create a clean summarization prompt for the LLM with no headers or titles.
+    The context is packed to what the model reads (see src/context_packer.py).
     """
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "max_length": max_length,
-            "min_length": min_length,
-            "do_sample": False
-        }
-    }
+    texts = [
+        chunk["text"].replace(chunk.get("title", ""), "").strip()
+        for chunk in chunks if chunk.get("text")
+    ]
+    budget = context_budget(PROMPT_TEMPLATE.format(task=task, context=""), max_input_tokens)
+    packed = pack_context(task, texts, budget)
+    print(f"✂️ Context packed: {packed.original_tokens} → {packed.tokens} tokens "
+          f"({packed.tokens_saved} saved, {packed.dropped_sentences} repeated sentences dropped)")
 
-    for attempt in range(1, retries + 1):
-        try:
-            with llm_lock:
-                response = requests.post(API_LLM2_URL, headers=headers_llm2, json=payload)
-                response.raise_for_status()
-                output = response.json()
+    return PROMPT_TEMPLATE.format(task=task, context=packed.context)
 
-            if isinstance(output, list) and 'generated_text' in output[0]:
-                return output[0]['generated_text'].strip()
-           
-        except requests.exceptions.HTTPError as e:
-            print(f"🔁 Retry {attempt}/{retries} after HTTP error:\n{e}")
-        except requests.exceptions.RequestException as e:
-            print(f"🔁 Retry {attempt}/{retries} after request failure:\n{e}")
-        except Exception as e:
-            print(f"🔁 Retry {attempt}/{retries} after unexpected error:\n{e}")
+def query_llm(prompt: str, max_length: int = 120, min_length: int = 30, domain: Optional[str] = None, use_cache: bool = True) -> str:
+    """
+    Answers `prompt` with the configured LLM backend (config.LLM_BACKEND:
+    the Inference API or a local model, see src/llm_backends.py). Failures
+    come back as an "[Error] ..." string and are never cached. Answers
+    about a `domain` are cached until it is re-ingested (src/llm_cache.py).
+    """
+    backend = llm_backend
+    params = {"max_length": max_length, "min_length": min_length, "do_sample": False}
+    try:
+        if not use_cache:
+            return backend.generate(prompt, max_length, min_length)
+        return llm_cache.get_or_compute(
+            prompt, lambda: backend.generate(prompt, max_length, min_length),
+            model=backend.cache_name, params=params, domain=domain,
+        )
+    except LLMError as e:
+        print(f"❌ LLM request failed: {e}")
+        return f"[Error] {e}"
 
-    return "[Error] Failed to get response from LLM after retries."
+async def query_llm_async(prompt: str, max_length: int = 120, min_length: int = 30, domain: Optional[str] = None, use_cache: bool = True) -> str:
+    """
+    query_llm for asyncio callers; runs on a worker thread so the event
+    loop is never blocked.
+    """
+    return await asyncio.to_thread(query_llm, prompt, max_length, min_length, domain, use_cache)
@@ -0,0 +1,184 @@
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Protocol
+
+from dotenv import load_dotenv
+
+import config
+from src.context_packer import MODEL_MAX_INPUT_TOKENS
+from src.llm_client import LLMClient, LLMError
+from src.model_registry import model_registry
+
+ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+# prompts, max_length, min_length → one answer per prompt
+GenerateBatch = Callable[[List[str], int, int], List[str]]
+
+
+class LLMBackend(Protocol):
+    """
+    Anything that turns a prompt into an answer. `cache_name` identifies
+    its answers in the LLM response cache. generate() raises LLMError on
+    failure.
+    """
+
+    cache_name: str
+
+    def generate(self, prompt: str, max_length: int, min_length: int) -> str:
+        ...
+
+
+# =============================
+# 🌐 HuggingFace Inference API
+# =============================
+
+@lru_cache(maxsize=1)
+def get_llm2_headers() -> Dict[str, str]:
+    """
+    🔐 Auth headers for the LLM API, read from .env / the environment on
+    first use rather than at import.
+    """
+    load_dotenv(dotenv_path=ENV_PATH)
+    api_key = os.getenv("HF_API_KEY_LLM2")
+    if not api_key:
+        print("⚠️ HF_API_KEY_LLM2 is not set; LLM requests will be rejected.")
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def parse_generated_text(output) -> str:
+    if isinstance(output, list) and output and 'generated_text' in output[0]:
+        return output[0]['generated_text'].strip()
+    raise LLMError(f"Unexpected LLM response: {str(output)[:200]}")
+
+
+class HTTPBackend:
+    """
+    The hosted text2text model, through the pooled, retrying LLMClient.
+    """
+
+    def __init__(self, url: str = config.LLM_API_URL, model: str = config.LLM_MODEL, client: Optional[LLMClient] = None):
+        self.client = client or LLMClient(url, headers=get_llm2_headers)
+        self.cache_name = model
+
+    def generate(self, prompt: str, max_length: int, min_length: int) -> str:
+        payload = {
+            "inputs": prompt,
+            "parameters": {
+                "max_length": max_length,
+                "min_length": min_length,
+                "do_sample": False
+            }
+        }
+        return parse_generated_text(self.client.post(payload))
+
+
+# =============================
+# 💻 Local seq2seq model
+# =============================
+
+def load_seq2seq(model_name: str) -> GenerateBatch:
+    """
+    Greedy batched generation with a transformers seq2seq model on CPU
+    (or the default torch device).
+    """
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+
+    def generate_batch(prompts: List[str], max_length: int, min_length: int) -> List[str]:
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=MODEL_MAX_INPUT_TOKENS)
+        with torch.inference_mode():
+            outputs = model.generate(**inputs, max_new_tokens=max_length, min_new_tokens=min_length, do_sample=False)
+        return [text.strip() for text in tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+    return generate_batch
+
+
+class LocalBackend:
+    """
+    In-process model with dynamic batching: prompts from concurrent
+    generate() calls that arrive within `max_wait_sec` of each other are
+    run as one batch of up to `max_batch` (grouped by generation
+    parameters). Works offline once the model is downloaded.
+    """
+
+    def __init__(
+        self,
+        model: str = config.LLM_LOCAL_MODEL,
+        max_batch: int = config.LLM_LOCAL_MAX_BATCH,
+        max_wait_sec: float = config.LLM_LOCAL_MAX_WAIT_MS / 1000,
+        generate_batch: Optional[GenerateBatch] = None,
+    ):
+        self.cache_name = f"local:{model}"
+        self.max_batch = max_batch
+        self.max_wait_sec = max_wait_sec
+        self._generate_batch = generate_batch or load_seq2seq(model)
+        self.requests = 0
+        self.batches = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, max_length: int, min_length: int) -> str:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._worker.start()
+        future: Future = Future()
+        self._queue.put(((max_length, min_length), prompt, future))
+        return future.result()
+
+    def _collect(self) -> list:
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(pending) < self.max_batch:
+            try:
+                pending.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self):
+        while True:
+            groups = defaultdict(list)
+            for params, prompt, future in self._collect():
+                groups[params].append((prompt, future))
+            for (max_length, min_length), requests in groups.items():
+                self.requests += len(requests)
+                self.batches += 1
+                try:
+                    answers = self._generate_batch([prompt for prompt, _ in requests], max_length, min_length)
+                except Exception as e:
+                    error = e if isinstance(e, LLMError) else LLMError(f"Local generation failed: {e}")
+                    for _, future in requests:
+                        future.set_exception(error)
+                    continue
+                for (_, future), answer in zip(requests, answers):
+                    future.set_result(answer)
+
+
+# =============================
+# 🔌 Selection
+# =============================
+
+LLM_BACKENDS: Dict[str, Callable[[], LLMBackend]] = {
+    "http": HTTPBackend,
+    "local": LocalBackend,
+}
+
+
+def create_backend(kind: str = config.LLM_BACKEND) -> LLMBackend:
+    if kind not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{kind}' (choose from {', '.join(LLM_BACKENDS)})")
+    return LLM_BACKENDS[kind]()
+
+
+# Created on first use; the local model loads in the app's background warm-up
+llm_backend = model_registry.register("llm", create_backend)
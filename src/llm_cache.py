@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.bundle import bundle_version
+from src.cache_lock import SingleFlight, atomic_write
+from src.utils import CACHE_DIR, cache_key
+
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+LLM_CACHE_TTL_SEC = 30 * 24 * 3600
+LLM_CACHE_MAX_BYTES = 256 * 1024 ** 2
+EVICT_TO_FRACTION = 0.9        # evicting frees a little headroom, not one entry at a time
+SHARED_SCOPE = "_shared"       # responses not tied to a domain
+_CURRENT = object()            # put(): stamp with the domain's version at write time
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Whitespace-insensitive form of a prompt for cache keys: NFC, runs of
+    spaces collapsed, trailing spaces and extra blank lines dropped.
+    """
+    text = unicodedata.normalize("NFC", prompt)
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def response_key(prompt: str, model: str, params: Optional[dict] = None) -> str:
+    material = json.dumps([model, params or {}, normalize_prompt(prompt)], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Disk cache of LLM answers, one small JSON file per response under
+    cache/llm/<domain>/<key>.json, keyed by model, generation parameters
+    and the normalized prompt.
+
+    An answer about a domain remembers the domain's bundle version and is
+    dropped once the domain is re-ingested. Entries expire after
+    `ttl_sec`; when the cache grows past `max_bytes`, the least recently
+    read entries (file mtime) are evicted. Identical prompts in flight at
+    the same time are sent to the model once.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = LLM_CACHE_DIR,
+        ttl_sec: float = LLM_CACHE_TTL_SEC,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evictions = 0
+        self._bytes: Optional[int] = None
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def path(self, key: str, domain: Optional[str] = None) -> str:
+        scope = cache_key(domain) if domain else SHARED_SCOPE
+        return os.path.join(self.cache_dir, scope, f"{key}.json")
+
+    # =============================
+    # 🔑 Lookup & insert
+    # =============================
+
+    def _version(self, domain: Optional[str]) -> Optional[list]:
+        version = bundle_version(domain) if domain else None
+        return [list(part) for part in version] if version else None
+
+    def get(self, key: str, domain: Optional[str] = None) -> Optional[str]:
+        path = self.path(key, domain)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is None or self.clock() - entry.get("created", 0) > self.ttl_sec:
+            self.expired += 1
+            self._remove(path)
+            return None
+        if entry.get("version") != self._version(domain):
+            self.invalidated += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # last read, for LRU eviction
+        except OSError:
+            pass
+        return entry["response"]
+
+    def put(
+        self,
+        key: str,
+        response: str,
+        model: str,
+        params: Optional[dict] = None,
+        domain: Optional[str] = None,
+        version=_CURRENT,
+    ):
+        """
+        Store `response`. `version` is the domain's bundle version the
+        answer was built from (read now if not given).
+        """
+        entry = {
+            "model": model,
+            "params": params or {},
+            "domain": domain,
+            "version": self._version(domain) if version is _CURRENT else version,
+            "created": self.clock(),
+            "response": response,
+        }
+        data = json.dumps(entry, ensure_ascii=False)
+        with atomic_write(self.path(key, domain)) as f:
+            f.write(data)
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += len(data.encode("utf-8"))
+        if self.total_bytes() > self.max_bytes:
+            self.enforce_limit()
+
+    def get_or_compute(
+        self,
+        prompt: str,
+        compute: Callable[[], str],
+        model: str,
+        params: Optional[dict] = None,
+        domain: Optional[str] = None,
+    ) -> str:
+        """
+        The cached answer to `prompt`, or compute() it, store and return it.
+        Errors raised by compute() are not cached.
+        """
+        key = response_key(prompt, model, params)
+        response = self.get(key, domain)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        def compute_and_store() -> str:
+            self.misses += 1
+            # Stamped with the version the answer is built from, so a re-ingest during the call invalidates it
+            version = self._version(domain)
+            result = compute()
+            self.put(key, result, model, params, domain, version=version)
+            return result
+
+        return self._flight.do((key, domain), compute_and_store)
+
+    # =============================
+    # 🧹 Invalidation & eviction
+    # =============================
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes -= size
+
+    def invalidate(self, domain: str) -> int:
+        """
+        Drop every cached answer about `domain`; returns how many.
+        """
+        directory = os.path.dirname(self.path("_", domain))
+        if not os.path.isdir(directory):
+            return 0
+        count = sum(1 for name in os.listdir(directory) if name.endswith(".json"))
+        shutil.rmtree(directory, ignore_errors=True)
+        self.invalidated += count
+        with self._lock:
+            self._bytes = None
+        return count
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._entries())
+            return self._bytes
+
+    def enforce_limit(self) -> int:
+        """
+        Evict least recently read entries until the cache is back under
+        EVICT_TO_FRACTION of max_bytes. Returns the number evicted.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TO_FRACTION
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._bytes = total
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "shared_in_flight": self._flight.shared,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes(),
+        }
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+LLM_MAX_CONCURRENCY = config.LLM_MAX_CONCURRENCY
+LLM_TIMEOUT_SEC: Tuple[float, float] = (5.0, 60.0)   # (connect, read) per request
+LLM_MAX_ATTEMPTS = 4                                  # per call, retries included
+LLM_RETRY_BUDGET_SEC = 120.0                          # no retry starts after this
+BACKOFF_BASE_SEC = 1.0
+BACKOFF_MAX_SEC = 30.0
+BREAKER_FAILURES = 5                                  # consecutive failures that open the circuit
+BREAKER_RESET_SEC = 30.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+# =============================
+# ⚡ Circuit breaker
+# =============================
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing. After `failures`
+    consecutive failures the circuit opens and calls fail fast for
+    `reset_sec`; then one trial call is let through (half-open), which
+    closes the circuit on success or re-opens it on failure.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_sec: float = BREAKER_RESET_SEC, clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.reset_sec = reset_sec
+        self.clock = clock
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_sec else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive += 1
+            if self._trial or self.consecutive >= self.failures:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+# =============================
+# 🌐 Pooled client
+# =============================
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """
+    Seconds the server asked us to wait: a Retry-After header (seconds or
+    HTTP date) or the Inference API's "model loading" estimated_time.
+    """
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(float(header), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(header).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    if response.status_code == 503:
+        try:
+            estimated = response.json().get("estimated_time")
+        except (ValueError, AttributeError):
+            return None
+        if estimated is not None:
+            return float(estimated)
+    return None
+
+
+def is_model_loading(response: requests.Response) -> bool:
+    if response.status_code != 503:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and ("estimated_time" in body or "loading" in str(body.get("error", "")))
+
+
+class LLMClient:
+    """
+    Thread-safe client for one inference endpoint. Requests share a pooled
+    keep-alive session; at most `max_concurrency` are in flight at once
+    (the rest wait for a slot, instead of every user queueing behind one
+    lock). Each call has a single retry budget: up to `max_attempts`
+    attempts within `budget_sec`, spaced by Retry-After when the server
+    sends one and by exponential backoff with full jitter otherwise.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Callable[[], Dict[str, str]] = dict,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: Tuple[float, float] = LLM_TIMEOUT_SEC,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        budget_sec: float = LLM_RETRY_BUDGET_SEC,
+        backoff_base: float = BACKOFF_BASE_SEC,
+        backoff_max: float = BACKOFF_MAX_SEC,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.url = url
+        self.headers = headers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.budget_sec = budget_sec
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.sleep = sleep
+        self.clock = clock
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "short_circuited": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        # post() runs on many worker threads at once
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def post(self, payload: Dict[str, Any]) -> Any:
+        """
+        POST `payload` and return the decoded JSON response. Raises
+        CircuitOpenError when the endpoint is being shed, and LLMError when
+        the retry budget is spent or the request is rejected outright.
+        """
+        self._count("calls")
+        deadline = self.clock() + self.budget_sec
+        error: Exception = LLMError("no attempt made")
+
+        for attempt in range(1, self.max_attempts + 1):
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(f"Circuit open for {self.url} after repeated failures: {error}")
+
+            self._count("attempts")
+            delay = None
+            try:
+                with self._slots:
+                    response = self.session.post(self.url, headers=self.headers(), json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+                self.breaker.record_failure()
+            else:
+                if response.ok:
+                    self.breaker.record_success()
+                    return response.json()
+                error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    # The request itself is wrong (auth, payload); retrying cannot help
+                    self.breaker.record_success()
+                    self._count("failures")
+                    raise error
+                delay = retry_after(response)
+                if is_model_loading(response):
+                    # A cold model is not an unhealthy endpoint; the trial slot is released
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+
+            if attempt == self.max_attempts:
+                break
+            delay = self.backoff(attempt) if delay is None else delay
+            if self.clock() + delay > deadline:
+                break
+            self._count("retries")
+            print(f"🔁 LLM retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s after: {str(error)[:120]}")
+            self.sleep(delay)
+
+        self._count("failures")
+        raise LLMError(f"LLM request failed after {attempt} attempt(s): {error}")
+
+    async def post_async(self, payload: Dict[str, Any]) -> Any:
+        """
+        post() for asyncio callers; the request runs on a worker thread so
+        the event loop is never blocked.
+        """
+        return await asyncio.to_thread(self.post, payload)
@@ -0,0 +1,125 @@
+import importlib.util
+import sys
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+# =============================
+# 💤 Deferred imports
+# =============================
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    A module that is only executed on first attribute access, e.g.
+    `faiss = lazy_import("faiss")` at the top of a module keeps faiss out
+    of import time until an index is actually built or read. Annotations
+    that name the module must then be strings.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """
+    The module has been imported and executed (not just deferred).
+    """
+    module = sys.modules.get(name)
+    return module is not None and type(module) is types.ModuleType
+
+
+# =============================
+# 🧠 Lazy models
+# =============================
+
+class LazyModel:
+    """
+    Stand-in for a model that is loaded on first use. Attribute access
+    (e.g. `embedding_model.encode`) loads it once, thread-safely, and
+    forwards to it. Attributes set on the stand-in (test doubles) take
+    precedence over the model's.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    print(f"🧠 Loading model: {self.name}")
+                    self._model = self._loader()
+                    self.load_seconds = time.perf_counter() - start
+        return self._model
+
+    def __getattr__(self, attr: str):
+        # Only reached for attributes not set on the stand-in itself
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+class ModelRegistry:
+    """
+    Named lazy models, with an optional background warm-up so the first
+    request does not pay the load time.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, LazyModel] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> LazyModel:
+        if name not in self._models:
+            self._models[name] = LazyModel(name, loader)
+        return self._models[name]
+
+    def get(self, name: str):
+        return self._models[name].get()
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load the given models (all registered ones by default), in a
+        daemon thread unless background=False. Failures are reported and
+        left for the first real use to raise.
+        """
+        models = [self._models[name] for name in (names if names is not None else list(self._models))]
+
+        def load_all():
+            for model in models:
+                try:
+                    model.get()
+                except Exception as e:
+                    print(f"⚠️ Warm-up of {model.name} failed: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        return {name: {"loaded": model.loaded, "load_seconds": model.load_seconds} for name, model in self._models.items()}
+
+
+model_registry = ModelRegistry()
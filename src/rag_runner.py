@@ -1,20 +1,35 @@
+import argparse
+import csv
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+import config
 from src.llm import query_llm, build_llm2_prompt
-from src.vectorstore import HybridRetriever
+from src.retriever_registry import get_retriever
+from src.chunk_metadata import AUTO_TAGS
+from src.embeddings import embedding_model
+from src.vectorstore import query_embedding_cache
+
+RETRIEVAL_WORKERS = 8          # domains retrieved at once by generate_insights
+NO_CHUNKS = "[No relevant chunks found.]"
+
+def _prompt_chunks(hits: List[dict]) -> List[dict]:
+    return [{"category": hit["tag"], "title": hit["title"], "text": hit["text"]} for hit in hits]
 
-def generate_insight(domain: str, task: str, top_k: int = 5, retries: int = 3, wait_sec: int = 3) -> str:
+def generate_insight(domain: str, task: str, top_k: int = 5) -> str:
     print(f"\n🔍 Generating Insight for: {domain}")
     print("=" * 60)
 
     try:
-        # 🔍 Retrieve top-k chunks
-        retriever = HybridRetriever(domain=domain)
-        raw_chunks = retriever.search(task, top_k=top_k)
-        chunks = [{"category": "Retrieved", "text": chunk} for chunk in raw_chunks]
+        # 🔍 Retrieve top-k chunks, scoring the sections the task is about first
+        retriever = get_retriever(domain)
+        hits = retriever.search_chunks(task, top_k=top_k, tags=AUTO_TAGS)
+        chunks = _prompt_chunks(hits)
 
         if not chunks:
             print("⚠️ No chunks found for the task. Skipping LLM step.")
-            return "[No relevant chunks found.]"
+            return NO_CHUNKS
 
         # 📦 Preview top chunks
         print("\n📦 Top Retrieved Chunks:\n")
@@ -32,15 +47,10 @@ def generate_insight(domain: str, task: str, top_k: int = 5, retries: int = 3, w
         print(prompt[:500])
         print("-" * 50)
 
-        # 🔁 Retry LLM calls
-        for attempt in range(1, retries + 1):
-            result = query_llm(prompt)
-            if result and "[Error" not in result and result.strip():
-                break
-            print(f"\n🔁 Retry {attempt}/{retries} after failure:\n{result[:100]}")
-            time.sleep(wait_sec)
-        else:
-            result = "[Error] LLM failed after all retries."
+        # 🧠 One retry budget, owned by the LLM client; answers cached until the domain is re-ingested
+        result = query_llm(prompt, domain=domain)
+        if not result.strip():
+            result = "[Error] LLM returned an empty answer."
 
         print("\n✅ Final LLM Output:\n")
         print(result)
@@ -51,10 +61,136 @@ def generate_insight(domain: str, task: str, top_k: int = 5, retries: int = 3, w
         print(f"❌ Exception during insight generation: {e}")
         return f"[Error] {str(e)}"
 
-# Optional direct test runner
+# =============================
+# 🚀 Fan-out: tasks × domains
+# =============================
+
+class InsightResult(NamedTuple):
+    domain: str
+    task: str
+    output: str
+    ok: bool
+    seconds: float             # since the batch started
+
+
+def _answer(domain: str, task: str, hits: List[dict]) -> str:
+    chunks = _prompt_chunks(hits)
+    if not chunks:
+        return NO_CHUNKS
+    result = query_llm(build_llm2_prompt(task, chunks), domain=domain)
+    return result if result.strip() else "[Error] LLM returned an empty answer."
+
+
+def iter_insights(
+    domains: Sequence[str],
+    tasks: Sequence[str],
+    top_k: int = 5,
+    retrieval_workers: int = RETRIEVAL_WORKERS,
+    llm_workers: int = config.INSIGHT_LLM_WORKERS,
+) -> Iterator[InsightResult]:
+    """
+    Answer every task for every domain, yielding results as they finish.
+    Each task is embedded once for all domains; domains are retrieved
+    concurrently (all tasks in one search per domain) and their prompts
+    go to a bounded LLM worker pool as soon as they are ready. A domain
+    that fails yields failed results for its tasks; the batch goes on.
+    """
+    domains = list(dict.fromkeys(domains))
+    tasks = list(dict.fromkeys(task.strip() for task in tasks if task.strip()))
+    if not domains or not tasks:
+        return
+
+    start = time.perf_counter()
+    try:
+        query_embedding_cache.encode(tasks, embedding_model.encode)
+    except Exception as e:
+        print(f"⚠️ Could not pre-encode tasks ({e}); domains will retry on their own.")
+
+    def retrieve(domain: str) -> List[List[dict]]:
+        return get_retriever(domain).search_chunks_many(tasks, top_k=top_k, tags=AUTO_TAGS)
+
+    def result(domain: str, task: str, output: str) -> InsightResult:
+        ok = not output.lower().startswith("[error")
+        return InsightResult(domain, task, output, ok, time.perf_counter() - start)
+
+    retrieval_pool = ThreadPoolExecutor(retrieval_workers, thread_name_prefix="insight-retrieval")
+    llm_pool = ThreadPoolExecutor(llm_workers, thread_name_prefix="insight-llm")
+    pending = {retrieval_pool.submit(retrieve, domain): (domain, None) for domain in domains}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                domain, task = pending.pop(future)
+                if task is not None:
+                    try:
+                        yield result(domain, task, future.result())
+                    except Exception as e:
+                        yield result(domain, task, f"[Error] {e}")
+                    continue
+                try:
+                    hits_per_task = future.result()
+                except Exception as e:
+                    print(f"❌ Retrieval failed for {domain}: {e}")
+                    for failed_task in tasks:
+                        yield result(domain, failed_task, f"[Error] {e}")
+                    continue
+                for asked, hits in zip(tasks, hits_per_task):
+                    pending[llm_pool.submit(_answer, domain, asked, hits)] = (domain, asked)
+    finally:
+        # Stopped early (or failed): drop work that has not started
+        for future in pending:
+            future.cancel()
+        retrieval_pool.shutdown(wait=False)
+        llm_pool.shutdown(wait=False)
+
+
+def generate_insights(
+    domains: Sequence[str],
+    tasks: Sequence[str],
+    on_result: Optional[Callable[[InsightResult], None]] = None,
+    **options,
+) -> List[InsightResult]:
+    """
+    Run every task on every domain (see iter_insights); on_result is
+    called as each answer arrives. Results come back in (domain, task)
+    input order.
+    """
+    results = []
+    for insight in iter_insights(domains, tasks, **options):
+        results.append(insight)
+        if on_result is not None:
+            on_result(insight)
+    order = {(domain, task): i for i, (domain, task) in enumerate((d, t.strip()) for d in domains for t in tasks)}
+    return sorted(results, key=lambda insight: order.get((insight.domain, insight.task), len(order)))
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.bulk_ingest import read_domains
+
+    parser = argparse.ArgumentParser(description="Answer tasks for every domain in a file of ingested leads.")
+    parser.add_argument("domains_file", help="text file with one domain per line")
+    parser.add_argument("--task", action="append", required=True, help="task to answer (repeatable)")
+    parser.add_argument("--out", default="insights.csv", help="CSV of domain, task, output, ok")
+    parser.add_argument("--top-k", type=int, default=5, help="chunks retrieved per task")
+    parser.add_argument("--retrieval-workers", type=int, default=RETRIEVAL_WORKERS, help="domains retrieved at once")
+    parser.add_argument("--llm-workers", type=int, default=config.INSIGHT_LLM_WORKERS, help="prompts in flight at once")
+    args = parser.parse_args(argv)
+
+    domains = read_domains(args.domains_file)
+    total, failed = len(domains) * len(args.task), 0
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["domain", "task", "output", "ok"])
+        for n, insight in enumerate(iter_insights(
+            domains, args.task, top_k=args.top_k,
+            retrieval_workers=args.retrieval_workers, llm_workers=args.llm_workers,
+        ), start=1):
+            writer.writerow([insight.domain, insight.task, insight.output, insight.ok])
+            failed += not insight.ok
+            print(f"{'✅' if insight.ok else '❌'} [{n}/{total}] {insight.domain} — {insight.task}")
+    print(f"\n📄 {total - failed}/{total} insights written to {args.out}")
+    return 0 if failed == 0 else 1
+
+
 if __name__ == "__main__":
-    result = generate_insight(
-        domain="https://www.capraecapital.com/",
-        task="List all the services this company offers"
-    )
-    print("\n🧠 Final Result:\n", result)
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from src.bundle import bundle_version
+from src.cache_manager import cache_manager
+from src.utils import get_bundle_path
+
+MAX_CACHED_RETRIEVER_BYTES = 512 * 1024 * 1024
+
+
+def _load_retriever(domain: str):
+    # Imported here so the registry itself does not load the embedding model
+    from src.vectorstore import HybridRetriever
+    return HybridRetriever(domain=domain)
+
+
+class RetrieverRegistry:
+    """
+    Process-wide LRU of loaded retrievers, shared by all Streamlit sessions.
+
+    Entries are keyed by domain and stamped with the (mtime, size) of the
+    domain's index bundle, so a re-ingest is picked up on the next lookup.
+    The cache is bounded by the on-disk size of the loaded bundles, which
+    tracks the memory they take once loaded.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHED_RETRIEVER_BYTES, loader: Callable = _load_retriever):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries: "OrderedDict[str, Tuple[tuple, int, object]]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def version(domain: str) -> Optional[tuple]:
+        return bundle_version(domain)
+
+    def _lookup(self, domain: str, version: tuple):
+        entry = self._entries.get(domain)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            self._drop(domain)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(domain)
+        self.hits += 1
+        return entry[2]
+
+    def _drop(self, domain: str):
+        _, size, _ = self._entries.pop(domain)
+        self.bytes -= size
+
+    def get(self, domain: str):
+        version = self.version(domain)
+        if version is None:
+            self.invalidate(domain)
+            raise FileNotFoundError(f"⚠️ Preprocessed data for domain '{domain}' not found.")
+
+        with self._lock:
+            retriever = self._lookup(domain, version)
+            if retriever is not None:
+                return retriever
+            load_lock = self._loading.setdefault(domain, threading.Lock())
+
+        # One load per domain at a time; later callers wait and reuse it
+        with load_lock:
+            try:
+                with self._lock:
+                    retriever = self._lookup(domain, version)
+                    if retriever is not None:
+                        return retriever
+                    self.misses += 1
+
+                # Stamped with the version read before loading, so a bundle published
+                # meanwhile is picked up by the next lookup. Only a first load that
+                # migrated legacy files is restamped with the bundle it wrote.
+                legacy = not os.path.exists(get_bundle_path(domain))
+                retriever = self.loader(domain)
+                if legacy:
+                    version = self.version(domain) or version
+                size = sum(s for _, s in version)
+
+                with self._lock:
+                    if domain in self._entries:
+                        self._drop(domain)
+                    self._entries[domain] = (version, size, retriever)
+                    self.bytes += size
+                    # Keep at least the entry just loaded
+                    while self.bytes > self.max_bytes and len(self._entries) > 1:
+                        self._drop(next(iter(self._entries)))
+                        self.evictions += 1
+            finally:
+                with self._lock:
+                    if self._loading.get(domain) is load_lock:
+                        del self._loading[domain]
+        return retriever
+
+    def invalidate(self, domain: str):
+        with self._lock:
+            if domain in self._entries:
+                self._drop(domain)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+retriever_registry = RetrieverRegistry()
+
+
+def get_retriever(domain: str):
+    """
+    Shared, cached retriever for a domain (see RetrieverRegistry).
+    The access counts towards the domain's LRU rank and refresh priority.
+    """
+    retriever = retriever_registry.get(domain)
+    cache_manager.record_access(domain)
+    return retriever
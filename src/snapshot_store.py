@@ -0,0 +1,374 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.cache_lock import atomic_write, cache_lock
+
+SNAPSHOT_ROOT = "rag_storage"
+MAX_SNAPSHOT_VERSIONS = 10     # per domain; older versions are pruned
+BLOCK_BYTES = 64 * 1024        # uncompressed JSONL per gzip member in a pack
+CACHED_BLOCKS = 8              # decoded blocks kept by a reader
+OBJECTS_LOCK = "_raw_objects"
+REPACK_LIVE_FRACTION = 0.5     # compaction rewrites packs with less live text than this
+
+# One record per stored text: content hash → (pack, member offset, member length)
+INDEX_DTYPE = np.dtype([("id", "S16"), ("pack", "<u8"), ("offset", "<u8"), ("length", "<u4")])
+
+
+def snapshot_key(domain: str) -> str:
+    """
+    Collision-free directory name of a domain: a readable slug plus a
+    hash of the normalised domain, so "a.com/b" and "a.com_b" (which
+    cache_key maps to the same file) stay apart.
+    """
+    host, sep, path = re.sub(r"^https?://", "", domain.strip(), flags=re.IGNORECASE).rstrip("/").partition("/")
+    normalized = host.lower() + sep + path
+    slug = re.sub(r"[^A-Za-z0-9.-]+", "_", normalized)[:80]
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=6).hexdigest()
+    return f"{slug}-{digest}"
+
+
+def text_id(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SnapshotStore:
+    """
+    Versioned raw scrapes with content-addressed text.
+
+    rag_storage/raw/<snapshot_key>/<version>.jsonl.gz holds one scrape:
+    a header line, then one line per chunk with its fields and a
+    reference to its text instead of the text itself. Texts live once in
+    rag_storage/objects/: immutable packs of gzip members (BLOCK_BYTES of
+    {"id", "text"} JSONL each), located through the append-only
+    index.bin. A text shared by several versions or domains is stored
+    once, and an unchanged re-scrape writes no new version at all.
+
+    Texts no snapshot references any more (pruned versions, removed
+    domains) are dropped by compact(), a mark-and-sweep over the
+    snapshots. It moves the live texts of mostly dead packs into a new
+    pack; snapshots still pointing at a removed pack find their texts
+    through the index.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_ROOT, max_versions: int = MAX_SNAPSHOT_VERSIONS, block_bytes: int = BLOCK_BYTES):
+        self.root = root
+        self.max_versions = max_versions
+        self.block_bytes = block_bytes
+        self._locations: Dict[bytes, Tuple[int, int, int]] = {}
+        self._index_size = 0
+        self._index_ino: Optional[int] = None
+
+    @property
+    def objects_dir(self) -> str:
+        return os.path.join(self.root, "objects")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.objects_dir, "index.bin")
+
+    def domain_dir(self, domain: str) -> str:
+        return os.path.join(self.root, "raw", snapshot_key(domain))
+
+    def pack_path(self, pack: int) -> str:
+        return os.path.join(self.objects_dir, f"{pack:016x}.jsonl.gz")
+
+    # -----------------------------
+    # Objects
+    # -----------------------------
+
+    def _refresh_index(self):
+        """
+        Read index records appended (by any process) since the last call;
+        re-read it whole after a compaction replaced the file.
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            stat = None
+        ino = stat.st_ino if stat else None
+        if ino != self._index_ino:
+            self._locations, self._index_size, self._index_ino = {}, 0, ino
+        if stat is None:
+            return
+        size = stat.st_size - stat.st_size % INDEX_DTYPE.itemsize
+        if size <= self._index_size:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_size)
+            records = np.frombuffer(f.read(size - self._index_size), dtype=INDEX_DTYPE)
+        for record in records:
+            self._locations[bytes(record["id"])] = (int(record["pack"]), int(record["offset"]), int(record["length"]))
+        self._index_size = size
+
+    def _store_texts(self, texts: Dict[bytes, str]) -> Dict[bytes, Tuple[int, int, int]]:
+        """
+        Write the texts not stored yet into one new pack; returns the
+        location of every stored text.
+        """
+        with cache_lock(OBJECTS_LOCK):
+            self._refresh_index()
+            new = {key: text for key, text in texts.items() if key not in self._locations}
+            if new:
+                self._append_index(self._write_pack(new))
+        return self._locations
+
+    def _write_pack(self, texts: Dict[bytes, str]) -> list:
+        """
+        Write `texts` into a new pack; returns their index records.
+        """
+        pack = time.time_ns()
+        while os.path.exists(self.pack_path(pack)):
+            pack += 1
+        records, block, offset = [], [], 0
+
+        with atomic_write(self.pack_path(pack), "wb") as f:
+            def flush_block():
+                nonlocal block, offset
+                member = gzip.compress(b"".join(line for _, line in block), mtime=0)
+                f.write(member)
+                records.extend((key, pack, offset, len(member)) for key, _ in block)
+                offset += len(member)
+                block = []
+
+            size = 0
+            for key, text in texts.items():
+                line = (json.dumps({"id": key.hex(), "text": text}, ensure_ascii=False) + "\n").encode("utf-8")
+                block.append((key, line))
+                size += len(line)
+                if size >= self.block_bytes:
+                    flush_block()
+                    size = 0
+            if block:
+                flush_block()
+        return records
+
+    def _append_index(self, records: list):
+        # The pack is complete before the index points into it
+        index = np.array(records, dtype=INDEX_DTYPE)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with open(self.index_path, "ab") as f:
+            # Drop a record torn by a crash mid-append
+            f.truncate(f.tell() - f.tell() % INDEX_DTYPE.itemsize)
+            f.write(index.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        for key, pack_id, offset, length in records:
+            self._locations[key] = (pack_id, offset, length)
+        self._index_size += index.nbytes
+        self._index_ino = os.stat(self.index_path).st_ino
+
+    # -----------------------------
+    # Snapshots
+    # -----------------------------
+
+    def versions(self, domain: str) -> List[str]:
+        """
+        Stored versions of a domain, oldest first.
+        """
+        directory = self.domain_dir(domain)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(".jsonl.gz")] for name in os.listdir(directory) if name.endswith(".jsonl.gz"))
+
+    def latest(self, domain: str) -> Optional[str]:
+        versions = self.versions(domain)
+        return versions[-1] if versions else None
+
+    def snapshot_path(self, domain: str, version: str) -> str:
+        return os.path.join(self.domain_dir(domain), f"{version}.jsonl.gz")
+
+    def files(self, domain: str) -> List[str]:
+        return [self.snapshot_path(domain, version) for version in self.versions(domain)]
+
+    def save(self, domain: str, chunks: List[dict], kind: str = "chunks") -> Optional[str]:
+        """
+        Store a scrape as a new version; returns it, or None when it is
+        identical to the latest version. Callers writing the same domain
+        concurrently should hold its domain_lock.
+        """
+        lines, texts = [], {}
+        for chunk in chunks:
+            text = chunk.get("text")
+            if isinstance(text, str):
+                key = text_id(text)
+                texts.setdefault(key, text)
+                lines.append({**{k: v for k, v in chunk.items() if k != "text"}, "text_id": key.hex()})
+            else:
+                lines.append(chunk)
+        body = [json.dumps(line, ensure_ascii=False) for line in lines]
+        digest = hashlib.blake2b("\n".join(body).encode("utf-8"), digest_size=16).hexdigest()
+
+        latest = self.latest(domain)
+        if latest is not None and self.header(domain, latest).get("digest") == digest:
+            return None
+
+        # Locations go in the snapshot itself, so reading never needs index.bin.
+        # The snapshot is written under the objects lock, so compact() sees its texts as live.
+        version = f"{time.time_ns():020d}"
+        header = {"domain": domain, "version": version, "kind": kind, "chunks": len(lines), "digest": digest}
+        with cache_lock(OBJECTS_LOCK):
+            locations = self._store_texts(texts)
+            with atomic_write(self.snapshot_path(domain, version), "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as out:
+                    out.write((json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8"))
+                    for line in lines:
+                        if "text_id" in line:
+                            line["ref"] = list(locations[bytes.fromhex(line["text_id"])])
+                        out.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        for old in self.versions(domain)[:-self.max_versions]:
+            os.remove(self.snapshot_path(domain, old))
+        return version
+
+    def _open(self, domain: str, version: Optional[str]):
+        version = version or self.latest(domain)
+        if version is None:
+            raise FileNotFoundError(f"⚠️ No raw snapshot for domain '{domain}'.")
+        return gzip.open(self.snapshot_path(domain, version), "rt", encoding="utf-8")
+
+    def header(self, domain: str, version: Optional[str] = None) -> dict:
+        with self._open(domain, version) as f:
+            return json.loads(f.readline())
+
+    def iter_chunks(self, domain: str, version: Optional[str] = None) -> Iterator[dict]:
+        """
+        Stream the chunks of a version (latest by default) with their texts.
+        Only a few decoded pack blocks are held at a time.
+        """
+        blocks: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+        with self._open(domain, version) as f:
+            f.readline()
+            for line in f:
+                chunk = json.loads(line)
+                if "text_id" in chunk:
+                    chunk["text"] = self._text(blocks, chunk.pop("text_id"), tuple(chunk.pop("ref")))
+                yield chunk
+
+    def _read_block(self, ref: tuple) -> Dict[str, str]:
+        pack, offset, length = ref
+        with open(self.pack_path(pack), "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        texts = {}
+        for line in data.splitlines():
+            record = json.loads(line)
+            texts[record["id"]] = record["text"]
+        return texts
+
+    def _text(self, blocks: "OrderedDict[tuple, Dict[str, str]]", key: str, ref: tuple) -> str:
+        texts = blocks.get(ref)
+        if texts is None:
+            try:
+                texts = self._read_block(ref)
+            except FileNotFoundError:
+                # The pack was compacted away; the index knows where the text moved
+                with cache_lock(OBJECTS_LOCK):
+                    self._refresh_index()
+                    moved = self._locations.get(bytes.fromhex(key))
+                if moved is None or moved == ref:
+                    raise FileNotFoundError(f"⚠️ Text {key} is missing from {self.objects_dir}")
+                return self._text(blocks, key, moved)
+            blocks[ref] = texts
+            if len(blocks) > CACHED_BLOCKS:
+                blocks.popitem(last=False)
+        else:
+            blocks.move_to_end(ref)
+        return texts[key]
+
+    def load(self, domain: str, version: Optional[str] = None) -> List[dict]:
+        return list(self.iter_chunks(domain, version))
+
+    def remove(self, domain: str):
+        """
+        Drop a domain's snapshots. Its texts stay in the shared packs until
+        the next compact().
+        """
+        for path in self.files(domain):
+            os.remove(path)
+        if os.path.isdir(self.domain_dir(domain)):
+            os.rmdir(self.domain_dir(domain))
+
+
+    # -----------------------------
+    # Compaction
+    # -----------------------------
+
+    def objects_bytes(self) -> int:
+        """
+        Size of the shared packs and their index.
+        """
+        if not os.path.isdir(self.objects_dir):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.objects_dir) if entry.is_file())
+
+    def _live_texts(self) -> set:
+        live = set()
+        for path in glob.glob(os.path.join(self.root, "raw", "*", "*.jsonl.gz")):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    f.readline()
+                    for line in f:
+                        text_id = json.loads(line).get("text_id")
+                        if text_id:
+                            live.add(bytes.fromhex(text_id))
+            except FileNotFoundError:
+                continue  # pruned meanwhile: its texts are not live
+        return live
+
+    def compact(self) -> int:
+        """
+        Drop texts no snapshot references: delete packs with no live text,
+        move the live texts of packs under REPACK_LIVE_FRACTION into a new
+        pack, and rewrite the index with the live texts only. Returns the
+        bytes freed.
+        """
+        with cache_lock(OBJECTS_LOCK):
+            before = self.objects_bytes()
+            if not before:
+                return 0
+            live = self._live_texts()
+            self._refresh_index()
+
+            by_pack: Dict[int, List[bytes]] = {}
+            for key, (pack, _, _) in self._locations.items():
+                by_pack.setdefault(pack, []).append(key)
+            keep, moved = {}, {}
+            for pack, keys in by_pack.items():
+                live_keys = [key for key in keys if key in live]
+                if len(live_keys) >= REPACK_LIVE_FRACTION * len(keys):
+                    keep.update((key, self._locations[key]) for key in live_keys)
+                    continue
+                blocks: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+                for key in live_keys:
+                    moved[key] = self._text(blocks, key.hex(), self._locations[key])
+
+            records = [(key, *location) for key, location in keep.items()]
+            if moved:
+                records += self._write_pack(moved)
+            kept_packs = {location[0] for location in keep.values()} | {record[1] for record in records}
+
+            # Snapshots that pointed at a removed pack look their texts up here
+            index = np.array(records, dtype=INDEX_DTYPE)
+            with atomic_write(self.index_path, "wb") as f:
+                f.write(index.tobytes())
+            for name in os.listdir(self.objects_dir):
+                if name.endswith(".jsonl.gz") and int(name[:-len(".jsonl.gz")], 16) not in kept_packs:
+                    os.remove(os.path.join(self.objects_dir, name))
+            self._refresh_index()
+
+            freed = before - self.objects_bytes()
+        if freed:
+            print(f"🧹 Compacted snapshot texts: {len(self._locations)} live, {freed / 1024 ** 2:.1f} MB freed")
+        return freed
+
+
+snapshot_store = SnapshotStore()
@@ -1,29 +1,72 @@
 import os
 import json
+from typing import Iterator, Optional
 
+from src.cache_lock import atomic_write
+from src.snapshot_store import snapshot_store
+from src.utils import cache_key
+
+# Plain-text scrapes written before the snapshot store (read-only now)
 RAW_DIR = "rag_storage/raw"
 
 def get_raw_path(domain):
-    name = domain.replace("https://", "").replace("http://", "").replace("/", "_")
-    return os.path.join(RAW_DIR, f"{name}.txt")
+    return os.path.join(RAW_DIR, f"{cache_key(domain)}.txt")
 
 def save_raw_text(domain, text):
-    os.makedirs(RAW_DIR, exist_ok=True)
-
-    # If saving a list of chunks, serialize it
+    """
+    Keep a scrape (a list of chunk dicts, or a plain string) as a new
+    compressed snapshot version (see src/snapshot_store.py).
+    """
     if isinstance(text, list):
-        formatted = json.dumps(text, indent=2, ensure_ascii=False)
+        snapshot_store.save(domain, text)
     elif isinstance(text, str):
-        formatted = text
+        snapshot_store.save(domain, [{"text": text}], kind="text")
     else:
         raise ValueError("Text must be a string or list of dicts")
 
-    with open(get_raw_path(domain), "w", encoding="utf-8") as f:
-        f.write(formatted)
+def iter_raw_chunks(domain, version: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream the chunks of a domain's latest (or given) scrape.
+    """
+    if version is None and snapshot_store.latest(domain) is None:
+        # Scraped before snapshots: the legacy file is read whole
+        raw = load_raw_text(domain)
+        try:
+            chunks = json.loads(raw) if raw else []
+        except json.JSONDecodeError:
+            chunks = []  # a plain-text scrape, e.g. "[Error] Failed to fetch"
+        return iter(chunks if isinstance(chunks, list) else [])
+    return snapshot_store.iter_chunks(domain, version)
 
 def load_raw_text(domain):
+    """
+    The latest scrape as saved: JSON text for chunk lists, else the string.
+    """
+    if snapshot_store.latest(domain) is not None:
+        chunks = snapshot_store.load(domain)
+        if snapshot_store.header(domain).get("kind") == "text":
+            return chunks[0]["text"]
+        return json.dumps(chunks, indent=2, ensure_ascii=False)
     path = get_raw_path(domain)
     if os.path.exists(path):
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
     return None
+
+# ✅ HTTP validators (ETag / Last-Modified) from the last successful fetch
+HTTP_DIR = "rag_storage/http"
+
+def get_validators_path(domain):
+    return os.path.join(HTTP_DIR, f"{cache_key(domain)}.json")
+
+def save_http_validators(domain, validators):
+    os.makedirs(HTTP_DIR, exist_ok=True)
+    with atomic_write(get_validators_path(domain)) as f:
+        json.dump(validators, f)
+
+def load_http_validators(domain):
+    path = get_validators_path(domain)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
@@ -1,15 +1,36 @@
 import os
 
+CACHE_DIR = "cache"
+
+def cache_key(domain: str) -> str:
+    """
+    File-name-safe key of a domain, shared by every per-domain file.
+    """
+    return domain.replace("https://", "").replace("http://", "").replace("/", "_")
+
+def get_bundle_path(domain: str) -> str:
+    """
+    The domain's index bundle (see src/bundle.py).
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f"{cache_key(domain)}.bundle")
+
 def get_cache_paths(domain: str):
     """
-    Generate consistent cache file paths for FAISS, BM25, and raw chunks.
+    Legacy per-domain FAISS, BM25 and chunk files, read once to migrate
+    them into a bundle.
     """
-    base = domain.replace("https://", "").replace("http://", "").replace("/", "_")
-    cache_dir = "cache"
-    os.makedirs(cache_dir, exist_ok=True)
+    base = cache_key(domain)
+    os.makedirs(CACHE_DIR, exist_ok=True)
 
-    faiss_path = os.path.join(cache_dir, f"{base}_faiss.index")
-    bm25_path = os.path.join(cache_dir, f"{base}_bm25.pkl")
-    chunks_path = os.path.join(cache_dir, f"{base}_chunks.pkl")
+    faiss_path = os.path.join(CACHE_DIR, f"{base}_faiss.index")
+    bm25_path = os.path.join(CACHE_DIR, f"{base}_bm25.pkl")
+    chunks_path = os.path.join(CACHE_DIR, f"{base}_chunks.pkl")
 
     return faiss_path, bm25_path, chunks_path
+
+def get_metadata_path(domain: str):
+    """
+    Legacy columnar chunk metadata stored next to the pickles.
+    """
+    return get_cache_paths(domain)[2].replace("_chunks.pkl", "_meta.npz")
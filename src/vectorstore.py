@@ -1,99 +1,352 @@
-import os
-import pickle
-import faiss
+from typing import List, Optional
 import numpy as np
-from rank_bm25 import BM25Okapi
-
-# ✅ Try internal or fallback to SentenceTransformer
-try:
-    from src.embeddings import embedding_model
-except ImportError:
-    from sentence_transformers import SentenceTransformer
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# ✅ Cache path helper
-def get_cache_paths(domain):
-    base = domain.replace("https://", "").replace("http://", "").replace("/", "_")
-    cache_dir = "cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    return (
-        os.path.join(cache_dir, f"{base}_faiss.index"),
-        os.path.join(cache_dir, f"{base}_bm25.pkl"),
-        os.path.join(cache_dir, f"{base}_chunks.pkl")
-    )
-
-def persist_chunks_to_vectorstore(tagged_chunks: list, domain: str):
+
+from src.ann import (
+    build_index,
+    choose_index_kind,
+    configure_search,
+    dense_scores,
+    filtered_search_params,
+    normalize,
+    supports_removal,
+)
+from src.bm25 import SparseBM25
+from src.bundle import DomainBundle, bundle_exists, chunk_id, load_domain_bundle
+from src.cache_lock import domain_lock
+from src.chunk_metadata import AUTO_TAGS, ChunkMetadata, route_tags
+from src.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from src.fusion import CANDIDATE_MULTIPLIER, DEFAULT_STRATEGY, FUSION_STRATEGIES, fuse
+from src.model_registry import lazy_import
+from src.utils import get_bundle_path
+
+# ✅ Heavy dependencies load on first use, not at import
+from src.embeddings import EMBEDDING_CACHE_NAME, embedding_model
+faiss = lazy_import("faiss")
+
+# ✅ Chunk embeddings persisted across ingests, keyed by text + model
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_NAME)
+
+# ✅ Query embeddings shared by every retriever (task strings repeat across domains)
+query_embedding_cache = QueryEmbeddingCache()
+
+def get_text_chunks(tagged_chunks: list) -> list:
     """
-    Save structured chunks to FAISS + BM25 + pickle.
+    The non-empty, stripped chunk texts that get indexed.
     """
-    faiss_path, bm25_path, chunks_path = get_cache_paths(domain)
-
-    text_chunks = [
+    return [
         chunk["text"].strip()
         for chunk in tagged_chunks
         if chunk.get("text") and isinstance(chunk["text"], str) and chunk["text"].strip()
     ]
 
+def encode_chunks(text_chunks: list, cache: EmbeddingCache = embedding_cache) -> np.ndarray:
+    """
+    Embed chunk texts, re-using cached vectors for text seen before.
+    """
+    if cache is None:
+        return np.asarray(embedding_model.encode(text_chunks), dtype="float32")
+    before = cache.stats()
+    embeddings = cache.encode(text_chunks, embedding_model.encode)
+    hits = cache.hits - before["hits"]
+    print(f"🧠 Embedding cache: {hits}/{len(text_chunks)} chunks reused")
+    return embeddings
+
+def vectorstore_exists(domain: str) -> bool:
+    return bundle_exists(domain)
+
+def load_chunk_metadata(domain: str) -> Optional[ChunkMetadata]:
+    """
+    The domain's chunk metadata, or None for stores written before it was kept.
+    """
+    return load_domain_bundle(domain).metadata
+
+def load_chunk_texts(domain: str) -> list:
+    """
+    Indexed chunk texts of a domain, in index order.
+    """
+    return load_domain_bundle(domain).chunks.tolist()
+
+def _write_vectorstore(domain: str, index, index_params: dict, bm25, chunks: list, metadata: ChunkMetadata):
+    index_params["ntotal"] = int(index.ntotal)
+    ids = np.array([chunk_id(text) for text in chunks], dtype=np.int64)
+    DomainBundle(index, index_params, ids, bm25, chunks, metadata).save(get_bundle_path(domain))
+
+def _load_updatable(domain: str):
+    """
+    Stored (bundle, chunks) if its index is in the ID-mapped format that
+    can be updated in place, else None (legacy indexes get rebuilt).
+    """
+    if not vectorstore_exists(domain):
+        return None
+    bundle = load_domain_bundle(domain)
+    if bundle.index_params is None or not isinstance(bundle.index, faiss.IndexIDMap2):
+        return None
+    if bundle.index.ntotal != len(bundle) or bundle.bm25.corpus_size != len(bundle):
+        return None
+    return bundle, bundle.chunks.tolist()
+
+def persist_chunks_to_vectorstore(
+    tagged_chunks: list,
+    domain: str,
+    embeddings=None,
+    incremental: bool = False,
+    index_kind: Optional[str] = None,
+) -> dict:
+    """
+    Save structured chunks to the domain's bundle (FAISS + BM25 + texts,
+    with their tag, title and url as columnar metadata; see src/bundle.py).
+    Pass `embeddings` (one row per get_text_chunks() entry) to skip encoding.
+    The FAISS index type is picked from the corpus size (see src/ann.py)
+    unless `index_kind` is given.
+
+    With incremental=True an existing store is diffed against the new chunks
+    by content hash: only new chunks are embedded and added, vanished ones
+    are removed, and only changed metadata is written when the chunk set
+    is unchanged.
+    Returns counts of added, removed and kept chunks.
+
+    Runs under the domain's writer lock, so concurrent writers of one
+    domain take turns; readers keep the last published bundle.
+    """
+    with domain_lock(domain):
+        return _persist_chunks(tagged_chunks, domain, embeddings, incremental, index_kind)
+
+def _persist_chunks(tagged_chunks: list, domain: str, embeddings, incremental: bool, index_kind: Optional[str]) -> dict:
+    text_chunks = get_text_chunks(tagged_chunks)
+
     if not text_chunks:
         raise ValueError(f"❌ No valid chunks to index for: {domain}")
 
-    # Save raw text chunks
-    with open(chunks_path, "wb") as f:
-        pickle.dump(text_chunks, f)
+    # One entry per distinct text, remembering its row in `embeddings`
+    rows = {}
+    for i, text in enumerate(text_chunks):
+        rows.setdefault(text, i)
+    unique = list(rows)
+    if embeddings is not None:
+        embeddings = np.asarray(embeddings, dtype="float32")
+
+    def vectors_for(texts: list) -> np.ndarray:
+        if embeddings is not None:
+            return embeddings[[rows[text] for text in texts]]
+        return np.asarray(encode_chunks(texts), dtype="float32")
+
+    stored = _load_updatable(domain) if incremental else None
+    if stored is not None:
+        bundle, old_chunks = stored
+        index, index_params, bm25 = bundle.index, bundle.index_params, bundle.bm25
+        new_set = set(unique)
+        old_set = set(old_chunks)
+        removed = [i for i, text in enumerate(old_chunks) if text not in new_set]
+        added = [text for text in unique if text not in old_set]
+        added_vectors = vectors_for(added) if added else None
+        wanted_kind = index_kind or choose_index_kind(len(unique))
+        if added_vectors is not None and added_vectors.shape[1] != index.d:
+            stored = None  # embedding model changed: rebuild
+        elif (added or removed) and wanted_kind != index_params["kind"]:
+            stored = None  # corpus moved to another size tier: rebuild
+        elif removed and not supports_removal(index_params):
+            stored = None
+
+    if stored is None:
+        vectors = vectors_for(unique)
+        index, index_params = build_index(vectors, np.array([chunk_id(t) for t in unique], dtype="int64"), kind=index_kind)
+        bm25 = SparseBM25.from_texts(unique)
+        _write_vectorstore(domain, index, index_params, bm25, unique, ChunkMetadata.from_chunks(tagged_chunks, unique))
+        print(f"✅ Saved vectorstore for domain: {domain}")
+        return {"added": len(unique), "removed": 0, "kept": 0}
 
-    # BM25
-    tokenized = [chunk.split() for chunk in text_chunks]
-    bm25 = BM25Okapi(tokenized)
-    with open(bm25_path, "wb") as f:
-        pickle.dump(bm25, f)
+    counts = {"added": len(added), "removed": len(removed), "kept": len(old_chunks) - len(removed)}
 
-    # FAISS
-    embeddings = embedding_model.encode(text_chunks)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings))
-    faiss.write_index(index, faiss_path)
+    if not added and not removed:
+        # Same texts, but tags or titles may have moved
+        metadata = ChunkMetadata.from_chunks(tagged_chunks, old_chunks)
+        if bundle.metadata != metadata:
+            bundle.metadata = metadata
+            bundle.save(get_bundle_path(domain))
+        print(f"♻️ Vectorstore unchanged for domain: {domain}")
+        return counts
 
-    print(f"✅ Saved vectorstore for domain: {domain}")
+    if removed:
+        index.remove_ids(np.array([chunk_id(old_chunks[i]) for i in removed], dtype="int64"))
+    if added:
+        if index_params.get("normalized"):
+            added_vectors = normalize(added_vectors)
+        index.add_with_ids(added_vectors, np.array([chunk_id(t) for t in added], dtype="int64"))
+    bm25 = bm25.update(removed, added)
+    chunks = [text for text in old_chunks if text in new_set] + added
+    _write_vectorstore(domain, index, index_params, bm25, chunks, ChunkMetadata.from_chunks(tagged_chunks, chunks))
+
+    print(f"✅ Updated vectorstore for domain: {domain} (+{counts['added']} / -{counts['removed']})")
+    return counts
 
 class HybridRetriever:
     def __init__(self, domain: str, chunk_size: int = 3):
         self.domain = domain
         self.chunk_size = chunk_size
 
-        faiss_path, bm25_path, chunks_path = get_cache_paths(domain)
+        # One mapped bundle file; legacy pickles are migrated on first load
+        bundle = load_domain_bundle(domain)
+        self.faiss_index = bundle.index
+        # Indexes built before src/ann.py have no params: exact L2 on raw vectors
+        self.index_params = bundle.index_params
+        if self.index_params:
+            configure_search(self.faiss_index, self.index_params)
+        self.bm25 = bundle.bm25
+        self.chunks = bundle.chunks
+        self.ids = bundle.ids
+        # ID-mapped indexes return content hashes instead of positions
+        self.id_order = None
+        if isinstance(self.faiss_index, faiss.IndexIDMap):
+            self.id_order = np.argsort(self.ids, kind="stable")
+            self.sorted_ids = self.ids[self.id_order]
+        self.metadata = bundle.metadata
+
+    def _dense_positions(self, ids: np.ndarray) -> np.ndarray:
+        if self.id_order is None:
+            return ids
+        slots = np.minimum(np.searchsorted(self.sorted_ids, ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[slots] == ids, self.id_order[slots], -1)
+
+    def _bm25_scores(self, queries: List[str]) -> np.ndarray:
+        return self.bm25.score_many(queries)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+        tags=None,
+    ):
+        """
+        Top chunks for `query`. `strategy` is one of FUSION_STRATEGIES
+        ("weighted", "rrf", "dense", "sparse"); `pool` candidates are taken
+        from each retriever (default CANDIDATE_MULTIPLIER * top_k).
+
+        `tags` restricts scoring to chunks with those labels, e.g.
+        ["Contact", "Location"]. With AUTO_TAGS ("auto") the labels are
+        routed from the query (see route_tags) and the results topped up
+        from all chunks when the routed ones run short.
+        """
+        return self.search_many([query], top_k=top_k, mix_ratio=mix_ratio, strategy=strategy, pool=pool, tags=tags)[0]
 
-        if os.path.exists(faiss_path) and os.path.exists(bm25_path) and os.path.exists(chunks_path):
-            self.faiss_index = faiss.read_index(faiss_path)
-            with open(bm25_path, "rb") as f:
-                self.bm25 = pickle.load(f)
-            with open(chunks_path, "rb") as f:
-                self.chunks = pickle.load(f)
-        else:
-            raise FileNotFoundError(f"⚠️ Preprocessed data for domain '{domain}' not found.")
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+        tags=None,
+    ) -> List[List[str]]:
+        """
+        Ranked chunks for each query: one embedding batch (through the
+        shared query cache), one FAISS search and one BM25 score matrix
+        per distinct tag filter.
+        """
+        hits = self._search_positions(queries, top_k, mix_ratio, strategy, pool, tags)
+        return [[self.chunks[i] for i in positions] for positions in hits]
 
-    def search(self, query: str, top_k: int = 5, mix_ratio: float = 0.5):
-        if not self.chunks or not self.faiss_index or not self.bm25:
+    def search_chunks(
+        self,
+        query: str,
+        top_k: int = 5,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+        tags=None,
+    ) -> List[dict]:
+        """
+        Like search(), with each hit as {"text", "tag", "title", "url", ...}
+        ("Retrieved" tag for stores without metadata).
+        """
+        return self.search_chunks_many([query], top_k=top_k, mix_ratio=mix_ratio, strategy=strategy, pool=pool, tags=tags)[0]
+
+    def search_chunks_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        mix_ratio: float = 0.5,
+        strategy: str = DEFAULT_STRATEGY,
+        pool: Optional[int] = None,
+        tags=None,
+    ) -> List[List[dict]]:
+        """
+        search_chunks() for several queries, batched like search_many().
+        """
+        results = []
+        for positions in self._search_positions(queries, top_k, mix_ratio, strategy, pool, tags):
+            if self.metadata is None:
+                results.append([{"text": self.chunks[i], "tag": "Retrieved", "title": "", "url": None} for i in positions])
+            else:
+                results.append([{"text": self.chunks[i], **self.metadata.row(i)} for i in positions])
+        return results
+
+    def _route(self, query: str, tags) -> Optional[tuple]:
+        if tags is None or self.metadata is None:
+            return None
+        if tags == AUTO_TAGS:
+            routed = route_tags(query)
+            return tuple(routed) if routed else None
+        return tuple(tags)
+
+    def _search_positions(self, queries, top_k, mix_ratio, strategy, pool, tags) -> List[np.ndarray]:
+        if not len(self.chunks) or not self.faiss_index or not self.bm25:
             raise ValueError("⚠️ Retriever not properly initialized.")
+        if strategy not in FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy '{strategy}', expected one of {FUSION_STRATEGIES}")
+        if not queries:
+            return []
+        pool = pool or CANDIDATE_MULTIPLIER * top_k
+
+        routes = [self._route(query, tags) for query in queries]
+        groups = {}
+        for row, route in enumerate(routes):
+            groups.setdefault(route, []).append(row)
 
-        query_embedding = embedding_model.encode([query])[0]
+        results = [None] * len(queries)
+        for route, rows in groups.items():
+            mask = None if route is None else self.metadata.tag_mask(route)
+            hits = self._rank([queries[row] for row in rows], top_k, mix_ratio, strategy, pool, mask)
+            for row, positions in zip(rows, hits):
+                results[row] = positions
 
-        # FAISS Similarity
-        D, I = self.faiss_index.search(np.array([query_embedding]), top_k)
-        faiss_scores = {i: 1.0 / (1.0 + D[0][j]) for j, i in enumerate(I[0])}
+        if tags == AUTO_TAGS:
+            # Routing narrows the search, it should not cost answers
+            short = [row for row, route in enumerate(routes) if route is not None and len(results[row]) < top_k]
+            if short:
+                fill = self._rank([queries[row] for row in short], top_k, mix_ratio, strategy, pool, None)
+                for row, extra in zip(short, fill):
+                    extra = extra[~np.isin(extra, results[row])]
+                    results[row] = np.concatenate([results[row], extra])[:top_k]
+        return results
 
-        # BM25 Scores
-        bm25_scores_array = self.bm25.get_scores(query.split())
-        bm25_scores_dict = {i: score for i, score in enumerate(bm25_scores_array)}
+    def _rank(self, queries: List[str], top_k, mix_ratio, strategy, pool, mask: Optional[np.ndarray]) -> List[np.ndarray]:
+        """
+        Fused chunk positions per query, scoring only chunks where `mask` is set.
+        """
+        if mask is not None and not mask.any():
+            return [np.zeros(0, dtype=np.int64) for _ in queries]
 
-        # Combine scores
-        merged_scores = {}
-        for i in range(len(self.chunks)):
-            faiss_score = faiss_scores.get(i, 0.0)
-            bm25_score = bm25_scores_dict.get(i, 0.0)
-            merged = mix_ratio * faiss_score + (1.0 - mix_ratio) * bm25_score
-            if merged > 0:
-                merged_scores[i] = merged
+        D = I = sparse_scores = None
+        if strategy != "sparse":
+            query_embeddings = query_embedding_cache.encode(queries, embedding_model.encode)
+            if self.index_params and self.index_params.get("normalized"):
+                query_embeddings = normalize(query_embeddings)
+            params = None if mask is None else filtered_search_params(self.index_params, self.ids[mask])
+            D, I = self.faiss_index.search(query_embeddings, pool, params=params)
+        if strategy != "dense":
+            sparse_scores = self._bm25_scores(queries)
+            if mask is not None:
+                sparse_scores[:, ~mask] = 0
 
-        top_hits = sorted(merged_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
-        return [self.chunks[i] for i, _ in top_hits]
+        results = []
+        for row in range(len(queries)):
+            results.append(fuse(
+                None if I is None else self._dense_positions(I[row]),
+                None if D is None else dense_scores(D[row], self.index_params),
+                None if sparse_scores is None else sparse_scores[row],
+                top_k, strategy=strategy, mix_ratio=mix_ratio, pool=pool,
+            ))
+        return results
@@ -0,0 +1,33 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+SITE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "site")
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    requested = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    """
+    Serve tests/fixtures/site on a free local port and record requested paths.
+    """
+    RecordingHandler.requested = []
+    handler = functools.partial(RecordingHandler, directory=SITE_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", RecordingHandler.requested
+    server.shutdown()
+    server.server_close()
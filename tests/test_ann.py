@@ -0,0 +1,77 @@
+import os
+import sys
+import faiss
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.ann import (
+    ANN_KINDS,
+    build_index,
+    choose_index_kind,
+    dense_scores,
+    load_index_meta,
+    normalize,
+    save_index_meta,
+)
+
+
+def clustered(n: int, dim: int = 32, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((50, dim))
+    return (centres[rng.integers(0, 50, size=n)] + 0.3 * rng.standard_normal((n, dim))).astype("float32")
+
+
+def test_kind_follows_corpus_size():
+    assert choose_index_kind(30) == "flat"
+    assert choose_index_kind(50_000) == "ivf_flat"
+    assert choose_index_kind(500_000) == "ivf_sq8"
+    assert choose_index_kind(5_000_000) == "ivf_pq"
+
+
+# PQ codes are lossy, and on a corpus this small they get few bits
+MIN_RECALL = {"flat": 0.99, "hnsw": 0.9, "ivf_flat": 0.9, "ivf_sq8": 0.9, "ivf_pq": 0.3}
+
+
+@pytest.mark.parametrize("kind", ANN_KINDS)
+def test_every_kind_finds_exact_neighbours(kind):
+    vectors = clustered(2_000)
+    ids = np.arange(2_000, dtype="int64") * 7 - 10_000
+    index, params = build_index(vectors, ids, kind=kind)
+
+    assert params["kind"] == kind and params["metric"] == "ip" and params["ntotal"] == 2_000
+    assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    queries = normalize(vectors[:50])
+    exact = faiss.IndexFlatIP(32)
+    exact.add(normalize(vectors))
+    _, expected = exact.search(queries, 10)
+    _, found = index.search(queries, 10)
+    recall = np.mean([len(set(ids[e]) & set(f)) / 10 for e, f in zip(expected, found)])
+    assert recall >= MIN_RECALL[kind]
+
+
+def test_ivf_params_are_recorded_and_support_removal():
+    vectors = clustered(5_000)
+    index, params = build_index(vectors, np.arange(5_000), kind="ivf_sq8")
+    assert params["nlist"] >= 1 and 1 <= params["nprobe"] <= params["nlist"]
+    assert faiss.extract_index_ivf(index).nprobe == params["nprobe"]
+
+    index.remove_ids(np.arange(100, dtype="int64"))
+    assert index.ntotal == 4_900
+
+
+def test_pq_subquantizers_divide_dimension():
+    _, params = build_index(clustered(1_000, dim=40), np.arange(1_000), kind="ivf_pq")
+    assert 40 % params["pq_m"] == 0 and 4 <= params["pq_bits"] <= 8
+
+
+def test_meta_round_trip_and_scores(tmp_path):
+    path = str(tmp_path / "x_faiss.index")
+    assert load_index_meta(path) is None
+    save_index_meta(path, {"kind": "flat", "metric": "ip"})
+    params = load_index_meta(path)
+    assert params == {"kind": "flat", "metric": "ip"}
+
+    assert dense_scores(np.array([0.9, 0.1]), params).tolist() == [0.9, 0.1]
+    # Indexes without metadata return L2 distances
+    assert dense_scores(np.array([0.0, 1.0]), None).tolist() == [1.0, 0.5]
@@ -0,0 +1,102 @@
+import os
+import pickle
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from rank_bm25 import BM25Okapi
+from src.bm25 import WHITESPACE_TOKENIZER, SparseBM25, Tokenizer, load_bm25
+
+CORPUS = [
+    "We build pricing tools for small teams",
+    "Contact our sales team today",
+    "Pricing plans start at ten dollars per seat",
+    "Careers: join our remote engineering team",
+    "",
+    "team team team pricing",
+]
+QUERIES = [["pricing"], ["team", "pricing", "team"], ["unknown"], ["Contact", "sales"], []]
+
+
+def random_corpus(n_docs: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(200)]
+    lengths = rng.integers(0, 30, size=n_docs)
+    return [" ".join(rng.choice(words, size=n)) for n in lengths]
+
+
+@pytest.mark.parametrize("corpus", [CORPUS, random_corpus(400)])
+def test_scores_match_rank_bm25(corpus):
+    reference = BM25Okapi([doc.split() for doc in corpus])
+    index = SparseBM25.from_texts(corpus, tokenizer=WHITESPACE_TOKENIZER)
+    queries = QUERIES + [["w1", "w7", "w7"], ["w150", "w3"]]
+    for query in queries:
+        assert np.allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-5), query
+
+
+def test_score_matrix_matches_single_queries():
+    index = SparseBM25.from_texts(CORPUS)
+    queries = ["pricing team", "nothing here", "", "team team sales"]
+    matrix = index.score_many(queries)
+    assert matrix.shape == (len(queries), len(CORPUS))
+    for row, query in enumerate(queries):
+        assert np.allclose(matrix[row], index.score(query))
+
+
+def test_update_matches_fresh_build():
+    index = SparseBM25.from_texts(CORPUS)
+    updated = index.update([1, 4], ["About our mission", "Team pricing"])
+
+    expected_docs = [CORPUS[0], CORPUS[2], CORPUS[3], CORPUS[5], "About our mission", "Team pricing"]
+    fresh = SparseBM25.from_texts(expected_docs)
+    assert updated.corpus_size == 6
+    assert sorted(updated.terms) == sorted(fresh.terms)
+    assert "contact" not in updated.vocab
+    for query in ["pricing", "team mission", "contact sales"]:
+        assert np.allclose(updated.score(query), fresh.score(query))
+
+
+def test_save_and_mmap_load_round_trip(tmp_path):
+    tokenizer = Tokenizer(stopwords=["our", "for"], min_length=2)
+    index = SparseBM25.from_texts(CORPUS, tokenizer=tokenizer, k1=1.2, b=0.7)
+    path = str(tmp_path / "bm25.bin")
+    index.save(path)
+
+    loaded = load_bm25(path)
+    assert isinstance(loaded.doc_ids, np.memmap)
+    assert loaded.tokenizer.config() == tokenizer.config()
+    assert (loaded.k1, loaded.b) == (1.2, 0.7)
+    assert loaded.terms == index.terms
+    assert np.allclose(loaded.score("Pricing, for OUR team!"), index.score("pricing team"))
+
+    # Overwriting keeps existing readers on the old mapping valid
+    index.update([0], []).save(path)
+    assert loaded.corpus_size == len(CORPUS)
+    assert SparseBM25.load(path, mmap=False).corpus_size == len(CORPUS) - 1
+
+
+def test_term_idf_override_and_document_frequencies():
+    index = SparseBM25.from_texts(CORPUS)
+    df = index.document_frequencies(["team", "unseen"])
+    assert df["unseen"] == 0 and df["team"] >= 2
+    base = index.score_many(["sales team"])
+    scaled = index.score_many(["sales team"], term_idf={"sales": 0.0})
+    assert np.allclose(scaled, index.score_many(["team"]))
+    assert base.sum() > scaled.sum()
+
+
+def test_tokenizer_normalises_case_and_punctuation():
+    assert Tokenizer()("Pricing: $10/seat, Team-wide!") == ["pricing", "10", "seat", "team", "wide"]
+    assert WHITESPACE_TOKENIZER("Pricing: $10") == ["Pricing:", "$10"]
+
+
+def test_legacy_pickle_still_loads(tmp_path):
+    path = tmp_path / "legacy_bm25.pkl"
+    with open(path, "wb") as f:
+        pickle.dump(BM25Okapi([doc.split() for doc in CORPUS[:2]]), f)
+    assert isinstance(load_bm25(str(path)), BM25Okapi)
+
+
+def test_empty_corpus_is_rejected():
+    with pytest.raises(ValueError):
+        SparseBM25.from_texts([])
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("sentence_transformers")
+import src.bulk_ingest as bulk_ingest
+import src.crawler as crawler
+from src.bulk_ingest import BulkIngestor, read_domains
+from src.embedding_cache import EmbeddingCache
+
+
+class FakeEncoder:
+    """
+    Deterministic stand-in for embedding_model.encode that records batch sizes.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(len(texts))
+        return np.array([[len(t) % 7, len(t) % 5, 1.0, 0.5] for t in texts], dtype="float32")
+
+
+def test_bulk_ingest_batches_and_resumes(site, tmp_path, monkeypatch):
+    base, requested = site
+    monkeypatch.chdir(tmp_path)
+    domains = [f"{base}/index.html", f"{base}/about.html", f"{base}/pricing.html", f"{base}/missing.html"]
+    manifest = str(tmp_path / "manifest.jsonl")
+
+    encoder = FakeEncoder()
+    report = BulkIngestor(manifest, parse_workers=0, host_rate=0, embed_batch_wait=5, encode=encoder, cache=None).run(domains)
+
+    assert (report["done"], report["failed"], report["skipped"]) == (3, 1, 0)
+    # Chunks from all three pages went through a single encode call
+    assert encoder.batches == [report["stages"]["embed"]["items"]]
+    assert report["stages"]["fetch"]["items"] == 3
+    assert len(list((tmp_path / "cache").glob("*.bundle"))) == 3  # one bundle per domain
+
+    with open(manifest, encoding="utf-8") as f:
+        statuses = {e["domain"]: e["status"] for e in map(json.loads, f)}
+    assert statuses[f"{base}/missing.html"] == "failed"
+
+    # Resuming only retries what did not finish
+    requested.clear()
+    encoder = FakeEncoder()
+    report = BulkIngestor(manifest, parse_workers=0, host_rate=0, encode=encoder, cache=None).run(domains)
+    assert report["skipped"] == 3
+    assert requested == ["/missing.html"]
+    assert encoder.batches == []
+
+
+def test_read_domains_skips_comments_and_duplicates(tmp_path):
+    path = tmp_path / "domains.txt"
+    path.write_text("# leads\nhttps://a.test\n\nhttps://b.test  # second\nhttps://a.test\n", encoding="utf-8")
+    assert read_domains(str(path)) == ["https://a.test", "https://b.test"]
+
+
+def test_rate_limited_hosts_do_not_hold_fetch_slots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = {}
+    started = time.monotonic()
+
+    def conditional_fetch(url, known):
+        fetched[url] = time.monotonic() - started
+        return url, None, {}  # unchanged: nothing to parse
+
+    monkeypatch.setattr(bulk_ingest, "conditional_fetch", conditional_fetch)
+    ingestor = BulkIngestor(str(tmp_path / "manifest.jsonl"), fetch_concurrency=1, host_rate=4, cache=None)
+    # Bare domains are keyed by their own host, not by one shared "" bucket
+    domains = [f"slow.test/{page}" for page in "abc"] + ["fast.test/"]
+
+    async def produce_all():
+        slots = asyncio.Semaphore(1)
+        await asyncio.gather(*(ingestor._produce(d, slots, None, asyncio.Queue()) for d in domains))
+
+    asyncio.run(produce_all())
+    assert fetched["fast.test/"] < 0.2  # not queued behind slow.test's 0.25 s spacing
+    assert fetched["slow.test/c"] >= 0.45
+
+
+def test_crawled_subpages_wait_for_the_host_rate_limit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+    links = "".join(f'<a href="/page-{i}">Page {i}</a>' for i in range(3))
+
+    def fetch_page(url, pool):
+        fetched.append(time.monotonic())
+        return url, f"<html><body><h2>Welcome</h2><p>{url}</p>{links}</body></html>"
+
+    monkeypatch.setattr(crawler, "fetch_page", fetch_page)
+    ingestor = BulkIngestor(str(tmp_path / "manifest.jsonl"), crawl=True, host_rate=10, cache=None)
+
+    async def produce():
+        await ingestor._produce("https://acme.test/", asyncio.Semaphore(1), None, asyncio.Queue())
+
+    asyncio.run(produce())
+    assert len(fetched) == 4
+    assert min(b - a for a, b in zip(fetched, fetched[1:])) >= 0.09  # 1 / host_rate apart
+
+
+def test_bulk_ingest_reuses_cached_embeddings(site, tmp_path, monkeypatch):
+    base, _ = site
+    monkeypatch.chdir(tmp_path)
+    domains = [f"{base}/index.html", f"{base}/about.html"]
+    cache = EmbeddingCache("fake-model", cache_dir=str(tmp_path / "embeddings"))
+
+    encoder = FakeEncoder()
+    first = BulkIngestor(str(tmp_path / "first.jsonl"), parse_workers=0, host_rate=0,
+                         encode=encoder, cache=cache).run(domains)
+    assert first["embedding_cache"]["hit_rate"] < 1.0
+    assert sum(encoder.batches) == cache.stats()["entries"]
+
+    # A fresh run over unchanged pages is served from the cache on disk
+    encoder = FakeEncoder()
+    cache = EmbeddingCache("fake-model", cache_dir=str(tmp_path / "embeddings"))
+    second = BulkIngestor(str(tmp_path / "second.jsonl"), parse_workers=0, host_rate=0,
+                          encode=encoder, cache=cache).run(domains)
+    assert second["done"] == 2
+    assert encoder.batches == []
+    assert second["embedding_cache"]["hit_rate"] == 1.0
+
+
+def test_incremental_rerun_skips_unmodified_pages(site, tmp_path, monkeypatch):
+    base, _ = site
+    monkeypatch.chdir(tmp_path)
+    domains = [f"{base}/index.html", f"{base}/about.html"]
+
+    first = BulkIngestor(str(tmp_path / "first.jsonl"), parse_workers=0, host_rate=0,
+                         encode=FakeEncoder(), cache=None, incremental=True).run(domains)
+    assert (first["done"], first["unchanged"]) == (2, 0)
+
+    encoder = FakeEncoder()
+    second = BulkIngestor(str(tmp_path / "second.jsonl"), parse_workers=0, host_rate=0,
+                          encode=encoder, cache=None, incremental=True).run(domains)
+    assert (second["done"], second["unchanged"]) == (2, 2)
+    assert second["stages"]["parse"]["items"] == 0
+    assert encoder.batches == []
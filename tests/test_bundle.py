@@ -0,0 +1,106 @@
+import os
+import pickle
+import sys
+import faiss
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from rank_bm25 import BM25Okapi
+from src.ann import build_index, save_index_meta
+from src.arrayfile import ChecksumError, TextColumn
+from src.bm25 import SparseBM25
+from src.bundle import DomainBundle, chunk_id, load_domain_bundle, verify_bundle
+from src.chunk_metadata import ChunkMetadata
+from src.utils import get_bundle_path, get_cache_paths, get_metadata_path
+
+DOMAIN = "https://acme.test"
+TEXTS = ["Pricing plans start at ten dollars", "Contact sales today", "Ünïcode café ☕ menu"]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def vectors(texts):
+    return np.array([[len(t), t.count("a"), t.count(" "), 1.0] for t in texts], dtype="float32")
+
+
+def make_bundle(texts=TEXTS):
+    ids = np.array([chunk_id(t) for t in texts], dtype=np.int64)
+    index, params = build_index(vectors(texts), ids)
+    metadata = ChunkMetadata.from_chunks([{"tag": "Other", "title": "T", "text": t} for t in texts], texts)
+    return DomainBundle(index, params, ids, SparseBM25.from_texts(texts), texts, metadata)
+
+
+def test_text_column_decodes_on_access():
+    column = TextColumn.from_texts(TEXTS + [""])
+    assert len(column) == 4
+    assert column[2] == "Ünïcode café ☕ menu"
+    assert column[-1] == ""
+    assert column.tolist() == TEXTS + [""]
+    with pytest.raises(IndexError):
+        column[4]
+
+
+def test_round_trip_is_memory_mapped():
+    path = get_bundle_path(DOMAIN)
+    make_bundle().save(path)
+    bundle = DomainBundle.open(path)
+
+    assert isinstance(bundle.chunks.blob, np.memmap)
+    assert isinstance(bundle.bm25.indptr, np.memmap)
+    assert bundle.chunks.tolist() == TEXTS
+    assert bundle.index.ntotal == 3 and bundle.index_params["kind"] == "flat"
+    assert bundle.ids.tolist() == [chunk_id(t) for t in TEXTS]
+    assert np.allclose(bundle.bm25.score("contact sales"), SparseBM25.from_texts(TEXTS).score("contact sales"))
+    assert bundle.metadata.titles[1] == "T"
+    assert os.listdir("cache") == [os.path.basename(path)]
+
+
+def test_corruption_is_detected():
+    path = get_bundle_path(DOMAIN)
+    make_bundle().save(path)
+    with open(path, "rb") as f:
+        offset = f.read().index(b"Contact sales")
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"K")
+    with pytest.raises(ChecksumError):
+        DomainBundle.open(path, verify=True)
+    assert "chunks.blob" in verify_bundle(DOMAIN)
+    assert DomainBundle.open(path).chunks[1] == "Kontact sales today"  # the query path does not read every page
+
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 64)
+    with pytest.raises(ChecksumError):
+        DomainBundle.open(path, verify=False)
+
+
+def test_legacy_files_are_migrated_once():
+    faiss_path, bm25_path, chunks_path = get_cache_paths(DOMAIN)
+    ids = np.array([chunk_id(t) for t in TEXTS], dtype=np.int64)
+    index, params = build_index(vectors(TEXTS), ids)
+    faiss.write_index(index, faiss_path)
+    save_index_meta(faiss_path, params)
+    with open(bm25_path, "wb") as f:
+        pickle.dump(BM25Okapi([t.split() for t in TEXTS]), f)
+    with open(chunks_path, "wb") as f:
+        pickle.dump(TEXTS, f)
+    metadata = ChunkMetadata.from_chunks([{"tag": "Pricing", "text": TEXTS[0]}], TEXTS)
+    np.savez(get_metadata_path(DOMAIN), tags=np.array(metadata.tags), tag_ids=metadata.tag_ids,
+             titles=np.array(metadata.titles), urls=np.array(metadata.urls, dtype=str), url_ids=metadata.url_ids,
+             positions=metadata.positions, lengths=metadata.lengths)
+
+    bundle = load_domain_bundle(DOMAIN)
+    assert sorted(os.listdir("cache")) == [os.path.basename(get_bundle_path(DOMAIN)), "locks"]
+    assert bundle.chunks.tolist() == TEXTS
+    assert isinstance(bundle.bm25, SparseBM25)
+    assert bundle.index_params["kind"] == "flat"
+    assert bundle.metadata.tag(0) == "Pricing"
+    assert load_domain_bundle(DOMAIN).ids.tolist() == ids.tolist()
+
+
+def test_missing_domain_raises():
+    with pytest.raises(FileNotFoundError):
+        load_domain_bundle("https://nowhere.test")
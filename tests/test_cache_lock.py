@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import cache_lock
+from src.cache_lock import SingleFlight, atomic_write, domain_lock
+from src.utils import get_bundle_path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_atomic_write_keeps_previous_file_on_error(tmp_path):
+    path = tmp_path / "raw" / "acme.txt"
+    with atomic_write(str(path)) as f:
+        f.write("first")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write("half of the second")
+            raise RuntimeError("crashed mid-write")
+
+    assert path.read_text() == "first"
+    assert os.listdir(path.parent) == ["acme.txt"]
+
+
+def test_domain_lock_serialises_writers_and_is_reentrant():
+    active, overlaps = [], []
+
+    def writer():
+        with domain_lock("https://acme.test"):
+            with domain_lock("acme.test"):  # same key, re-entered
+                active.append(1)
+                overlaps.append(len(active))
+                time.sleep(0.02)
+                active.pop()
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert overlaps == [1, 1, 1, 1]
+
+
+@pytest.mark.skipif(cache_lock.fcntl is None, reason="advisory file locks need fcntl")
+def test_domain_lock_excludes_other_processes():
+    holder = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import sys, time; sys.path.insert(0, sys.argv[1])\n"
+            "from src.cache_lock import domain_lock\n"
+            "with domain_lock('acme.test'):\n"
+            "    print('locked', flush=True); time.sleep(0.5)\n"
+        ), ROOT],
+        stdout=subprocess.PIPE, text=True,
+    )
+    assert holder.stdout.readline().strip() == "locked"
+    start = time.perf_counter()
+    with domain_lock("acme.test"):
+        waited = time.perf_counter() - start
+    holder.wait()
+    assert waited > 0.2
+
+
+def test_single_flight_shares_one_result():
+    flight = SingleFlight()
+    calls, results = [], []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(1)
+        return "success"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("acme", work))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while flight.shared < 4:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == ["success"] * 5
+    assert flight.do("acme", work) == "success"  # finished calls are not memoised
+    assert calls == [1, 1]
+
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("acme", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("acme", lambda: 1) == 1
+
+
+def test_insert_domain_skips_work_published_while_waiting(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    from src import domain_inserter
+
+    scraped = []
+    monkeypatch.setattr(domain_inserter, "_insert", lambda domain, crawl, incremental: scraped.append(domain) or "success")
+
+    locked, done = threading.Event(), threading.Event()
+
+    def other_worker():
+        with domain_lock("acme.test"):
+            locked.set()
+            time.sleep(0.1)
+            with open(get_bundle_path("acme.test"), "wb") as f:
+                f.write(b"published")
+        done.set()
+
+    threading.Thread(target=other_worker).start()
+    locked.wait(1)
+    assert domain_inserter.insert_domain("acme.test") == "success"
+    assert done.is_set()
+    assert scraped == []
+
+    assert domain_inserter.insert_domain("acme.test") == "success"
+    assert scraped == ["acme.test"]
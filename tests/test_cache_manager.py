@@ -0,0 +1,134 @@
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.cache_manager import CacheManager, RefreshScheduler
+from src.snapshot_store import snapshot_store
+from src.storage import get_raw_path, iter_raw_chunks, save_raw_text
+from src.utils import get_bundle_path
+
+DAY = 24 * 3600
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def ingest(manager, domain, size=1000, crawl=False):
+    with open(get_bundle_path(domain), "wb") as f:
+        f.write(b"x" * size)
+    save_raw_text(domain, "raw")
+    manager.record_ingest(domain, crawl=crawl)
+
+
+def test_index_tracks_size_and_accesses():
+    clock = Clock()
+    manager = CacheManager(clock=clock, flush_sec=60)
+    ingest(manager, "acme.com")
+    manager.record_access("acme.com")
+    manager.record_access("acme.com")
+    assert manager.entries()["acme.com"]["accesses"] == 0  # still buffered
+
+    clock.now += 61
+    manager.record_access("acme.com")
+    entry = manager.entries()["acme.com"]
+    assert entry["bytes"] == 1000 + sum(os.path.getsize(p) for p in snapshot_store.files("acme.com"))
+    assert entry["accesses"] == entry["recent_accesses"] == 3
+    assert entry["last_access"] == clock.now
+
+
+def test_quota_evicts_least_recently_used_domains():
+    clock = Clock()
+    manager = CacheManager(clock=clock, quota_bytes=250_000)
+    for domain in ("a.com", "b.com"):
+        ingest(manager, domain, size=100_000)
+        clock.now += 1
+    manager.record_access("a.com")  # b.com is now the least recently used
+    clock.now += 1
+
+    assert manager.flush() == []
+    ingest(manager, "c.com", size=100_000)  # over the quota
+
+    assert set(manager.entries()) == {"a.com", "c.com"}
+    assert not os.path.exists(get_bundle_path("b.com"))
+    assert snapshot_store.versions("b.com") == []
+    assert os.path.exists(get_bundle_path("a.com"))
+    assert manager.evictions == 1
+
+
+def test_shared_snapshot_texts_count_against_the_quota_and_are_compacted():
+    clock = Clock()
+    manager = CacheManager(clock=clock, quota_bytes=120_000)
+    for domain in ("a.com", "b.com"):
+        with open(get_bundle_path(domain), "wb") as f:
+            f.write(b"x" * 1000)
+        texts = [os.urandom(2000).hex() for _ in range(10)]  # ~20 KB of packed text per domain
+        save_raw_text(domain, [{"tag": "Other", "text": text} for text in texts])
+        manager.record_ingest(domain)
+        clock.now += 1
+    assert manager.stats()["snapshot_objects_bytes"] > 40_000
+
+    manager.quota_bytes = 30_000
+    assert manager.enforce_quota() == ["a.com"]
+    assert manager.total_bytes() <= 30_000
+    assert len(list(iter_raw_chunks("b.com"))) == 10
+
+
+def test_eviction_skips_a_domain_republished_after_the_snapshot():
+    manager = CacheManager()
+    ingest(manager, "acme.com")
+    assert not manager.evict("acme.com", expected=())
+    assert os.path.exists(get_bundle_path("acme.com"))
+
+
+def test_existing_files_seed_the_index():
+    with open(get_bundle_path("legacy.com"), "wb") as f:
+        f.write(b"x" * 10)
+    os.makedirs(os.path.dirname(get_raw_path("legacy.com")), exist_ok=True)
+    with open(get_raw_path("legacy.com"), "w") as f:
+        f.write("raw")
+    entry = CacheManager().entries()["legacy.com"]
+    assert entry["bytes"] == 13
+    assert entry["last_scrape"] > 0
+
+
+def test_refresh_picks_stale_hot_domains_first():
+    clock = Clock()
+    manager = CacheManager(clock=clock, ttl_sec=DAY, flush_sec=0)
+    for domain in ("cold.com", "warm.com", "hot.com", "fresh.com"):
+        ingest(manager, domain, crawl=domain == "hot.com")
+    clock.now += 2 * DAY
+    ingest(manager, "fresh.com")
+    for domain, hits in (("warm.com", 1), ("hot.com", 5), ("fresh.com", 9)):
+        for _ in range(hits):
+            manager.record_access(domain)
+
+    assert manager.stale_domains() == ["hot.com", "warm.com", "cold.com"]
+
+    refreshed = []
+
+    def refresh(domain, crawl):
+        refreshed.append((domain, crawl))
+        if domain == "warm.com":
+            raise RuntimeError("site down")
+        manager.record_ingest(domain, crawl=crawl)  # as insert_domain does
+        return "unchanged"
+
+    counts = RefreshScheduler(manager, refresh=refresh, max_per_cycle=5).run_once()
+    # cold.com was never asked for; a crawled domain is refreshed as a crawl
+    assert refreshed == [("hot.com", True), ("warm.com", False)]
+    assert counts == {"refreshed": 0, "unchanged": 1, "failed": 1}
+
+    # A refresh resets the window; a failure backs off for a TTL
+    assert manager.entries()["hot.com"]["recent_accesses"] == 0
+    assert manager.crawl_mode("hot.com") is True
+    assert manager.stale_domains() == ["cold.com"]
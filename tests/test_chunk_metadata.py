@@ -0,0 +1,47 @@
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.arrayfile import TextColumn
+from src.chunk_metadata import ChunkMetadata, route_tags
+
+TAGGED = [
+    {"tag": "About", "title": "About us", "text": " We build tools ", "url": "https://acme.test/about"},
+    {"tag": "Contact", "title": "Contact", "text": "Email hello@acme.test", "url": "https://acme.test/contact"},
+    {"tag": "Other", "title": "", "text": "We build tools"},  # duplicate text: first chunk wins
+    {"tag": "Pricing", "title": "Plans", "text": "From $10 per seat"},
+]
+TEXTS = ["We build tools", "Email hello@acme.test", "From $10 per seat"]
+
+
+def test_router_maps_tasks_to_labels():
+    assert route_tags("What is their contact info?") == ["Contact", "Location"]
+    assert route_tags("How much does the Pro plan cost?") == ["Pricing"]
+    assert route_tags("Who are the founders and where is the office?") == ["Location", "Contact", "Team"]
+    assert route_tags("Summarize this company") is None
+    assert route_tags("What capabilities and offerings do they list?") == ["Services", "Process"]
+
+
+def test_router_keywords_do_not_match_inside_longer_words():
+    assert route_tags("Describe their teamwork culture") is None
+    assert route_tags("Which of their artworks are priceless?") is None
+    assert route_tags("Is the data accurate?") is None
+
+
+def test_rows_follow_the_indexed_texts():
+    metadata = ChunkMetadata.from_chunks(TAGGED, TEXTS)
+    assert len(metadata) == 3
+    assert metadata.row(0) == {"tag": "About", "title": "About us", "url": "https://acme.test/about", "position": 0, "length": 14}
+    assert metadata.url(2) is None and metadata.tag(2) == "Pricing"
+    assert metadata.tag_mask(["Contact", "Location"]).tolist() == [False, True, False]
+    assert metadata.counts() == {"About": 1, "Contact": 1, "Pricing": 1}
+
+
+def test_array_round_trip_keeps_titles_lazy():
+    metadata = ChunkMetadata.from_chunks(TAGGED, TEXTS)
+    header, arrays = metadata.to_arrays("meta.")
+    loaded = ChunkMetadata.from_arrays(header, arrays, "meta.")
+    assert loaded == metadata
+    assert isinstance(loaded.titles, TextColumn)
+    assert loaded.tag_ids.dtype == np.int16
+    assert loaded != ChunkMetadata.from_chunks([{**TAGGED[0], "tag": "Mission"}] + TAGGED[1:], TEXTS)
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bs4 import BeautifulSoup
+from src.chunker import HAS_LXML, chunk_html, chunk_soup
+from src.scraper import extract_semantic_chunks
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = ["simple_page", "nested_sections", "large_page"]
+
+
+def load_page(name: str):
+    with open(os.path.join(FIXTURES, f"{name}.html"), encoding="utf-8") as f:
+        html = f.read()
+    # Golden chunks were produced by the original descendant walk
+    with open(os.path.join(FIXTURES, f"{name}.chunks.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    return html, expected
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_soup_backend_matches_golden(name):
+    html, expected = load_page(name)
+    assert chunk_soup(BeautifulSoup(html, "html.parser")) == expected
+    assert extract_semantic_chunks(BeautifulSoup(html, "html.parser")) == expected
+
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml not installed")
+@pytest.mark.parametrize("name", PAGES)
+def test_lxml_backend_matches_golden(name):
+    html, expected = load_page(name)
+    assert chunk_html(html, backend="lxml") == expected
+
+
+@pytest.mark.skipif(not HAS_LXML, reason="lxml not installed")
+def test_backends_agree_on_non_content_strings():
+    html = """<html><body>
+    <h2>Our <em>Mission</em></h2>
+    <div>We build tools<script>var x = "hidden script";</script> for teams.<!-- a comment --></div>
+    <style>.a { color: red }</style>
+    <template><p>Template content here</p></template>
+    <h2>Contact Us</h2><p>Write to hello@example.com</p>
+    </body></html>"""
+    expected = chunk_html(html, backend="html.parser")
+    assert chunk_html(html, backend="lxml") == expected
+    # Script text is kept out of the enclosing div's text, as with get_text()
+    assert "We build toolsfor teams." in expected[0]["text"]
+    assert [c["title"] for c in expected] == ["OurMission", "Contact Us"]
+
+
+def test_missing_body_returns_none():
+    assert chunk_html("<p>no body here</p>", backend="html.parser") is None
@@ -0,0 +1,56 @@
+import json
+import os
+import random
+import re
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.classifier import KeywordMatcher, SectionClassifier, collapse_repeated_phrases, section_classifier
+from src.scraper import clean_text, detect_section_label
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Golden labels/cleaned text were produced by the original regex functions
+with open(os.path.join(FIXTURES, "section_labels.json"), encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+def test_labels_match_golden_corpus():
+    for row in CORPUS:
+        assert detect_section_label(row["text"]) == row["label"], row["text"]
+
+
+def test_classify_many_matches_single_calls():
+    texts = [row["text"] for row in CORPUS] * 2
+    assert section_classifier.classify_many(texts) == [row["label"] for row in CORPUS] * 2
+
+
+def test_clean_text_matches_golden_corpus():
+    for row in CORPUS:
+        assert clean_text(row["text"]) == row["clean"], row["text"]
+
+
+def test_collapse_matches_backreference_regex():
+    pattern = re.compile(r'\b(\w+(?: \w+){0,4})\b(?: \1\b){1,}', re.IGNORECASE)
+    rng = random.Random(0)
+    words = ["a", "A", "b", "ab", "Ab", "x1", "_", "é", "É"]
+    seps = [" ", " ", " ", ", ", "-", "  "]
+    for _ in range(3000):
+        text = "".join(rng.choice(words) + rng.choice(seps) for _ in range(rng.randint(0, 12)))
+        assert collapse_repeated_phrases(text) == pattern.sub(r"\1", text), text
+
+
+def test_keyword_priority_follows_table_order():
+    matcher = KeywordMatcher([("mission", "Mission"), ("our mission", "About"), ("team", "Team")])
+    assert matcher.match("meet the team behind our mission") == "Mission"
+    assert matcher.match("the team") == "Team"
+    assert matcher.match("nothing here") is None
+
+
+def test_custom_tables():
+    classifier = SectionClassifier(keywords={"widgets": "Products"}, fallback_keywords={}, rules=[])
+    assert classifier.classify_many(["Our widgets", "Something else"]) == ["Products", "Other"]
+
+
+def test_ignorecase_lookalikes_bypass_literal_hints():
+    # "ſ" (long s) matches "s" under IGNORECASE but lower() keeps it as is
+    assert detect_section_label("Our office ſuite downtown") == "Location"
@@ -0,0 +1,64 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import context_packer, llm
+from src.context_packer import estimate_tokens, pack_context
+
+TASK = "List all the services this company offers"
+
+
+def test_chunks_are_kept_in_score_order_until_the_budget_is_full():
+    texts = [
+        "We offer advisory services to mid-market firms.",
+        "Our services include capital raising and M&A.",
+        "The team has offices in New York and London.",
+    ]
+    budget = estimate_tokens(texts[0]) + estimate_tokens(texts[1]) + 4
+    packed = pack_context(TASK, texts, budget, count=estimate_tokens)
+
+    assert packed.context == "\n\n".join(texts[:2])
+    assert packed.chunks_used == 2
+    assert packed.tokens <= budget
+    assert packed.tokens_saved == estimate_tokens(texts[2])
+
+
+def test_repeated_sentences_are_dropped_across_chunks():
+    texts = [
+        "Caprae Capital offers advisory services. Contact us today.",
+        "Contact us today! We also provide growth equity.",
+    ]
+    packed = pack_context(TASK, texts, 500, count=estimate_tokens)
+    assert packed.context.count("Contact us today") == 1
+    assert "growth equity" in packed.context
+    assert packed.dropped_sentences == 1
+
+
+def test_oversized_chunks_contribute_their_best_matching_windows():
+    filler = [f"Paragraph {i} covers " + " ".join(f"topic{i}x{j}" for j in range(6)) + "." for i in range(30)]
+    relevant = "The company offers services such as buy-side advisory and capital raising."
+    text = " ".join(filler[:20] + [relevant] + filler[20:])
+    packed = pack_context(TASK, [text], 60, count=estimate_tokens)
+
+    assert relevant in packed.context
+    assert "Paragraph 0 " not in packed.context  # not simply the head of the chunk
+    assert packed.tokens <= 60
+
+
+def test_chunks_without_a_fitting_sentence_contribute_a_word_window():
+    services = " ".join(f"item{i}" for i in range(40)) + " services buy-side advisory capital raising " + " ".join(f"item{i}" for i in range(40, 80))
+    texts = [services, "The team has offices in New York and London."]
+    packed = pack_context(TASK, texts, 30, count=estimate_tokens)
+
+    first = packed.context.split("\n\n")[0]
+    assert "services buy-side advisory" in first  # the top chunk is not dropped
+    assert first.startswith(context_packer.WINDOW_SEPARATOR) and "item0 " not in first
+    assert packed.tokens == estimate_tokens(packed.context) <= 30
+
+
+def test_prompt_fits_the_model_input(monkeypatch):
+    monkeypatch.setattr(context_packer, "count_tokens", estimate_tokens)
+    chunks = [{"title": f"Section {i}", "text": f"Section {i} " + "Our services span advisory and operations. " * 80} for i in range(5)]
+    prompt = llm.build_llm2_prompt(TASK, chunks)
+    assert estimate_tokens(prompt) <= context_packer.MODEL_MAX_INPUT_TOKENS
+    assert prompt.startswith("Your job is to respond") and prompt.endswith("Begin your answer below:")
+    assert "advisory" in prompt
@@ -0,0 +1,78 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.crawler import SessionPool, conditional_fetch, crawl_site_structured, extract_links, link_rank
+from src.scraper import scrape_if_modified, scrape_site_structured
+
+
+def test_priority_links_fetched_first(site):
+    base, requested = site
+    chunks = crawl_site_structured(f"{base}/index.html", max_pages=3, workers=1, pool=SessionPool())
+    assert requested == ["/index.html", "/about.html", "/pricing.html"]
+    assert {c["url"] for c in chunks} == {f"{base}/{p}" for p in ("index.html", "about.html", "pricing.html")}
+
+
+def test_depth_budget_and_link_filtering(site):
+    base, requested = site
+    crawl_site_structured(f"{base}/index.html", max_pages=20, max_depth=1, pool=SessionPool())
+    assert "/team.html" not in requested  # only linked from /about.html
+    assert "/brochure.pdf" not in requested
+    assert sorted(requested) == sorted([
+        "/index.html", "/", "/about.html", "/services.html", "/pricing.html",
+        "/contact.html", "/careers.html", "/blog/post-1.html",
+    ])
+
+
+def test_merged_chunks_are_deduplicated_across_pages(site):
+    base, _ = site
+    pool = SessionPool()
+    chunks = crawl_site_structured(f"{base}/index.html", max_pages=20, max_depth=2, pool=pool)
+    texts = [c["text"] for c in chunks]
+    assert len(texts) == len(set(texts))
+    assert any(c["tag"] == "Team" for c in chunks)
+    assert any("Advisory retainers" in c["text"] for c in chunks)
+    # Every page shares the single pooled session for the host
+    assert len(pool) == 1
+
+
+def test_start_page_failure_returns_error_chunk(site):
+    base, _ = site
+    chunks = crawl_site_structured(f"{base}/missing.html", pool=SessionPool())
+    assert chunks[0]["tag"] == "Error"
+
+
+def test_single_page_mode_is_unchanged(site):
+    base, requested = site
+    chunks = scrape_site_structured(f"{base}/index.html")
+    assert requested == ["/index.html"]
+    assert chunks and "url" not in chunks[0]
+
+
+def test_conditional_fetch_returns_none_when_not_modified(site):
+    base, requested = site
+    pool = SessionPool()
+    _, html, validators = conditional_fetch(f"{base}/about.html", pool=pool)
+    assert html and "last_modified" in validators
+
+    _, html, again = conditional_fetch(f"{base}/about.html", validators, pool=pool)
+    assert html is None and again == validators
+
+    chunks, _ = scrape_if_modified(f"{base}/about.html", validators)
+    assert chunks is None
+    assert requested == ["/about.html"] * 3
+
+
+def test_extract_links_and_rank():
+    html = """<html><body>
+    <a href="/pricing">Plans</a><a href="about-us/">Who we are</a>
+    <a href="https://other.test/about">Elsewhere</a><a href="mailto:a@b.test">Mail</a>
+    <a href="/files/deck.pdf">Deck</a><a href="/blog#comments">Blog</a>
+    </body></html>"""
+    links = extract_links(html, "https://www.example.test/home/")
+    assert [url for url, _ in links] == [
+        "https://www.example.test/pricing",
+        "https://www.example.test/home/about-us/",
+        "https://www.example.test/blog",
+    ]
+    ranks = [link_rank(url, anchor) for url, anchor in links]
+    assert ranks[1] < ranks[0] < ranks[2]
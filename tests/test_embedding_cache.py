@@ -0,0 +1,151 @@
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # writer locks live under cache/locks
+
+
+class CountingEncoder:
+    """
+    Deterministic fake model that records which texts it was asked to encode.
+    """
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        rows = [np.random.default_rng(sum(map(ord, t))).standard_normal(self.dim) for t in texts]
+        return np.array(rows, dtype="float32")
+
+
+def test_hits_skip_encoding_and_match_misses(tmp_path):
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path))
+    encoder = CountingEncoder()
+
+    first = cache.encode(["alpha", "beta", "alpha"], encoder)
+    assert encoder.calls == [["alpha", "beta"]]
+    assert first.dtype == np.float32 and first.shape == (3, 8)
+    assert np.array_equal(first[0], first[2])
+
+    second = cache.encode(["beta", "gamma", "alpha"], encoder)
+    assert encoder.calls[1] == ["gamma"]
+    assert np.array_equal(second[0], first[1])
+    assert np.array_equal(second[2], first[0])
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 4
+
+
+def test_cache_persists_across_instances(tmp_path):
+    encoder = CountingEncoder()
+    texts = [f"chunk {i}" for i in range(50)]
+    expected = EmbeddingCache("test-model", cache_dir=str(tmp_path)).encode(texts, encoder)
+
+    reopened = EmbeddingCache("test-model", cache_dir=str(tmp_path))
+    assert np.array_equal(reopened.encode(texts, encoder), expected)
+    assert len(encoder.calls) == 1
+    assert reopened.stats()["hit_rate"] == 1.0
+
+    # Vectors are model specific
+    EmbeddingCache("other-model", cache_dir=str(tmp_path)).encode(texts[:1], encoder)
+    assert len(encoder.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=3)
+    encoder = CountingEncoder()
+    cache.encode(["a", "b", "c"], encoder)
+    cache.encode(["a"], encoder)           # "b" is now the oldest
+    cache.encode(["d"], encoder)
+
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["evictions"] == 1
+    cache.encode(["a", "c", "d"], encoder)
+    assert len(encoder.calls) == 2
+    cache.encode(["b"], encoder)
+    assert encoder.calls[-1] == ["b"]
+
+
+def test_filling_the_last_free_slots_evicts_only_older_rows(tmp_path):
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=10)
+    encoder = CountingEncoder()
+    cache.encode([f"t{i}" for i in range(8)], encoder)
+    batch = [f"t{i}" for i in range(100, 105)]
+    first = cache.encode(batch, encoder)
+
+    assert np.array_equal(cache.encode(batch, encoder), first)
+    assert len(encoder.calls) == 2
+    assert cache.stats()["entries"] == 10
+    assert cache.stats()["evictions"] == 3
+
+
+def test_instances_sharing_the_files_see_each_others_writes(tmp_path):
+    encoder = CountingEncoder()
+    app = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=6)
+    ingest = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=6)
+    app.encode(["a", "b", "c"], encoder)
+    ingest.encode(["a", "d", "e", "f", "g"], encoder)  # reuses "a", evicts the oldest row
+    assert encoder.calls[1] == ["d", "e", "f", "g"]
+
+    expected = CountingEncoder()(["a", "d", "g"]).astype("float16").astype("float32")
+    assert np.array_equal(app.encode(["a", "d", "g"], encoder), expected)
+    assert len(encoder.calls) == 2
+    assert app.stats()["entries"] == 6
+
+
+def test_a_crash_while_overwriting_evicted_rows_does_not_mix_up_vectors(tmp_path, monkeypatch):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=2)
+    expected = cache.encode(["a", "b"], encoder)
+    put = cache._put
+
+    def put_then_crash(keys, vectors):
+        put(keys, vectors)
+        raise RuntimeError("killed before the index was written")
+
+    monkeypatch.setattr(cache, "_put", put_then_crash)
+    with pytest.raises(RuntimeError):
+        cache.encode(["c", "d"], encoder)
+
+    restarted = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=2)
+    assert np.array_equal(restarted.encode(["a", "b"], encoder), expected)
+
+
+def test_growth_keeps_existing_vectors(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.embedding_cache.INITIAL_CAPACITY", 4)
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path), max_entries=100)
+    encoder = CountingEncoder()
+    small = cache.encode(["one", "two"], encoder)
+    cache.encode([f"text {i}" for i in range(20)], encoder)
+
+    assert len(cache.keys) >= 22
+    assert np.array_equal(cache.encode(["one", "two"], encoder), small)
+    assert len(encoder.calls) == 2
+
+
+def test_float32_storage_is_lossless(tmp_path):
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path), dtype="float32")
+    encoder = CountingEncoder()
+    vectors = cache.encode(["exact"], encoder)
+    assert np.array_equal(vectors, CountingEncoder()(["exact"]))
+
+
+def test_query_cache_encodes_each_query_once():
+    cache = QueryEmbeddingCache(max_entries=2)
+    encoder = CountingEncoder()
+    first = cache.encode(["mission", "pricing", "mission"], encoder)
+    assert encoder.calls == [["mission", "pricing"]]
+    assert np.array_equal(first[0], first[2])
+
+    assert np.array_equal(cache.encode(["pricing"], encoder)[0], first[1])
+    cache.encode(["services"], encoder)      # evicts "mission"
+    cache.encode(["mission", "pricing"], encoder)
+    assert encoder.calls[1:] == [["services"], ["mission"]]
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 5}
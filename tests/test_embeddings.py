@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.embeddings import BatchingEncoder, EmbeddingBackend, backend_cache_name, encode_bucketed, estimate_tokens, plan_batches
+
+
+class LengthBackend(EmbeddingBackend):
+    name = "fake"
+
+    def __init__(self):
+        self.batches = []
+
+    def encode_batch(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_plan_batches_groups_similar_lengths_within_the_token_budget():
+    texts = ["x" * n for n in [10, 900, 20, 1000, 15, 950, 12, 30]]
+    batches = plan_batches(texts, token_budget=600, max_batch=3)
+    tokens = estimate_tokens(texts)
+
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(texts)))
+    assert [texts[i] for i in batches[0]][0] == "x" * 1000  # longest first
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or len(batch) * tokens[batch].max() <= 600
+
+
+def test_encode_bucketed_returns_rows_in_input_order():
+    backend = LengthBackend()
+    texts = ["x" * n for n in [5, 700, 40, 300, 1]]
+    vectors = encode_bucketed(backend.encode_batch, texts, token_budget=200, max_batch=2)
+    assert vectors[:, 0].tolist() == [5, 700, 40, 300, 1]
+    assert len(backend.batches) > 1
+    assert encode_bucketed(backend.encode_batch, []).shape == (0, 0)
+
+
+def test_concurrent_requests_share_forward_passes():
+    backend = LengthBackend()
+    encoder = BatchingEncoder(backend, wait_sec=0.2, max_batch=64)
+    start, results = threading.Barrier(8), {}
+
+    def caller(i):
+        start.wait()
+        results[i] = encoder.encode(["y" * (i + 1), "z" * (10 * i + 1)])
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert encoder.requests == 8
+    assert encoder.passes < 8
+    for i, vectors in results.items():
+        assert vectors[:, 0].tolist() == [i + 1, 10 * i + 1]
+
+
+def test_backend_errors_reach_every_waiting_caller():
+    class Broken(EmbeddingBackend):
+        def encode_batch(self, texts):
+            raise RuntimeError("model crashed")
+
+    encoder = BatchingEncoder(Broken(), wait_sec=0)
+    with pytest.raises(RuntimeError):
+        encoder.encode(["a"])
+    with pytest.raises(RuntimeError):
+        encoder.encode(["b"])
+
+
+def test_encode_applies_supported_options_and_rejects_others():
+    encoder = BatchingEncoder(LengthBackend(), wait_sec=0)
+    vectors = encoder.encode(["abc", "abcd"], batch_size=32, normalize_embeddings=True, show_progress_bar=False)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.allclose(vectors[0], np.array([3.0, 1.0]) / np.sqrt(10))
+    with pytest.raises(TypeError):
+        encoder.encode(["abc"], precision="int8")
+    with pytest.raises(TypeError):
+        EmbeddingBackend()  # encode_batch is abstract
+
+
+def test_quantized_backends_do_not_share_the_reference_cache():
+    assert backend_cache_name("torch") == "all-MiniLM-L6-v2"
+    assert backend_cache_name("onnx-int8") == "all-MiniLM-L6-v2+onnx-int8"
+    with pytest.raises(ValueError):
+        backend_cache_name("tensorrt")
@@ -0,0 +1,65 @@
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.fusion import fuse, fuse_candidates, sparse_candidates, top_candidates
+
+# Dense row from FAISS: chunk 2 is nearest, then 0, then 5; padded with -1
+DENSE_IDS = np.array([2, 0, 5, -1])
+DENSE_SIM = np.array([0.9, 0.6, 0.2, -3.4e38], dtype="float32")
+# BM25 favours chunk 4, then 0; chunks 1, 3 and 6 have no term overlap
+SPARSE = np.array([3.0, 0.0, 1.0, 0.0, 9.0, 0.5, 0.0])
+
+
+def test_dense_and_sparse_only():
+    assert fuse(DENSE_IDS, DENSE_SIM, SPARSE, 3, strategy="dense").tolist() == [2, 0, 5]
+    assert fuse(DENSE_IDS, DENSE_SIM, SPARSE, 3, strategy="sparse").tolist() == [4, 0, 2]
+    # Chunks with a zero BM25 score are never returned as sparse hits
+    assert fuse(None, None, SPARSE, 10, strategy="sparse").tolist() == [4, 0, 2, 5]
+
+
+def test_weighted_normalises_both_sides():
+    # Unnormalised BM25 (9.0) would swamp the dense similarities
+    hits = fuse(DENSE_IDS, DENSE_SIM, SPARSE, 5, strategy="weighted", mix_ratio=0.5)
+    assert hits[0] in (0, 2)
+    assert set(hits.tolist()) == {0, 2, 4, 5}
+    assert fuse(DENSE_IDS, DENSE_SIM, SPARSE, 1, strategy="weighted", mix_ratio=1.0).tolist() == [2]
+    assert fuse(DENSE_IDS, DENSE_SIM, SPARSE, 1, strategy="weighted", mix_ratio=0.0).tolist() == [4]
+
+
+def test_reciprocal_rank_fusion():
+    hits = fuse(DENSE_IDS, DENSE_SIM, SPARSE, 3, strategy="rrf")
+    # 0 and 2 are ranked by both retrievers
+    assert sorted(hits[:2].tolist()) == [0, 2]
+
+
+def test_pool_limits_candidates_from_each_side():
+    hits = fuse(DENSE_IDS, DENSE_SIM, SPARSE, 10, strategy="weighted", pool=1)
+    assert sorted(hits.tolist()) == [2, 4]
+
+
+def test_sparse_candidates_break_ties_by_position():
+    scores = np.array([1.0, 2.0, 2.0, 0.0, 2.0])
+    assert sparse_candidates(scores, 2).tolist() == [1, 2]
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        fuse(DENSE_IDS, DENSE_SIM, SPARSE, 3, strategy="magic")
+
+
+def test_fuse_candidates_matches_fuse_on_arbitrary_keys():
+    expected = fuse(DENSE_IDS, DENSE_SIM, SPARSE, 3, strategy="rrf")
+    sparse = sparse_candidates(SPARSE, 12)
+    # Offset keys, as the global index does for shard + position
+    offset = 7 << 32
+    dense_keys, similarity = top_candidates(DENSE_IDS[:3] + offset, DENSE_SIM[:3], 12)
+    hits = fuse_candidates(dense_keys, similarity, sparse + offset, SPARSE[sparse], 3, strategy="rrf")
+    assert (hits - offset).tolist() == expected.tolist()
+
+
+def test_top_candidates_keeps_best_pool():
+    keys, values = top_candidates(np.array([5, 3, 9, 1]), np.array([0.2, 0.8, 0.8, 0.1]), 2)
+    assert keys.tolist() == [3, 9]
+    assert values.tolist() == [0.8, 0.8]
@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("sentence_transformers")
+import src.global_index as global_index
+import src.vectorstore as vectorstore
+from src.embedding_cache import QueryEmbeddingCache
+from src.global_index import GlobalIndex
+from src.vectorstore import persist_chunks_to_vectorstore
+
+WORDS = ["banking", "pricing", "contact", "hiring", "cloud", "mission"]
+
+CORPUS = {
+    "https://alpha.test": ["Investment banking advisory for mid-market firms", "Contact our alpha team"],
+    "https://beta.test": ["Cloud hosting pricing per month", "Investment banking and M&A services"],
+    "https://gamma.test": ["We are hiring engineers", "Our mission is clean energy"],
+}
+
+
+def fake_vectors(texts):
+    # Bag of keywords, so dense similarity follows the topic
+    vectors = np.array([[t.lower().count(w) for w in WORDS] + [0.1] for t in texts], dtype="float32")
+    return vectors
+
+
+@pytest.fixture
+def ingested(tmp_path, monkeypatch):
+    """
+    Per-domain vectorstores for CORPUS in a temp dir, with a fake model.
+    """
+    encoded = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vectorstore.embedding_model, "encode", fake_vectors, raising=False)
+    monkeypatch.setattr(vectorstore, "encode_chunks", fake_vectors)
+    monkeypatch.setattr(global_index, "encode_chunks", lambda texts: encoded.append(list(texts)) or fake_vectors(texts))
+    monkeypatch.setattr(global_index, "query_embedding_cache", QueryEmbeddingCache())
+    for domain, texts in CORPUS.items():
+        persist_chunks_to_vectorstore([{"tag": "Other", "text": t} for t in texts], domain)
+    return encoded
+
+
+def test_search_everything_and_within_domains(ingested):
+    index = GlobalIndex()
+    counts = index.add_domains(list(CORPUS) + ["https://missing.test"])
+    assert counts == {"added": 3, "unchanged": 0, "missing": 1, "vectors": 6}
+
+    hits = GlobalIndex().search("investment banking", top_k=2)
+    assert {h["domain"] for h in hits} == {"https://alpha.test", "https://beta.test"}
+    assert all("banking" in h["text"] for h in hits)
+
+    hits = GlobalIndex().search("investment banking", top_k=2, domains=["https://beta.test"])
+    assert hits[0] == {"domain": "https://beta.test", "domain_id": 1, "text": "Investment banking and M&A services"}
+    assert all(h["domain"] == "https://beta.test" for h in hits)
+
+    assert GlobalIndex().search("banking", domains=["https://unknown.test"]) == []
+
+
+def test_readd_skips_unchanged_and_replaces_changed(ingested):
+    index = GlobalIndex()
+    index.add_domains(CORPUS)
+    assert index.add_domains(CORPUS)["unchanged"] == 3
+    assert len(ingested) == 1
+
+    persist_chunks_to_vectorstore([{"tag": "Other", "text": "Retail pricing consultancy"}], "https://alpha.test")
+    counts = index.add_domains(CORPUS)
+    assert counts["added"] == 1 and counts["unchanged"] == 2
+    # The partly filled last shard is rewritten with the new rows
+    assert len(index.manifest["shards"]) == 1
+
+    hits = GlobalIndex().search("banking", top_k=5, strategy="sparse")
+    assert [h["domain"] for h in hits] == ["https://beta.test"]
+    alpha = GlobalIndex().search("pricing", top_k=5, domains=["https://alpha.test"])
+    assert [h["text"] for h in alpha] == ["Retail pricing consultancy"]
+
+
+def test_stale_rows_masked_across_shards_until_compact(ingested, monkeypatch):
+    monkeypatch.setattr(global_index, "SHARD_SIZE", 2)
+    monkeypatch.setattr(global_index, "RETIRED_SHARD_GRACE_SEC", 0)
+    index = GlobalIndex()
+    index.add_domains(CORPUS)
+    assert [s["vectors"] for s in index.manifest["shards"]] == [2, 2, 2]
+
+    index.remove_domains(["https://alpha.test"])
+    hits = GlobalIndex().search("banking contact", top_k=6)
+    assert "https://alpha.test" not in {h["domain"] for h in hits}
+    assert GlobalIndex().domains() == ["https://beta.test", "https://gamma.test"]
+
+    assert index.compact() == {"before": 6, "after": 4, "shards": 2}
+    reopened = GlobalIndex()
+    assert sorted(h["text"] for h in reopened.search("banking contact hiring mission cloud", top_k=6)) == sorted(
+        CORPUS["https://beta.test"] + CORPUS["https://gamma.test"])
+    assert sorted(os.listdir(global_index.GLOBAL_INDEX_DIR)) == ["manifest.json", "shard_00003", "shard_00004"]
+
+
+def test_cross_shard_ranking_matches_single_shard(ingested, monkeypatch):
+    single = GlobalIndex(os.path.join("cache", "single"))
+    single.add_domains(CORPUS)
+    monkeypatch.setattr(global_index, "SHARD_SIZE", 2)
+    sharded = GlobalIndex(os.path.join("cache", "sharded"))
+    sharded.add_domains(CORPUS)
+
+    for query in ["investment banking services", "cloud pricing", "hiring mission"]:
+        for strategy in ("dense", "sparse", "weighted"):
+            expected = single.search(query, top_k=3, strategy=strategy)
+            assert sharded.search(query, top_k=3, strategy=strategy) == expected
+
+
+def test_searches_keep_working_across_a_concurrent_add(ingested, monkeypatch):
+    monkeypatch.setattr(global_index, "SHARD_SIZE", 4)
+    GlobalIndex().add_domains(CORPUS)
+    reader = GlobalIndex()
+    stale = [s["id"] for s in reader.manifest["shards"]]
+    assert reader.search("hiring", top_k=1)[0]["domain"] == "https://gamma.test"
+
+    errors, done = [], threading.Event()
+
+    def search_loop():
+        while not done.is_set():
+            try:
+                GlobalIndex().search("pricing", top_k=3)
+                reader.search("pricing", top_k=3)
+            except Exception as e:
+                errors.append(e)
+
+    searcher = threading.Thread(target=search_loop)
+    searcher.start()
+    try:
+        for i in range(3):
+            persist_chunks_to_vectorstore([{"tag": "Other", "text": f"Retail pricing consultancy {i}"}], "https://alpha.test")
+            GlobalIndex().add_domains(CORPUS)  # rewrites the partly filled tail shard
+    finally:
+        done.set()
+        searcher.join()
+
+    assert errors == []
+    # The reader sees the new manifest; the shards it started on are still there
+    assert [h["text"] for h in reader.search("pricing", top_k=1, domains=["https://alpha.test"])] == ["Retail pricing consultancy 2"]
+    assert all(os.path.isdir(reader.shard_path(shard_id)) for shard_id in stale)
+
+    monkeypatch.setattr(global_index, "RETIRED_SHARD_GRACE_SEC", 0)
+    GlobalIndex().compact()
+    assert sorted(os.listdir(global_index.GLOBAL_INDEX_DIR)) == ["manifest.json"] + [
+        os.path.basename(reader.shard_path(s["id"])) for s in GlobalIndex().manifest["shards"]]
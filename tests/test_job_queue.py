@@ -0,0 +1,121 @@
+import os
+import sys
+import threading
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import job_queue
+from src.job_queue import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue, WorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def wait_for(queue, job_id, states, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["state"] in states:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {queue.get(job_id)['state']}")
+
+
+def test_jobs_move_through_their_states_and_persist(queue):
+    first = queue.enqueue("insert_domain", {"domain": "acme.test"}, owner="session-a")
+    second = queue.enqueue("generate_insight", {"domain": "acme.test", "task": "Services?"}, owner="session-b")
+
+    job = queue.claim("worker-1")
+    assert (job["id"], job["state"], job["attempts"]) == (first, RUNNING, 1)
+    assert queue.progress(first, 0.5, "Scraping") is False
+    assert (queue.get(first)["progress"], queue.get(first)["message"]) == (0.5, "Scraping")
+
+    queue.finish(first, {"domain": "acme.test"})
+    reopened = JobQueue(queue.path)  # e.g. after a server restart
+    assert reopened.get(first)["state"] == DONE
+    assert reopened.get(first)["result"] == {"domain": "acme.test"}
+    assert [j["id"] for j in reopened.list(owner="session-b", states=[QUEUED])] == [second]
+
+
+def test_queued_jobs_cancel_at_once_and_running_ones_at_a_checkpoint(queue):
+    running = queue.enqueue("generate_insights", {"domains": [], "tasks": []})
+    queued = queue.enqueue("generate_insights", {"domains": [], "tasks": []})
+    queue.claim("worker-1")
+
+    assert queue.cancel(queued) and queue.get(queued)["state"] == CANCELLED
+    assert queue.cancel(running) and queue.get(running)["state"] == RUNNING
+    assert queue.progress(running, 0.2) is True
+    queue.mark_cancelled(running)
+    assert queue.get(running)["state"] == CANCELLED
+    assert queue.cancel(running) is False
+    assert queue.claim("worker-1") is None
+
+
+def test_jobs_of_a_stopped_worker_are_requeued_then_failed(tmp_path):
+    now = [1000.0]
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), clock=lambda: now[0])
+    job_id = queue.enqueue("insert_domain", {"domain": "acme.test"})
+
+    for attempt in range(1, job_queue.MAX_ATTEMPTS + 1):
+        assert queue.claim("worker-1")["attempts"] == attempt
+        now[0] += 30
+        queue.heartbeat([job_id])
+        assert queue.requeue_orphans(stale_sec=60) == 0  # still alive
+        now[0] += 61
+        queue.requeue_orphans(stale_sec=60)
+
+    job = queue.get(job_id)
+    assert job["state"] == FAILED
+    assert job["error"] == "Worker stopped responding"
+
+
+def test_a_requeued_job_starts_without_the_previous_attempts_results(tmp_path):
+    now = [1000.0]
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), clock=lambda: now[0])
+    job_id = queue.enqueue("generate_insights", {"domains": ["a.test", "b.test"], "tasks": ["Services?"]})
+    queue.claim("worker-1")
+    queue.progress(job_id, 0.5, "1/2 insights", partial={"results": [{"domain": "b.test"}]})
+
+    now[0] += job_queue.STALE_SEC + 1  # the server restarted mid-run
+    assert queue.requeue_orphans() == 1
+    assert (queue.get(job_id)["result"], queue.get(job_id)["progress"]) == (None, 0)
+    queue.claim("worker-2")
+    assert queue.get(job_id)["result"] is None
+
+
+def test_worker_pool_runs_handlers_and_records_failures_and_cancellation(queue):
+    release = threading.Event()
+
+    def slow(params, job):
+        while not release.wait(0.01):
+            job.progress(0.5, "waiting", partial={"results": ["first"]})
+            job.check_cancelled()
+        return {"results": ["first", "second"]}
+
+    handlers = {
+        "echo": lambda params, job: {"echo": params["value"]},
+        "broken": lambda params, job: 1 / 0,
+        "slow": slow,
+    }
+    pool = WorkerPool(queue, handlers, workers=2, poll_sec=0.01).start()
+    try:
+        echo = queue.enqueue("echo", {"value": 42})
+        broken = queue.enqueue("broken", {})
+        assert wait_for(queue, echo, [DONE])["result"] == {"echo": 42}
+        assert "division by zero" in wait_for(queue, broken, [FAILED])["error"]
+
+        cancelled = queue.enqueue("slow", {})
+        while queue.get(cancelled)["result"] is None:
+            time.sleep(0.01)
+        queue.cancel(cancelled)
+        job = wait_for(queue, cancelled, [CANCELLED])
+        assert job["result"] == {"results": ["first"]}  # partial results are kept
+
+        finished = queue.enqueue("slow", {})
+        release.set()
+        assert wait_for(queue, finished, [DONE])["progress"] == 1.0
+    finally:
+        release.set()
+        pool.stop(timeout=5)
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import llm
+from src.llm_backends import LocalBackend, create_backend
+from src.llm_cache import LLMResponseCache
+from src.llm_client import LLMError
+
+
+class EchoModel:
+    """
+    Stand-in for a seq2seq model: answers each prompt upper-cased and
+    records the batches it was given.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, prompts, max_length, min_length):
+        self.batches.append((list(prompts), max_length))
+        return [prompt.upper()[:max_length] for prompt in prompts]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def run_concurrently(fn, n):
+    start, results = threading.Barrier(n), {}
+
+    def call(i):
+        start.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_prompts_are_generated_in_shared_batches():
+    model = EchoModel()
+    backend = LocalBackend("stub", max_batch=4, max_wait_sec=0.2, generate_batch=model)
+    results = run_concurrently(lambda i: backend.generate(f"task {i}", 120, 30), 8)
+
+    assert results == {i: f"TASK {i}" for i in range(8)}
+    assert backend.requests == 8
+    assert len(model.batches) < 8
+    assert all(len(prompts) <= 4 for prompts, _ in model.batches)
+
+
+def test_prompts_with_different_parameters_are_not_mixed():
+    model = EchoModel()
+    backend = LocalBackend("stub", max_batch=8, max_wait_sec=0.2, generate_batch=model)
+    results = run_concurrently(lambda i: backend.generate("abcdef", 3 if i % 2 else 120, 1), 4)
+
+    assert results == {0: "ABCDEF", 1: "ABC", 2: "ABCDEF", 3: "ABC"}
+    assert sorted(max_length for _, max_length in model.batches) == [3, 120]
+
+
+def test_local_failures_surface_as_llm_errors():
+    def broken(prompts, max_length, min_length):
+        raise RuntimeError("out of memory")
+
+    backend = LocalBackend("stub", max_wait_sec=0, generate_batch=broken)
+    with pytest.raises(LLMError, match="out of memory"):
+        backend.generate("prompt", 120, 30)
+
+
+def test_query_llm_uses_the_selected_backend(monkeypatch):
+    monkeypatch.setattr(llm, "llm_backend", LocalBackend("stub", max_wait_sec=0, generate_batch=EchoModel()))
+    monkeypatch.setattr(llm, "llm_cache", LLMResponseCache())
+    assert llm.query_llm("what services?") == "WHAT SERVICES?"
+    assert llm.llm_cache.stats()["misses"] == 1
+
+    with pytest.raises(ValueError):
+        create_backend("grpc")
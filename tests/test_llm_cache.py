@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import llm
+from src.llm_cache import LLMResponseCache, response_key
+from src.llm_client import LLMError
+from src.utils import get_bundle_path
+
+MODEL = "google/flan-t5-large"
+PARAMS = {"max_length": 120, "min_length": 30, "do_sample": False}
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def publish_bundle(domain, data):
+    with open(get_bundle_path(domain), "wb") as f:
+        f.write(data)
+
+
+def test_answers_are_cached_by_model_params_and_normalized_prompt():
+    cache = LLMResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return f"answer {len(calls)}"
+
+    assert cache.get_or_compute("Task:\nservices  \n\n\n", compute, MODEL, PARAMS) == "answer 1"
+    assert cache.get_or_compute("Task: \nservices", compute, MODEL, PARAMS) == "answer 1"
+    assert cache.get_or_compute("Task:\nservices", compute, MODEL, {**PARAMS, "max_length": 60}) == "answer 2"
+    assert cache.get_or_compute("Task:\nservices", compute, "google/flan-t5-base", PARAMS) == "answer 3"
+    assert LLMResponseCache().get_or_compute("Task:\nservices", compute, MODEL, PARAMS) == "answer 1"  # persisted
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+
+
+def test_reingesting_a_domain_invalidates_its_answers():
+    cache = LLMResponseCache()
+    publish_bundle("acme.test", b"v1")
+    assert cache.get_or_compute("prompt", lambda: "old", MODEL, PARAMS, domain="acme.test") == "old"
+    assert cache.get_or_compute("prompt", lambda: "unused", MODEL, PARAMS, domain="acme.test") == "old"
+
+    time.sleep(0.01)
+    publish_bundle("acme.test", b"version 2")
+    assert cache.get_or_compute("prompt", lambda: "new", MODEL, PARAMS, domain="acme.test") == "new"
+    assert cache.invalidated == 1
+
+    assert cache.invalidate("acme.test") == 1
+    assert cache.get(response_key("prompt", MODEL, PARAMS), "acme.test") is None
+
+
+def test_an_answer_computed_across_a_reingest_is_not_served():
+    cache = LLMResponseCache()
+    publish_bundle("acme.test", b"v1")
+
+    def compute():
+        time.sleep(0.01)
+        publish_bundle("acme.test", b"version 2")  # re-ingested while the LLM was answering
+        return "built from v1"
+
+    assert cache.get_or_compute("prompt", compute, MODEL, PARAMS, domain="acme.test") == "built from v1"
+    assert cache.get_or_compute("prompt", lambda: "built from v2", MODEL, PARAMS, domain="acme.test") == "built from v2"
+
+
+def test_entries_expire_and_the_cache_stays_under_its_size_limit():
+    now = [1000.0]
+    cache = LLMResponseCache(ttl_sec=60, max_bytes=2000, clock=lambda: now[0])
+    cache.get_or_compute("first", lambda: "x" * 300, MODEL)
+    now[0] += 61
+    assert cache.get_or_compute("first", lambda: "refreshed", MODEL) == "refreshed"
+    assert cache.expired == 1
+
+    for i in range(20):
+        cache.get_or_compute(f"prompt {i}", lambda: "y" * 300, MODEL)
+    assert cache.total_bytes() <= 2000
+    assert cache.evictions > 0
+    assert cache.get(response_key("prompt 19", MODEL)) is not None
+
+
+def test_identical_prompts_in_flight_reach_the_model_once():
+    cache = LLMResponseCache()
+    calls, results = [], []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(1)
+        return "shared answer"
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("prompt", compute, MODEL))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while cache.stats()["shared_in_flight"] < 4:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == ["shared answer"] * 5
+
+
+def test_query_llm_does_not_cache_failures(monkeypatch):
+    class FlakyBackend:
+        cache_name = MODEL
+
+        def __init__(self):
+            self.calls = 0
+
+        def generate(self, prompt, max_length, min_length):
+            self.calls += 1
+            if self.calls == 1:
+                raise LLMError("HTTP 503")
+            return "Advisory services."
+
+    backend = FlakyBackend()
+    monkeypatch.setattr(llm, "llm_backend", backend)
+    monkeypatch.setattr(llm, "llm_cache", LLMResponseCache())
+    assert llm.query_llm("What services?", domain="acme.test").startswith("[Error]")
+    assert llm.query_llm("What services?", domain="acme.test") == "Advisory services."
+    assert llm.query_llm("What services?", domain="acme.test") == "Advisory services."
+    assert backend.calls == 2
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import llm
+from src.llm_backends import HTTPBackend
+from src.llm_client import CircuitBreaker, CircuitOpenError, LLMClient, LLMError
+
+
+class StubServer:
+    """
+    Local inference endpoint that answers from a script of
+    (status, body, headers) responses, then repeats the last one.
+    """
+
+    def __init__(self, script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.requests = []
+        self.active = self.peak = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with lock:
+                    stub.requests.append(body)
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                    status, payload, headers = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                time.sleep(stub.delay)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with lock:
+                    stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/models/flan-t5"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+OK = (200, [{"generated_text": " Advisory and M&A services. "}], {})
+LOADING = (503, {"error": "Model google/flan-t5-large is currently loading", "estimated_time": 7.5}, {})
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(script, delay=0.0):
+        servers.append(StubServer(script, delay))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_retries_honour_retry_after_and_model_loading(stub):
+    server = stub([LOADING, (429, {"error": "rate limited"}, {"Retry-After": "2"}), OK])
+    waits = []
+    client = LLMClient(server.url, sleep=waits.append)
+
+    assert client.post({"inputs": "x"}) == OK[1]
+    assert waits == [7.5, 2.0]
+    assert len(server.requests) == 3
+    assert client.breaker.state == "closed"
+
+
+def test_rejected_requests_are_not_retried(stub):
+    server = stub([(401, {"error": "Invalid credentials"}, {}), OK])
+    client = LLMClient(server.url, sleep=lambda s: pytest.fail("must not retry"))
+    with pytest.raises(LLMError, match="401"):
+        client.post({"inputs": "x"})
+    assert len(server.requests) == 1
+
+
+def test_concurrency_is_limited_without_serialising(stub):
+    server = stub([OK], delay=0.1)
+    client = LLMClient(server.url, max_concurrency=3)
+    threads = [threading.Thread(target=client.post, args=({"inputs": str(i)},)) for i in range(9)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.peak == 3
+    assert time.perf_counter() - start < 0.6  # 3 waves, not 9 serial calls
+    assert client.stats["calls"] == client.stats["attempts"] == 9
+
+
+def test_circuit_opens_after_failures_and_recovers(stub):
+    now = [0.0]
+    server = stub([(500, {"error": "boom"}, {})] * 4 + [OK])
+    breaker = CircuitBreaker(failures=3, reset_sec=30, clock=lambda: now[0])
+    client = LLMClient(server.url, max_attempts=2, breaker=breaker, sleep=lambda s: None, clock=lambda: now[0])
+
+    with pytest.raises(LLMError):
+        client.post({"inputs": "x"})
+    with pytest.raises(CircuitOpenError):
+        client.post({"inputs": "x"})
+    assert len(server.requests) == 3
+    assert breaker.state == "open"
+
+    now[0] = 31.0  # half-open: one trial, which fails and re-opens
+    with pytest.raises(CircuitOpenError):
+        client.post({"inputs": "x"})
+    assert len(server.requests) == 4
+
+    now[0] = 62.0
+    assert client.post({"inputs": "x"}) == OK[1]
+    assert breaker.state == "closed"
+
+
+def test_query_llm_parses_answers_and_reports_failures(stub, monkeypatch):
+    server = stub([OK])
+    monkeypatch.setattr(llm, "llm_backend", HTTPBackend(client=LLMClient(server.url)))
+    assert llm.query_llm("What services?", use_cache=False) == "Advisory and M&A services."
+    assert server.requests[0]["parameters"]["max_length"] == 120
+
+    failing = stub([(400, {"error": "bad input"}, {})])
+    monkeypatch.setattr(llm, "llm_backend", HTTPBackend(client=LLMClient(failing.url)))
+    assert llm.query_llm("What services?", use_cache=False).startswith("[Error]")
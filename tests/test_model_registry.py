@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.model_registry import LazyModel, ModelRegistry
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY = ["faiss", "cloudscraper", "sentence_transformers", "torch", "transformers"]
+
+
+class Model:
+    def encode(self, texts):
+        return [len(t) for t in texts]
+
+
+def test_model_loads_once_on_first_use():
+    loads = []
+
+    def loader():
+        time.sleep(0.05)
+        loads.append(1)
+        return Model()
+
+    model = LazyModel("fake", loader)
+    assert not model.loaded
+    threads = [threading.Thread(target=lambda: model.encode(["ab"])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == [1]
+    assert model.encode(["abc"]) == [3]
+    assert model.load_seconds >= 0.05
+
+
+def test_attributes_set_on_the_stand_in_win():
+    model = LazyModel("fake", lambda: (_ for _ in ()).throw(AssertionError("must not load")))
+    model.encode = lambda texts: ["stub"]
+    assert model.encode(["x"]) == ["stub"]
+    assert not model.loaded
+
+
+def test_warm_up_loads_in_the_background_and_reports_failures():
+    registry = ModelRegistry()
+    good = registry.register("good", Model)
+    registry.register("broken", lambda: 1 / 0)
+    registry.warm_up().join(5)
+    assert good.loaded
+    assert registry.stats()["broken"]["loaded"] is False
+
+
+def test_importing_the_app_modules_defers_heavy_dependencies():
+    script = (
+        "import json, sys\n"
+        "import src.rag_runner, src.domain_inserter, src.bulk_ingest, src.global_index, src.cache_manager, src.job_queue\n"
+        "from src.model_registry import is_loaded\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if is_loaded(m)]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
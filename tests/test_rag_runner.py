@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import rag_runner
+from src.embedding_cache import QueryEmbeddingCache
+
+TASKS = ["What services do they offer?", "Where are they located?"]
+
+
+class FakeRetriever:
+    def __init__(self, domain):
+        self.domain = domain
+
+    def search_chunks_many(self, queries, top_k=5, tags=None):
+        # Retrieval must reuse the task embeddings encoded up front
+        rag_runner.query_embedding_cache.encode(queries, rag_runner.embedding_model.encode)
+        return [[{"tag": "Services", "title": "", "text": f"{self.domain} answers {query}"}] for query in queries]
+
+
+@pytest.fixture
+def fanout(monkeypatch):
+    encoded, active, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def encode(texts):
+        encoded.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def get_retriever(domain):
+        if domain.startswith("broken"):
+            raise FileNotFoundError(f"No cache for {domain}")
+        return FakeRetriever(domain)
+
+    def query_llm(prompt, domain=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return "[Error] HTTP 503" if domain == "flaky.test" else f"answer from {domain}"
+
+    monkeypatch.setattr(rag_runner, "embedding_model", SimpleNamespace(encode=encode))
+    monkeypatch.setattr(rag_runner, "query_embedding_cache", QueryEmbeddingCache())
+    monkeypatch.setattr(rag_runner, "get_retriever", get_retriever)
+    monkeypatch.setattr(rag_runner, "build_llm2_prompt", lambda task, chunks: f"{task}\n{chunks[0]['text']}")
+    monkeypatch.setattr(rag_runner, "query_llm", query_llm)
+    return encoded, peak
+
+
+def test_tasks_run_on_every_domain_with_each_task_encoded_once(fanout):
+    encoded, peak = fanout
+    domains = [f"lead{i}.test" for i in range(12)]
+    streamed = []
+    results = rag_runner.generate_insights(domains, TASKS, on_result=streamed.append, llm_workers=4)
+
+    assert encoded == [TASKS]
+    assert [(r.domain, r.task) for r in results] == [(d, t) for d in domains for t in TASKS]
+    assert all(r.ok and r.output == f"answer from {r.domain}" for r in results)
+    assert len(streamed) == len(results)
+    assert 1 < peak[0] <= 4
+
+
+def test_failures_are_recorded_per_domain_without_aborting(fanout):
+    results = rag_runner.generate_insights(["lead.test", "broken.test", "flaky.test"], TASKS)
+    by_domain = {}
+    for r in results:
+        by_domain.setdefault(r.domain, []).append(r)
+
+    assert [r.ok for r in by_domain["lead.test"]] == [True, True]
+    assert [r.ok for r in by_domain["broken.test"]] == [False, False]
+    assert "No cache for broken.test" in by_domain["broken.test"][0].output
+    assert [r.ok for r in by_domain["flaky.test"]] == [False, False]
+
+
+def test_cli_writes_a_csv(fanout, tmp_path):
+    domains_file = tmp_path / "domains.txt"
+    domains_file.write_text("lead.test\nbroken.test\n")
+    out = tmp_path / "insights.csv"
+    code = rag_runner.main([str(domains_file), "--task", TASKS[0], "--out", str(out)])
+
+    lines = out.read_text().splitlines()
+    assert code == 1
+    assert lines[0] == "domain,task,output,ok"
+    assert len(lines) == 3
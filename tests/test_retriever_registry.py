@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.retriever_registry import RetrieverRegistry
+from src.utils import get_bundle_path, get_cache_paths
+
+
+class SlowLoader:
+    """
+    Stand-in for HybridRetriever that counts loads per domain.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.loads = []
+
+    def __call__(self, domain):
+        time.sleep(self.delay)
+        self.loads.append(domain)
+        return {"domain": domain, "load": len(self.loads)}
+
+
+def write_index(domain: str, size: int = 300):
+    with open(get_bundle_path(domain), "wb") as f:
+        f.write(b"x" * size)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_hits_reuse_loaded_retriever():
+    write_index("https://a.test")
+    loader = SlowLoader()
+    registry = RetrieverRegistry(loader=loader)
+
+    first = registry.get("https://a.test")
+    assert registry.get("https://a.test") is first
+    assert loader.loads == ["https://a.test"]
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, 300)
+
+
+def test_reingest_invalidates_entry():
+    write_index("https://a.test")
+    registry = RetrieverRegistry(loader=SlowLoader())
+    first = registry.get("https://a.test")
+
+    write_index("https://a.test", size=360)
+    second = registry.get("https://a.test")
+    assert second is not first
+    assert registry.stats()["invalidations"] == 1
+
+    os.remove(get_bundle_path("https://a.test"))
+    with pytest.raises(FileNotFoundError):
+        registry.get("https://a.test")
+    assert registry.stats()["entries"] == 0
+
+
+def test_legacy_files_are_restamped_after_migration():
+    for path in get_cache_paths("https://a.test"):
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+
+    def migrate(domain):
+        for path in get_cache_paths(domain):
+            os.remove(path)
+        write_index(domain, size=250)
+        return {"domain": domain}
+
+    registry = RetrieverRegistry(loader=migrate)
+    first = registry.get("https://a.test")
+    assert registry.get("https://a.test") is first
+    assert registry.stats()["bytes"] == 250
+
+
+def test_a_bundle_published_during_the_load_is_picked_up_next_time():
+    write_index("https://a.test")
+
+    def load_then_reingest(domain):
+        write_index(domain, size=360)  # another process publishes while we load
+        return {"domain": domain}
+
+    registry = RetrieverRegistry(loader=load_then_reingest)
+    first = registry.get("https://a.test")
+    registry.loader = SlowLoader()
+    assert registry.get("https://a.test") is not first
+    assert registry.stats()["invalidations"] == 1
+    assert registry._loading == {}
+
+
+def test_least_recently_used_domain_is_evicted():
+    for name in "abc":
+        write_index(f"https://{name}.test")
+    loader = SlowLoader()
+    registry = RetrieverRegistry(max_bytes=650, loader=loader)
+
+    registry.get("https://a.test")
+    registry.get("https://b.test")
+    registry.get("https://a.test")        # b is now least recently used
+    registry.get("https://c.test")
+
+    stats = registry.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    registry.get("https://a.test")
+    registry.get("https://b.test")
+    assert loader.loads.count("https://b.test") == 2
+    assert loader.loads.count("https://a.test") == 1
+
+
+def test_concurrent_sessions_share_one_load():
+    write_index("https://a.test")
+    loader = SlowLoader(delay=0.05)
+    registry = RetrieverRegistry(loader=loader)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get("https://a.test"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.loads == ["https://a.test"]
+    assert all(r is results[0] for r in results)
+    assert registry.stats()["hits"] == 7
@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.snapshot_store import SnapshotStore, snapshot_key
+from src.storage import get_raw_path, iter_raw_chunks, load_raw_text, save_raw_text
+from src.utils import cache_key
+
+CHUNKS = [
+    {"tag": "Pricing", "title": "Plans", "text": "Plans start at ten dollars a month.", "url": "https://acme.test/pricing"},
+    {"tag": "Contact", "title": "Contact", "text": "Email sales@acme.test – we reply fast ☕"},
+    {"tag": "Error", "text": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def object_bytes(store):
+    return sum(os.path.getsize(os.path.join(store.objects_dir, name)) for name in os.listdir(store.objects_dir))
+
+
+def test_keys_do_not_collide():
+    assert cache_key("a.com/b") == cache_key("a.com_b")
+    assert snapshot_key("a.com/b") != snapshot_key("a.com_b")
+    assert snapshot_key("https://Acme.com/") == snapshot_key("acme.com")
+
+
+def test_round_trip_and_history():
+    store = SnapshotStore()
+    first = store.save("acme.test", CHUNKS)
+    assert store.load("acme.test") == CHUNKS
+    assert store.save("acme.test", CHUNKS) is None  # unchanged: no new version
+
+    changed = CHUNKS[:1] + [{"tag": "Contact", "title": "Contact", "text": "Call us instead."}]
+    second = store.save("acme.test", changed)
+    assert store.versions("acme.test") == [first, second]
+    assert store.load("acme.test") == changed
+    assert store.load("acme.test", first) == CHUNKS
+    assert store.header("acme.test")["chunks"] == 2
+
+
+def test_texts_are_stored_once_across_versions_and_domains():
+    store = SnapshotStore()
+    store.save("acme.test", CHUNKS)
+    before = object_bytes(store)
+    store.save("acme.test", list(reversed(CHUNKS)))
+    store.save("acme.test/eu", CHUNKS)
+    assert object_bytes(store) == before
+    assert len(store._locations) == 2
+
+
+def test_streaming_reads_across_blocks_and_prunes_old_versions():
+    store = SnapshotStore(block_bytes=200, max_versions=2)
+    chunks = [{"tag": "Other", "text": f"chunk {i} " + "lorem ipsum " * 10} for i in range(50)]
+    for n in (10, 30, 50):
+        store.save("acme.test", chunks[:n])
+
+    stream = store.iter_chunks("acme.test")
+    assert next(stream) == chunks[0]
+    assert list(stream) == chunks[1:]
+    assert len(store.versions("acme.test")) == 2
+
+    # A fresh reader (another process) resolves texts from the snapshot alone
+    assert SnapshotStore().load("acme.test") == chunks
+
+
+def test_compaction_keeps_only_texts_of_surviving_snapshots():
+    store = SnapshotStore(block_bytes=200, max_versions=1)
+    shared = {"tag": "Footer", "text": "© Acme and Globex, all rights reserved."}
+    acme = [{"tag": "Other", "text": f"acme page {i} " + "lorem " * 20} for i in range(20)]
+    globex = [{"tag": "Other", "text": f"globex page {i} " + "ipsum " * 20} for i in range(20)]
+    store.save("acme.test", acme + [shared])
+    store.save("globex.test", globex[:2] + [shared])
+    store.save("globex.test", globex + [shared])  # prunes the first globex version
+    other_process = SnapshotStore(block_bytes=200)
+    other_process.save("globex.test/eu", [shared])  # it has now read the whole index
+
+    store.remove("acme.test")
+    full = object_bytes(store)
+    assert store.compact() > 0
+    assert object_bytes(store) < full
+    assert len(store._locations) == len(globex) + 1
+
+    # Snapshots whose pack was repacked read their texts through the index
+    assert store.load("globex.test") == globex + [shared]
+    assert SnapshotStore().load("globex.test") == globex + [shared]
+    # A process that read the index before compaction does not reuse dropped texts
+    other_process.save("acme.test", acme[:1])
+    assert store.load("acme.test") == acme[:1]
+    assert store.compact() == 0
+
+
+def test_storage_api_keeps_its_shape():
+    save_raw_text("acme.test", CHUNKS)
+    assert json.loads(load_raw_text("acme.test")) == CHUNKS
+    assert list(iter_raw_chunks("acme.test")) == CHUNKS
+
+    save_raw_text("plain.test", "just text")
+    assert load_raw_text("plain.test") == "just text"
+
+    # Scrapes saved before snapshots are still readable
+    os.makedirs(os.path.dirname(get_raw_path("old.test")), exist_ok=True)
+    with open(get_raw_path("old.test"), "w", encoding="utf-8") as f:
+        json.dump(CHUNKS, f)
+    assert list(iter_raw_chunks("old.test")) == CHUNKS
+    assert load_raw_text("missing.test") is None
+
+    # ...and old plain-text scrapes (errors included) have no chunks
+    for domain, raw in (("failed.test", "[Error] Failed to fetch: timeout"), ("quoted.test", '"just text"')):
+        with open(get_raw_path(domain), "w", encoding="utf-8") as f:
+            f.write(raw)
+        assert list(iter_raw_chunks(domain)) == []
+        assert load_raw_text(domain) == raw
@@ -0,0 +1,176 @@
+import os
+import pickle
+import sys
+import faiss
+import numpy as np
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("sentence_transformers")
+import src.vectorstore as vectorstore
+from rank_bm25 import BM25Okapi
+from src.chunk_metadata import AUTO_TAGS
+from src.bm25 import SparseBM25
+from src.embedding_cache import QueryEmbeddingCache
+from src.bundle import DomainBundle
+from src.utils import get_bundle_path, get_cache_paths
+from src.vectorstore import HybridRetriever, persist_chunks_to_vectorstore
+
+DOMAIN = "https://acme.test"
+
+
+def fake_vectors(texts):
+    return np.array([[len(t), t.count("e"), t.count(" "), 1.0] for t in texts], dtype="float32")
+
+
+def tagged(texts):
+    return [{"tag": "Other", "text": t} for t in texts]
+
+
+@pytest.fixture
+def encoded(tmp_path, monkeypatch):
+    """
+    Work in a temp dir with a fake model; yields the batches it encoded.
+    """
+    batches = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vectorstore.embedding_model, "encode", fake_vectors, raising=False)
+    monkeypatch.setattr(vectorstore, "encode_chunks", lambda texts: batches.append(list(texts)) or fake_vectors(texts))
+    monkeypatch.setattr(vectorstore, "query_embedding_cache", QueryEmbeddingCache())
+    return batches
+
+
+def test_incremental_update_adds_removes_and_skips(encoded):
+    texts = ["Pricing plans start at ten dollars", "Contact sales today", "Our team of engineers"]
+    assert persist_chunks_to_vectorstore(tagged(texts), DOMAIN) == {"added": 3, "removed": 0, "kept": 0}
+
+    mtime = os.path.getmtime(get_bundle_path(DOMAIN))
+    assert persist_chunks_to_vectorstore(tagged(texts), DOMAIN, incremental=True)["added"] == 0
+    assert os.path.getmtime(get_bundle_path(DOMAIN)) == mtime
+    # Reordering only moves chunk positions in the metadata
+    unchanged = persist_chunks_to_vectorstore(tagged(texts[::-1]), DOMAIN, incremental=True)
+    assert unchanged == {"added": 0, "removed": 0, "kept": 3}
+
+    new_texts = [texts[0], texts[2], "We are hiring remote engineers"]
+    counts = persist_chunks_to_vectorstore(tagged(new_texts), DOMAIN, incremental=True)
+    assert counts == {"added": 1, "removed": 1, "kept": 2}
+    assert encoded[-1] == ["We are hiring remote engineers"]
+    assert len(encoded) == 2
+
+    retriever = HybridRetriever(DOMAIN)
+    assert isinstance(retriever.bm25, SparseBM25)
+    assert retriever.bm25.corpus_size == 3
+    assert retriever.chunks.tolist() == new_texts
+    assert retriever.faiss_index.ntotal == 3
+    assert retriever.search("hiring remote engineers", top_k=1) == ["We are hiring remote engineers"]
+    assert "Contact sales today" not in retriever.search("Contact sales", top_k=3)
+
+
+def test_legacy_pickled_store_still_searches_and_upgrades(encoded):
+    texts = ["Pricing plans start at ten dollars", "Contact sales today"]
+    faiss_path, bm25_path, chunks_path = get_cache_paths(DOMAIN)
+    index = faiss.IndexFlatL2(4)
+    index.add(fake_vectors(texts))
+    faiss.write_index(index, faiss_path)
+    with open(bm25_path, "wb") as f:
+        pickle.dump(BM25Okapi([t.split() for t in texts]), f)
+    with open(chunks_path, "wb") as f:
+        pickle.dump(texts, f)
+
+    assert HybridRetriever(DOMAIN).search("Contact sales", top_k=1) == ["Contact sales today"]
+    # The first load migrated the pickles into a bundle
+    assert sorted(os.listdir("cache")) == [os.path.basename(get_bundle_path(DOMAIN)), "locks"]
+    assert isinstance(HybridRetriever(DOMAIN).bm25, SparseBM25)
+
+    # Legacy (unmapped) indexes cannot be patched in place, so the first update rebuilds
+    counts = persist_chunks_to_vectorstore(tagged(texts), DOMAIN, incremental=True)
+    assert counts == {"added": 2, "removed": 0, "kept": 0}
+    assert isinstance(HybridRetriever(DOMAIN).faiss_index, faiss.IndexIDMap2)
+
+
+@pytest.mark.parametrize("strategy", ["weighted", "rrf", "dense", "sparse"])
+def test_search_many_matches_single_searches(encoded, monkeypatch, strategy):
+    texts = ["Pricing plans start at ten dollars", "Contact sales today", "Our team of engineers",
+             "We are hiring remote engineers", "Our mission is simple pricing"]
+    persist_chunks_to_vectorstore(tagged(texts), DOMAIN)
+    retriever = HybridRetriever(DOMAIN)
+
+    queries = ["pricing", "engineers hiring", "pricing", "contact"]
+    calls = []
+    monkeypatch.setattr(vectorstore.embedding_model, "encode", lambda q: calls.append(list(q)) or fake_vectors(q))
+    batched = retriever.search_many(queries, top_k=2, strategy=strategy)
+
+    assert batched == [retriever.search(q, top_k=2, strategy=strategy) for q in queries]
+    if strategy != "sparse":
+        # One model batch of distinct queries; later searches hit the shared cache
+        assert calls == [["pricing", "engineers hiring", "contact"]]
+
+
+def test_index_kind_follows_corpus_growth(encoded, monkeypatch):
+    monkeypatch.setattr("src.ann.FLAT_MAX_VECTORS", 3)
+    texts = ["Pricing plans start at ten dollars", "Contact sales today", "Our team of engineers"]
+    persist_chunks_to_vectorstore(tagged(texts), DOMAIN)
+    assert DomainBundle.read_header(get_bundle_path(DOMAIN))["index_params"]["kind"] == "flat"
+
+    # Crossing a size tier rebuilds with the next index type
+    grown = texts + ["We are hiring remote engineers"]
+    assert persist_chunks_to_vectorstore(tagged(grown), DOMAIN, incremental=True)["added"] == 4
+    params = DomainBundle.read_header(get_bundle_path(DOMAIN))["index_params"]
+    assert (params["kind"], params["metric"], params["ntotal"]) == ("ivf_flat", "ip", 4)
+    assert HybridRetriever(DOMAIN).search("hiring remote engineers", top_k=1, strategy="dense") == [grown[3]]
+
+
+SECTIONS = [
+    {"tag": "Pricing", "title": "Plans", "text": "Pricing plans start at ten dollars"},
+    {"tag": "Contact", "title": "Contact", "text": "Contact sales today at sales@acme.test"},
+    {"tag": "Location", "title": "Office", "text": "Office on Main Street, New York"},
+    {"tag": "Team", "title": "Team", "text": "Our team of engineers"},
+    {"tag": "Careers", "title": "Jobs", "text": "We are hiring remote engineers"},
+]
+
+
+@pytest.mark.parametrize("strategy", ["weighted", "dense", "sparse"])
+def test_tag_filter_only_scores_matching_chunks(encoded, strategy):
+    persist_chunks_to_vectorstore(SECTIONS, DOMAIN)
+    retriever = HybridRetriever(DOMAIN)
+
+    hits = retriever.search("engineers", top_k=5, strategy=strategy, tags=["Careers"])
+    assert hits == ["We are hiring remote engineers"]
+    assert retriever.search("pricing", top_k=5, strategy=strategy, tags=["Legal"]) == []
+
+
+def test_auto_tags_route_the_task_and_top_up(encoded):
+    persist_chunks_to_vectorstore(SECTIONS, DOMAIN)
+    retriever = HybridRetriever(DOMAIN)
+
+    hits = retriever.search_chunks("What is their contact info?", top_k=2, tags=AUTO_TAGS)
+    assert sorted(h["tag"] for h in hits) == ["Contact", "Location"]
+    assert hits[0]["title"] in ("Contact", "Office")
+
+    # Only two routed chunks: the rest comes from an unfiltered search
+    topped_up = retriever.search("What is their contact info?", top_k=4, tags=AUTO_TAGS)
+    assert set(topped_up[:2]) == {SECTIONS[1]["text"], SECTIONS[2]["text"]}
+    assert len(topped_up) == len(set(topped_up)) == 4
+    # Unrouted tasks search everything
+    assert retriever.search("Summarize them", top_k=3, tags=AUTO_TAGS) == retriever.search("Summarize them", top_k=3)
+
+    tasks = ["What is their contact info?", "Summarize them"]
+    assert retriever.search_chunks_many(tasks, top_k=2, tags=AUTO_TAGS) == [retriever.search_chunks(t, top_k=2, tags=AUTO_TAGS) for t in tasks]
+
+
+def test_metadata_follows_incremental_updates(encoded):
+    persist_chunks_to_vectorstore(SECTIONS, DOMAIN)
+    relabelled = [{**SECTIONS[0], "tag": "Services"}] + SECTIONS[1:]
+    assert persist_chunks_to_vectorstore(relabelled, DOMAIN, incremental=True)["added"] == 0
+    assert HybridRetriever(DOMAIN).search_chunks("pricing", top_k=1, tags=["Services"])[0]["tag"] == "Services"
+
+    persist_chunks_to_vectorstore(relabelled[1:] + [{"tag": "FAQ", "title": "FAQ", "text": "Do you ship abroad?"}], DOMAIN, incremental=True)
+    retriever = HybridRetriever(DOMAIN)
+    assert retriever.metadata.counts() == {"Contact": 1, "Location": 1, "Team": 1, "Careers": 1, "FAQ": 1}
+    assert retriever.search("ship", top_k=3, tags=["FAQ"]) == ["Do you ship abroad?"]
+
+    # Stores without the side table ignore tag filters
+    bundle = DomainBundle.open(get_bundle_path(DOMAIN))
+    bundle.metadata = None
+    bundle.save(get_bundle_path(DOMAIN))
+    assert len(HybridRetriever(DOMAIN).search("ship", top_k=3, tags=["FAQ"])) == 3